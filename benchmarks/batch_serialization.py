@@ -0,0 +1,117 @@
+"""
+Benchmarks assembling the batch response: parsing upstream bodies into pydantic
+models and serializing them back, as opposed to splicing the raw upstream bodies
+into the response.
+
+Usage:
+
+    python -m benchmarks.batch_serialization --items 20 --size 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import gc
+import json
+import time
+from collections.abc import Callable
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+from src.api.proxy.schemas import (
+    ProxyBatchResponse,
+    ProxyBatchResponseItem,
+    ProxyBatchResponseItemResult,
+    dump_batch_item,
+    dump_batch_response,
+)
+
+
+def _make_person(i: int) -> dict[str, object]:
+    return {
+        "name": f"Person {i}",
+        "height": "172",
+        "mass": "77",
+        "hair_color": "blond",
+        "skin_color": "fair",
+        "eye_color": "blue",
+        "birth_year": "19BBY",
+        "gender": "male",
+        "homeworld": "https://swapi.dev/api/planets/1/",
+        "films": [f"https://swapi.dev/api/films/{n}/" for n in range(1, 7)],
+        "species": [],
+        "vehicles": ["https://swapi.dev/api/vehicles/14/"],
+        "starships": ["https://swapi.dev/api/starships/12/"],
+        "created": "2014-12-09T13:50:51.644000Z",
+        "edited": "2014-12-20T21:17:56.891000Z",
+        "url": f"https://swapi.dev/api/people/{i}/",
+    }
+
+
+def _make_responses(items: int, size: int) -> dict[str, httpx.Response]:
+    responses = {}
+    for i in range(items):
+        page = {
+            "count": items * size,
+            "next": f"https://swapi.dev/api/people/?page={i + 2}",
+            "previous": None,
+            "results": [_make_person(i * size + n) for n in range(size)],
+        }
+        content = json.dumps(page, indent=2).encode()
+        responses[f"/people/?page={i + 1}"] = httpx.Response(200, content=content)
+    return responses
+
+
+def parse_and_serialize(responses: dict[str, httpx.Response]) -> bytes:
+    """The way the batch response used to be assembled."""
+    response = ProxyBatchResponse(
+        items=[
+            ProxyBatchResponseItem(
+                path=path,
+                result=ProxyBatchResponseItemResult(
+                    status_code=response.status_code,
+                    content=response.json(),
+                ),
+            )
+            for path, response in responses.items()
+        ]
+    )
+    content = jsonable_encoder(response)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def splice(responses: dict[str, httpx.Response]) -> bytes:
+    return dump_batch_response(
+        dump_batch_item(path, response) for path, response in responses.items()
+    )
+
+
+def _ops_per_sec(rounds: int, fn: Callable[[], object]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return rounds / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    responses = _make_responses(args.items, args.size)
+    assert json.loads(splice(responses)) == json.loads(parse_and_serialize(responses))
+
+    body_size = sum(len(response.content) for response in responses.values())
+    print(f"items: {args.items}, total body size: {body_size:,} bytes")
+    for name, fn in {"parse": parse_and_serialize, "splice": splice}.items():
+        ops = _ops_per_sec(args.rounds, functools.partial(fn, responses))
+        print(f"{name:<16}{ops:>14,.1f} responses/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Load tests the proxy against a stub upstream. Both are served by uvicorn in
+separate processes on the loopback interface, the upstream latency, payload
+size and error rate being configurable.
+
+`/proxy` and `/proxy_batch` are driven at a fixed concurrency (closed loop)
+and at a fixed arrival rate (open loop), once with the `mem://` backend for
+the cache and the rate limiter, and once with Redis, if it's reachable.
+Latency of the open loop runs is measured from the time a request was due,
+so a slow proxy can't hide its latency by slowing the load down.
+
+Usage:
+
+    python -m benchmarks.load --duration 10 --concurrency 32 --rate 200 \\
+        --latency 0.02 --size 4096 --error-rate 0.01 --output results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import httpx
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_SERVICE = "stub"
+
+_ENDPOINTS = ("proxy", "proxy_batch")
+
+SendRequest = Callable[[], Awaitable[httpx.Response]]
+
+
+def create_stub() -> ASGIApp:
+    """
+    Creates the stub upstream, configured with the `STUB_*` environment
+    variables, as uvicorn runs it in a separate process.
+    """
+    latency = float(os.environ.get("STUB_LATENCY", "0"))
+    error_rate = float(os.environ.get("STUB_ERROR_RATE", "0"))
+    size = int(os.environ.get("STUB_SIZE", "1024"))
+    rng = random.Random(int(os.environ.get("STUB_SEED", "0")))
+
+    # {"name": ""} takes 12 bytes
+    content = json.dumps({"name": "x" * max(size - 12, 0)}).encode()
+    error_content = b'{"detail": "Service Unavailable"}'
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        if latency:
+            await asyncio.sleep(latency)
+        status, body = 200, content
+        if rng.random() < error_rate:
+            status, body = 503, error_content
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def _wait_until_listening(process: subprocess.Popen[bytes], port: int) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with {process.returncode}.")
+        with contextlib.suppress(OSError):
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        time.sleep(0.1)
+    raise RuntimeError("The server didn't start in time.")
+
+
+@contextlib.contextmanager
+def _serve(
+    app: str, env: dict[str, str], *args: str
+) -> Iterator[tuple[str, subprocess.Popen[bytes]]]:
+    """Serves the app with uvicorn, yielding its base URL and the process."""
+    port = _get_free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            app,
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+            *args,
+        ],
+        env={**os.environ, **env},
+    )
+    try:
+        _wait_until_listening(process, port)
+        yield f"http://127.0.0.1:{port}", process
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _get_rss(pid: int) -> int | None:
+    """Returns the resident set size of the process in bytes, Linux only."""
+    with contextlib.suppress(OSError):
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def _percentile(values: list[float], p: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+@dataclass(slots=True)
+class _Recorder:
+    latencies: list[float] = field(default_factory=list)
+    requests: int = 0
+    errors: int = 0
+
+    async def record(self, send: SendRequest, started_at: float) -> None:
+        self.requests += 1
+        try:
+            response = await send()
+        except httpx.HTTPError:
+            self.errors += 1
+            return
+        if not response.is_success:
+            self.errors += 1
+        self.latencies.append(time.perf_counter() - started_at)
+
+
+@dataclass(slots=True)
+class Result:
+    backend: str
+    endpoint: str
+    # either "closed", at a fixed concurrency, or "open", at a fixed rate
+    mode: str
+    load: float
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float | None
+    p95_ms: float | None
+    p99_ms: float | None
+    rss_bytes: int | None
+
+
+async def _run_closed_loop(
+    recorder: _Recorder, send: SendRequest, concurrency: int, duration: float
+) -> None:
+    """Sends requests one after another from a fixed number of workers."""
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while (started_at := time.perf_counter()) < deadline:
+            await recorder.record(send, started_at)
+
+    async with asyncio.TaskGroup() as tg:
+        for _ in range(concurrency):
+            tg.create_task(worker())
+
+
+async def _run_open_loop(
+    recorder: _Recorder, send: SendRequest, rate: float, duration: float
+) -> None:
+    """Sends requests at a fixed rate, whether the previous ones completed or not."""
+    start = time.perf_counter()
+    async with asyncio.TaskGroup() as tg:
+        for i in range(int(rate * duration)):
+            due_at = start + i / rate
+            if (delay := due_at - time.perf_counter()) > 0:
+                await asyncio.sleep(delay)
+            tg.create_task(recorder.record(send, due_at))
+
+
+def _make_send(
+    client: httpx.AsyncClient, endpoint: str, paths: int, batch_size: int
+) -> SendRequest:
+    """Makes a function sending requests to the resources in a round-robin."""
+    counter = itertools.count()
+
+    def send() -> Awaitable[httpx.Response]:
+        n = next(counter)
+        if endpoint == "proxy":
+            return client.get(f"/proxy/{_SERVICE}/films/{n % paths}/")
+        items = [{"path": f"/films/{(n + i) % paths}"} for i in range(batch_size)]
+        return client.post(f"/proxy_batch/{_SERVICE}", json={"items": items})
+
+    return send
+
+
+async def _bench_backend(
+    args: argparse.Namespace, backend: str, upstream_url: str
+) -> list[Result]:
+    service = {
+        "name": _SERVICE,
+        "host": upstream_url,
+        "rate_limit": 10**9,
+        "cache_ttl": args.cache_ttl,
+        # the limit is pinned, so it doesn't adapt differently between runs
+        "min_concurrent_requests": args.upstream_concurrency,
+        "max_concurrent_requests": args.upstream_concurrency,
+        "max_queued_requests": 10**6,
+    }
+    env = {
+        "SERVICES": json.dumps([service]),
+        "CACHE__BACKEND_DSN": backend,
+        "LIMITER__BACKEND_DSN": backend,
+    }
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100))
+    results = []
+    with _serve("src.api.main:app", env) as (url, process):
+        async with httpx.AsyncClient(
+            base_url=url, limits=limits, timeout=args.timeout
+        ) as client:
+            for endpoint in _ENDPOINTS:
+                send = _make_send(client, endpoint, args.paths, args.batch_size)
+                await _run_closed_loop(_Recorder(), send, 4, args.warmup)
+
+                closed, open_ = _Recorder(), _Recorder()
+                runs = [
+                    (
+                        "closed",
+                        args.concurrency,
+                        closed,
+                        _run_closed_loop(closed, send, args.concurrency, args.duration),
+                    ),
+                    (
+                        "open",
+                        args.rate,
+                        open_,
+                        _run_open_loop(open_, send, args.rate, args.duration),
+                    ),
+                ]
+                for mode, load, recorder, run in runs:
+                    started_at = time.perf_counter()
+                    await run
+                    elapsed = time.perf_counter() - started_at
+
+                    latencies = [latency * 1000 for latency in recorder.latencies]
+                    results.append(
+                        Result(
+                            backend=backend,
+                            endpoint=endpoint,
+                            mode=mode,
+                            load=load,
+                            requests=recorder.requests,
+                            errors=recorder.errors,
+                            rps=len(latencies) / elapsed,
+                            p50_ms=_percentile(latencies, 50),
+                            p95_ms=_percentile(latencies, 95),
+                            p99_ms=_percentile(latencies, 99),
+                            rss_bytes=_get_rss(process.pid),
+                        )
+                    )
+    return results
+
+
+async def _is_reachable(dsn: str) -> bool:
+    client = redis.from_url(dsn)
+    try:
+        return bool(await client.ping())
+    except (RedisError, OSError):
+        return False
+    finally:
+        await client.aclose()
+
+
+def _format_ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:,.1f}"
+
+
+def _print_results(results: list[Result]) -> None:
+    print(
+        f"{'backend':<24}{'endpoint':<13}{'mode':<8}{'load':>8}{'rps':>10}"
+        f"{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>9}"
+    )
+    for result in results:
+        rss = "-" if result.rss_bytes is None else f"{result.rss_bytes / 2**20:,.1f}"
+        print(
+            f"{result.backend:<24}{result.endpoint:<13}{result.mode:<8}"
+            f"{result.load:>8,.0f}{result.rps:>10,.1f}{result.errors:>8}"
+            f"{_format_ms(result.p50_ms):>9}{_format_ms(result.p95_ms):>9}"
+            f"{_format_ms(result.p99_ms):>9}{rss:>9}"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=200, help="requests/sec")
+    parser.add_argument("--paths", type=int, default=1000, help="distinct resources")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30, help="seconds")
+    parser.add_argument("--cache-ttl", type=int, default=0)
+    parser.add_argument("--upstream-concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds")
+    parser.add_argument("--size", type=int, default=1024, help="bytes")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-dsn", default="redis://localhost:6379")
+    parser.add_argument("--output", type=Path, help="where to save results as JSON")
+    args = parser.parse_args()
+
+    backends = ["mem://"]
+    if await _is_reachable(args.redis_dsn):
+        backends.append(args.redis_dsn)
+    else:
+        print(f"Redis at {args.redis_dsn} is not reachable, skipping.", file=sys.stderr)
+
+    stub_env = {
+        "STUB_LATENCY": str(args.latency),
+        "STUB_SIZE": str(args.size),
+        "STUB_ERROR_RATE": str(args.error_rate),
+        "STUB_SEED": str(args.seed),
+    }
+    results = []
+    stub_args = ("--factory", "--lifespan", "off")
+    with _serve("benchmarks.load:create_stub", stub_env, *stub_args) as (url, _):
+        for backend in backends:
+            results.extend(await _bench_backend(args, backend, url))
+
+    _print_results(results)
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {
+                name: str(value) if isinstance(value, Path) else value
+                for name, value in vars(args).items()
+            },
+            "results": [asdict(result) for result in results],
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Benchmarks the in-memory rate limiter storage: throughput of the storage
+operations and of the limiter itself, and memory used per key.
+
+Usage:
+
+    python -m benchmarks.memory_storage --keys 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from src.toolkit.rate_limit.backends.memory import InMemoryBackend, InMemoryStorage
+
+
+def _make_keys(count: int) -> list[str]:
+    return [f"swapi:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(count)]
+
+
+def _ops_per_sec(count: int, fn: Callable[[], None]) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def bench_storage(keys: list[str]) -> dict[str, float]:
+    storage = InMemoryStorage(max_keys=len(keys))
+
+    def insert() -> None:
+        for key in keys:
+            storage.set(key, 1.0, ttl=60)
+
+    def update() -> None:
+        for key in keys:
+            storage.set(key, 2.0, ttl=120)
+
+    def get() -> None:
+        for key in keys:
+            storage.get(key)
+
+    full = InMemoryStorage(max_keys=len(keys) // 2)
+
+    def insert_with_eviction() -> None:
+        for key in keys:
+            full.set(key, 1.0, ttl=60)
+
+    return {
+        "set (insert)": _ops_per_sec(len(keys), insert),
+        "set (update)": _ops_per_sec(len(keys), update),
+        "get": _ops_per_sec(len(keys), get),
+        "set (evicting)": _ops_per_sec(len(keys), insert_with_eviction),
+    }
+
+
+def bench_limiter(keys: list[str]) -> dict[str, float]:
+    backend = InMemoryBackend(f"mem://?max_keys={len(keys)}")
+
+    async def hit() -> None:
+        for key in keys:
+            await backend.hit(key, limit=100, period=3600)
+
+    return {"hit": _ops_per_sec(len(keys), lambda: asyncio.run(hit()))}
+
+
+def bench_memory(keys: list[str]) -> float:
+    """Returns bytes per key used by the storage, not counting the key itself."""
+    gc.collect()
+    tracemalloc.start()
+    storage = InMemoryStorage(max_keys=len(keys))
+    for i, key in enumerate(keys):
+        storage.set(key, float(i), ttl=60)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    keys = _make_keys(args.keys)
+    print(f"keys: {args.keys:,}")
+    for name, ops in {**bench_storage(keys), **bench_limiter(keys)}.items():
+        print(f"{name:<16}{ops:>14,.0f} ops/sec")
+    print(f"{'memory':<16}{bench_memory(keys):>14,.1f} bytes/key")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmarks the per-request overhead of serving the proxy route with the raw
+ASGI dispatcher, as opposed to the FastAPI routing and dependency resolution.
+
+Both apps are called directly over ASGI, and the upstream responds right away
+from memory, so the difference is down to how the request gets to the view.
+
+Usage:
+
+    python -m benchmarks.proxy_dispatch --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import time
+from collections.abc import Mapping
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from starlette.types import Message, Scope
+
+from src.api.main import create_app, lifespan
+from src.api.proxy import ProxyDispatcher
+from src.config import config
+
+_CONTENT = b'{"title": "A New Hope", "episode_id": 4}'
+
+
+def _create_routes_app() -> FastAPI:
+    app = create_app()
+    app.user_middleware = [
+        middleware
+        for middleware in app.user_middleware
+        if middleware.cls is not ProxyDispatcher
+    ]
+    return app
+
+
+def _make_scope(state: Mapping[str, Any]) -> Scope:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/proxy/swapi/films/1/",
+        "raw_path": b"/proxy/swapi/films/1/",
+        "query_string": b"format=json",
+        "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 8000),
+        "state": dict(state),
+    }
+
+
+async def _request(app: FastAPI, state: Mapping[str, Any]) -> int:
+    status_code = 0
+    received = False
+
+    async def receive() -> Message:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # the client never goes away
+        await asyncio.Event().wait()
+        raise AssertionError("unreachable")
+
+    async def send(message: Message) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(_make_scope(state), receive, send)
+    return status_code
+
+
+async def _requests_per_sec(app: FastAPI, requests: int) -> float:
+    def respond(request: httpx.Request) -> httpx.Response:
+        headers = {"content-type": "application/json"}
+        return httpx.Response(200, headers=headers, content=_CONTENT)
+
+    async with lifespan(app) as state:
+        upstream = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        state["http_clients"] = {"swapi": upstream}
+        assert await _request(app, state) == 200
+
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(requests):
+            await _request(app, state)
+        return requests / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    service = config.get_service("swapi")
+    assert service is not None, "The `swapi` service must be configured."
+    service.rate_limit = args.requests * 10
+
+    results = {
+        "routes": await _requests_per_sec(_create_routes_app(), args.requests),
+        "dispatcher": await _requests_per_sec(create_app(), args.requests),
+    }
+    for name, rps in results.items():
+        print(f"{name:<16}{rps:>14,.1f} requests/sec{1e6 / rps:>10,.1f} us/request")
+
+    saved = 1e6 / results["routes"] - 1e6 / results["dispatcher"]
+    print(f"saved per request: {saved:,.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,20 +5,59 @@ from typing import Annotated, TypeAlias
 from fastapi import Depends, Request
 from httpx import AsyncClient
 
+from src.toolkit.asyncio import ConcurrencyLimiter, SingleFlight
+from src.toolkit.cache import Cache
+from src.toolkit.circuit_breaker import CircuitBreaker
+from src.toolkit.http import PoolStats
 from src.toolkit.rate_limit.rate_limit import RateLimiter
 
 __all__ = [
-    "HttpClientDeps",
+    "CacheDeps",
+    "CircuitBreakersDeps",
+    "ConcurrencyLimitersDeps",
+    "HttpClientsDeps",
+    "PoolStatsDeps",
+    "RateLimiterDeps",
+    "SingleFlightDeps",
 ]
 
 
-async def http_client(request: Request):
-    return request.state.http_client
+async def circuit_breakers(request: Request):
+    return request.state.circuit_breakers
+
+
+async def concurrency_limiters(request: Request):
+    return request.state.concurrency_limiters
+
+
+async def http_clients(request: Request):
+    return request.state.http_clients
+
+
+async def pool_stats(request: Request):
+    return request.state.pool_stats
 
 
 async def rate_limiter(request: Request):
     return request.state.limiter
 
 
-HttpClientDeps: TypeAlias = Annotated[AsyncClient, Depends(http_client)]
+async def cache(request: Request):
+    return request.state.cache
+
+
+async def singleflight(request: Request):
+    return request.state.singleflight
+
+
+CacheDeps: TypeAlias = Annotated[Cache, Depends(cache)]
+CircuitBreakersDeps: TypeAlias = Annotated[
+    dict[str, CircuitBreaker], Depends(circuit_breakers)
+]
+ConcurrencyLimitersDeps: TypeAlias = Annotated[
+    dict[str, ConcurrencyLimiter], Depends(concurrency_limiters)
+]
+HttpClientsDeps: TypeAlias = Annotated[dict[str, AsyncClient], Depends(http_clients)]
+PoolStatsDeps: TypeAlias = Annotated[dict[str, PoolStats], Depends(pool_stats)]
 RateLimiterDeps: TypeAlias = Annotated[RateLimiter, Depends(rate_limiter)]
+SingleFlightDeps: TypeAlias = Annotated[SingleFlight, Depends(singleflight)]
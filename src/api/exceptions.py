@@ -1,3 +1,4 @@
+import math
 from typing import cast
 
 from fastapi import Request, Response
@@ -15,7 +16,9 @@ async def rate_limit_error_handler(_: Request, exc: Exception) -> Response:
     exc = cast(RateLimitError, exc)
     rate_limit_error = RateLimit()
     return JSONResponse(
-        rate_limit_error.as_dict(), status_code=rate_limit_error.status_code
+        rate_limit_error.as_dict(),
+        status_code=rate_limit_error.status_code,
+        headers={"Retry-After": str(math.ceil(exc.result.retry_after))},
     )
 
 
@@ -46,6 +49,13 @@ class RateLimit(APIError):
     default_description = "Too many requests."
 
 
+class ClientClosedRequest(APIError):
+    status_code = 499
+    code = "CLIENT_CLOSED_REQUEST"
+    title = "Client closed request"
+    default_description = "Client closed the connection before the response."
+
+
 class BadGateway(APIError):
     status_code = 502
     code = "BAD_GATEWAY"
@@ -53,6 +63,19 @@ class BadGateway(APIError):
     default_description = "Invalid response from the upstream server."
 
 
+class ServiceUnavailable(APIError):
+    status_code = 503
+    code = "SERVICE_UNAVAILABLE"
+    title = "Service unavailable"
+    default_description = "Too many requests to the upstream, try again later."
+
+
+class CircuitOpen(ServiceUnavailable):
+    code = "CIRCUIT_OPEN"
+    title = "Circuit open"
+    default_description = "The upstream is failing, requests are paused for a while."
+
+
 class GatewayTimeout(APIError):
     status_code = 504
     code = "GATEWAY_TIMEOUT"
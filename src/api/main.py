@@ -12,10 +12,16 @@ from src.api.exceptions import (
     api_error_exception_handler,
     rate_limit_error_handler,
 )
-from src.config import config
+from src.config import ServiceConfig, config
+from src.toolkit.asyncio import ConcurrencyLimiter, SingleFlight
+from src.toolkit.cache import Cache
+from src.toolkit.circuit_breaker import CircuitBreaker
+from src.toolkit.http import InstrumentedTransport, PoolStats, RetryTransport
 from src.toolkit.rate_limit import RateLimiter, RateLimitError
+from src.toolkit.retry import RetryBudget
 
-from . import proxy, router
+from . import metrics, proxy, router
+from .proxy.snapshot import Snapshot
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator
@@ -24,19 +30,99 @@ if TYPE_CHECKING:
 
 
 class State(TypedDict):
-    http_client: AsyncClient
+    cache: Cache
+    circuit_breakers: dict[str, CircuitBreaker]
+    concurrency_limiters: dict[str, ConcurrencyLimiter]
+    http_clients: dict[str, AsyncClient]
     limiter: RateLimiter
+    pool_stats: dict[str, PoolStats]
+    singleflight: SingleFlight
+    snapshots: dict[str, Snapshot]
+
+
+def _create_circuit_breaker(service: ServiceConfig) -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_rate=service.circuit_breaker.failure_rate,
+        min_calls=service.circuit_breaker.min_calls,
+        window=service.circuit_breaker.window,
+        open_timeout=service.circuit_breaker.open_timeout,
+        failure_exceptions=(httpx.TransportError,),
+    )
+
+
+def _create_http_client(service: ServiceConfig, stats: PoolStats) -> AsyncClient:
+    def observe(status: str, duration: float) -> None:
+        metrics.upstream_request_duration.labels(service.name, status).observe(duration)
+
+    def on_extra_request(reason: str) -> None:
+        metrics.upstream_extra_requests.labels(service.name, reason).inc()
+
+    limits = httpx.Limits(
+        max_connections=service.pool.max_connections,
+        max_keepalive_connections=service.pool.max_keepalive_connections,
+        keepalive_expiry=service.pool.keepalive_expiry,
+    )
+    transport = InstrumentedTransport(
+        stats,
+        observe,
+        limits=limits,
+        http2=service.pool.http2,
+    )
+    budget = RetryBudget(
+        ratio=service.retry.budget_ratio,
+        min_per_second=service.retry.budget_min_per_second,
+    )
+    return httpx.AsyncClient(
+        transport=RetryTransport(
+            transport,
+            budget,
+            max_retries=service.retry.max_retries,
+            timeout=service.timeout,
+            hedge_percentile=service.retry.hedge_percentile,
+            on_extra_request=on_extra_request,
+        ),
+        timeout=httpx.Timeout(service.timeout, connect=service.connect_timeout),
+    )
 
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[State]:
-    async with (
-        httpx.AsyncClient() as http_client,
-        RateLimiter(config.limiter) as limiter,
-    ):
+    async with contextlib.AsyncExitStack() as stack:
+        http_clients, pool_stats, concurrency_limiters = {}, {}, {}
+        circuit_breakers, snapshots = {}, {}
+        for service in config.services:
+            stats = PoolStats(max_connections=service.pool.max_connections)
+            http_clients[service.name] = await stack.enter_async_context(
+                _create_http_client(service, stats)
+            )
+            pool_stats[service.name] = stats
+            concurrency_limiters[service.name] = ConcurrencyLimiter(
+                service.min_concurrent_requests,
+                service.max_concurrent_requests,
+                max_queue_size=service.max_queued_requests,
+                queue_timeout=service.queue_timeout,
+            )
+            circuit_breakers[service.name] = _create_circuit_breaker(service)
+            if service.snapshot_path is not None:
+                snapshots[service.name] = await stack.enter_async_context(
+                    Snapshot(
+                        service.snapshot_path,
+                        str(service.host),
+                        reload_interval=service.snapshot_reload_interval,
+                    )
+                )
+
+        limiter = await stack.enter_async_context(RateLimiter(config.limiter))
+        cache = await stack.enter_async_context(Cache(config.cache))
         yield {
-            "http_client": http_client,
+            "cache": cache,
+            "circuit_breakers": circuit_breakers,
+            "concurrency_limiters": concurrency_limiters,
+            "http_clients": http_clients,
             "limiter": limiter,
+            "pool_stats": pool_stats,
+            "singleflight": SingleFlight(),
+            "snapshots": snapshots,
         }
 
 
@@ -48,6 +134,9 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
+    # the innermost middleware, so the proxy routes go through all the others
+    app.add_middleware(proxy.ProxyDispatcher, services=config.services)
+    app.add_middleware(metrics.MetricsMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=config.cors.allowed_origins,
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import time
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING
+
+from src.toolkit.metrics import Registry
+
+if TYPE_CHECKING:
+    from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+__all__ = [
+    "MetricsMiddleware",
+    "registry",
+]
+
+_SERVICE_ENDPOINTS = frozenset(["proxy", "proxy_batch"])
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "proxy_request_duration_seconds",
+    "Time to handle a request.",
+    ["service", "endpoint", "status"],
+)
+upstream_request_duration = registry.histogram(
+    "proxy_upstream_request_duration_seconds",
+    "Time to get response headers from the upstream.",
+    ["service", "status"],
+)
+upstream_extra_requests = registry.counter(
+    "proxy_upstream_extra_requests",
+    "Upstream requests made to retry or hedge a request.",
+    ["service", "reason"],
+)
+rate_limit_decisions = registry.counter(
+    "proxy_rate_limit_decisions",
+    "Rate limiter decisions.",
+    ["service", "decision"],
+)
+rate_limit_duration = registry.histogram(
+    "proxy_rate_limit_duration_seconds",
+    "Time to check a rate limit with the backend.",
+    ["service"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+cache_lookups = registry.counter(
+    "proxy_cache_lookups",
+    "Response cache lookups.",
+    ["service", "result"],
+)
+cache_errors = registry.counter(
+    "proxy_cache_errors",
+    "Response cache backend errors.",
+    ["service", "operation"],
+)
+batch_size = registry.histogram(
+    "proxy_batch_size",
+    "Number of items in a batch request.",
+    ["service"],
+    buckets=(1, 2, 5, 10, 15, 20),
+)
+
+# the following are collected from the lifespan state on every scrape
+concurrency_limit = registry.gauge(
+    "proxy_concurrency_limit",
+    "Current concurrency limit of the upstream requests.",
+    ["service"],
+)
+concurrency_in_flight = registry.gauge(
+    "proxy_concurrency_in_flight",
+    "Upstream requests in flight.",
+    ["service"],
+)
+concurrency_queued = registry.gauge(
+    "proxy_concurrency_queued",
+    "Upstream requests waiting for the concurrency limit.",
+    ["service"],
+)
+pool_saturated = registry.counter(
+    "proxy_pool_saturated",
+    "Requests that had to wait for a free upstream connection.",
+    ["service"],
+)
+
+
+class MetricsMiddleware:
+    """Measures how long it takes to handle requests to the service endpoints."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = getattr(scope.get("endpoint"), "__name__", None)
+            if endpoint in _SERVICE_ENDPOINTS:
+                service = PurePosixPath(scope["path"]).parts[2]
+                request_duration.labels(service, endpoint, str(status)).observe(
+                    time.perf_counter() - started_at
+                )
@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.api import metrics
+from src.api.deps import CircuitBreakersDeps, ConcurrencyLimitersDeps, PoolStatsDeps
 
 router = APIRouter()
 
@@ -7,3 +11,49 @@ router = APIRouter()
 async def ping():
     """Health check for service"""
     return {"status": "OK"}
+
+
+@router.get("/services")
+async def services(
+    pool_stats: PoolStatsDeps,
+    concurrency_limiters: ConcurrencyLimitersDeps,
+    circuit_breakers: CircuitBreakersDeps,
+):
+    """Connection pool usage, concurrency limits and circuit state per service"""
+    return {
+        name: {
+            "pool": {
+                "max_connections": stats.max_connections,
+                "in_flight": stats.in_flight,
+                "saturated": stats.saturated,
+            },
+            "concurrency": {
+                "limit": concurrency_limiters[name].limit,
+                "in_flight": concurrency_limiters[name].in_flight,
+                "queued": concurrency_limiters[name].queued,
+            },
+            "circuit_breaker": {
+                "state": circuit_breakers[name].state,
+            },
+        }
+        for name, stats in pool_stats.items()
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus(
+    pool_stats: PoolStatsDeps,
+    concurrency_limiters: ConcurrencyLimitersDeps,
+):
+    """Metrics in the Prometheus text format"""
+    for name, limiter in concurrency_limiters.items():
+        metrics.concurrency_limit.labels(name).set(limiter.limit)
+        metrics.concurrency_in_flight.labels(name).set(limiter.in_flight)
+        metrics.concurrency_queued.labels(name).set(limiter.queued)
+    for name, stats in pool_stats.items():
+        metrics.pool_saturated.labels(name).set(stats.saturated)
+
+    return PlainTextResponse(
+        metrics.registry.expose(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -4,14 +4,18 @@ from typing import TYPE_CHECKING
 
 from fastapi import APIRouter
 
-from . import views
+from . import schemas, views
+from .dispatcher import PROXY_METHODS, ProxyDispatcher
 
 if TYPE_CHECKING:
     from fastapi import FastAPI
 
     from src.config import ServiceConfig
 
-_METHODS = ["DELETE", "HEAD", "GET", "OPTIONS", "POST", "PATCH", "PUT", "TRACE"]
+__all__ = [
+    "ProxyDispatcher",
+    "setup",
+]
 
 
 def setup(app: FastAPI, services: list[ServiceConfig]) -> None:
@@ -20,11 +24,12 @@ def setup(app: FastAPI, services: list[ServiceConfig]) -> None:
         service_router.add_api_route(
             f"/proxy/{service.name}/{{path:path}}",
             views.proxy,
-            methods=_METHODS,
+            methods=list(PROXY_METHODS),
         )
         service_router.add_api_route(
             f"/proxy_batch/{service.name}",
             views.proxy_batch,
             methods=["POST"],
+            response_model=schemas.ProxyBatchResponse,
         )
-    app.include_router(service_router)
+        app.include_router(service_router)
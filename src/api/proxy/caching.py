@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from . import compression
+
+__all__ = [
+    "CachedResponse",
+    "add_etag",
+    "dump_response",
+    "get_ttl",
+    "get_validators",
+    "is_cacheable_request",
+    "is_not_modified",
+    "load_response",
+    "make_not_modified",
+    "refresh_response",
+]
+
+_CACHEABLE_STATUS_CODES = frozenset([200, 203, 300, 301, 308, 404, 410])
+
+_UNCACHEABLE_DIRECTIVES = frozenset(["no-cache", "no-store", "private"])
+
+# The cache stores an already decoded body, so headers describing how the body
+# was transferred over the wire are not valid for a cached entry.
+_SKIP_HEADERS = frozenset(
+    [
+        "connection",
+        "content-encoding",
+        "content-length",
+        "keep-alive",
+        "transfer-encoding",
+    ]
+)
+
+# Headers a 304 response has, if the 200 response would have had them,
+# see https://www.rfc-editor.org/rfc/rfc9110#section-15.4.5
+_NOT_MODIFIED_HEADERS = frozenset(
+    [
+        "cache-control",
+        "content-location",
+        "date",
+        "etag",
+        "expires",
+        "last-modified",
+        "vary",
+    ]
+)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    response: httpx.Response
+    # unix time the response becomes stale at
+    expires_at: float = math.inf
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def is_stale_within(self, seconds: int) -> bool:
+        """Whether the response has been stale for less than `seconds`."""
+        return time.time() < self.expires_at + seconds
+
+
+def _parse_cache_control(value: str) -> dict[str, str]:
+    directives = {}
+    for directive in value.split(","):
+        name, _, argument = directive.partition("=")
+        if name := name.strip().lower():
+            directives[name] = argument.strip().strip('"')
+    return directives
+
+
+def _parse_date(value: str) -> datetime | None:
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        return date.replace(tzinfo=UTC)
+    return date
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_freshness_lifetime(
+    headers: httpx.Headers, directives: Mapping[str, str]
+) -> int | None:
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            return _parse_int(directives[name]) or 0
+
+    if "expires" in headers:
+        expires = _parse_date(headers["expires"])
+        if expires is None:
+            return 0
+        date = _parse_date(headers.get("date", "")) or datetime.now(UTC)
+        return int((expires - date).total_seconds())
+
+    return None
+
+
+def _get_vary(
+    response: httpx.Response, request_headers: Mapping[str, str]
+) -> dict[str, str]:
+    names = response.headers.get("vary", "").split(",")
+    return {
+        name: request_headers.get(name, "")
+        for name in (name.strip().lower() for name in names)
+        # the body is stored decoded, and is encoded for every client anew
+        if name and name != "accept-encoding"
+    }
+
+
+def is_cacheable_request(headers: Mapping[str, str]) -> bool:
+    """
+    A shared cache must not reuse responses to authorized requests, so such
+    requests always go to the upstream.
+    """
+    return "authorization" not in headers
+
+
+def get_ttl(response: httpx.Response, max_ttl: int) -> int:
+    """
+    Returns for how many seconds the response can be cached according to the
+    upstream `Cache-Control`/`Expires` headers, but not longer than `max_ttl`.
+    Returns 0, if the response must not be cached.
+    """
+    if response.status_code not in _CACHEABLE_STATUS_CODES:
+        return 0
+    if "set-cookie" in response.headers:
+        return 0
+    if response.headers.get("vary", "").strip() == "*":
+        return 0
+
+    directives = _parse_cache_control(response.headers.get("cache-control", ""))
+    if directives.keys() & _UNCACHEABLE_DIRECTIVES:
+        return 0
+
+    lifetime = _get_freshness_lifetime(response.headers, directives)
+    if lifetime is None:
+        return max_ttl
+
+    age = _parse_int(response.headers.get("age")) or 0
+    return max(0, min(lifetime - age, max_ttl))
+
+
+def dump_response(
+    response: httpx.Response,
+    request_headers: Mapping[str, str],
+    ttl: int | None = None,
+) -> bytes:
+    """
+    Serializes the response into a cache entry, which is fresh for `ttl` seconds
+    or forever. The values of the request headers listed in the `Vary` header
+    are stored along, so the entry is served only to the requests with the same
+    values. So are the compressed variants of the body, if there are any.
+    """
+    variants = compression.get_variants(response)
+    meta = {
+        "expires_at": None if ttl is None else time.time() + ttl,
+        "status_code": response.status_code,
+        "headers": [
+            (name, value)
+            for name, value in response.headers.multi_items()
+            if name not in _SKIP_HEADERS
+        ],
+        "vary": _get_vary(response, request_headers),
+        "variants": {name: len(content) for name, content in variants.items()},
+    }
+    return b"".join(
+        [json.dumps(meta).encode(), b"\n", response.content, *variants.values()]
+    )
+
+
+def load_response(
+    data: bytes, request_headers: Mapping[str, str]
+) -> CachedResponse | None:
+    """
+    Deserializes a cache entry into the response. Returns None, if the entry
+    does not match the request headers listed in the `Vary` header.
+    """
+    meta_data, _, content = data.partition(b"\n")
+    meta = json.loads(meta_data)
+    for name, value in meta["vary"].items():
+        if request_headers.get(name, "") != value:
+            return None
+
+    # the variants follow the body in the order they're listed in
+    variants = {}
+    offset = len(content) - sum(meta.get("variants", {}).values())
+    content, tail = content[:offset], memoryview(content)[offset:]
+    for name, size in meta.get("variants", {}).items():
+        variants[name], tail = bytes(tail[:size]), tail[size:]
+
+    response = httpx.Response(
+        meta["status_code"],
+        headers=meta["headers"],
+        content=content,
+    )
+    compression.set_variants(response, variants)
+    expires_at = meta.get("expires_at")
+    if expires_at is None:
+        return CachedResponse(response)
+    return CachedResponse(response, expires_at)
+
+
+def add_etag(response: httpx.Response) -> None:
+    """
+    Adds a strong `ETag` computed from the body to a 200 response, unless
+    the upstream has already provided one.
+    """
+    if response.status_code == 200 and "etag" not in response.headers:
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        response.headers["etag"] = f'"{digest}"'
+
+
+def _strip_weak(etag: str) -> str:
+    return etag.strip().removeprefix("W/")
+
+
+def is_not_modified(
+    request_headers: Mapping[str, str], response: httpx.Response
+) -> bool:
+    """
+    Tells whether a conditional GET request can be answered with 304. The
+    `If-Modified-Since` header is evaluated only if there is no `If-None-Match`.
+    """
+    if response.status_code != 200:
+        return False
+
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = response.headers.get("etag")
+        etags = {_strip_weak(value) for value in if_none_match.split(",")}
+        return etag is not None and ("*" in etags or _strip_weak(etag) in etags)
+
+    if_modified_since = _parse_date(request_headers.get("if-modified-since", ""))
+    last_modified = _parse_date(response.headers.get("last-modified", ""))
+    if if_modified_since is None or last_modified is None:
+        return False
+    return last_modified <= if_modified_since
+
+
+def make_not_modified(response: httpx.Response) -> httpx.Response:
+    headers = [
+        (name, value)
+        for name, value in response.headers.multi_items()
+        if name in _NOT_MODIFIED_HEADERS
+    ]
+    return httpx.Response(304, headers=headers)
+
+
+def get_validators(response: httpx.Response) -> dict[str, str]:
+    """
+    Returns the headers of a conditional request, which revalidates the response
+    with the upstream.
+    """
+    validators = {}
+    if etag := response.headers.get("etag"):
+        validators["if-none-match"] = etag
+    if last_modified := response.headers.get("last-modified"):
+        validators["if-modified-since"] = last_modified
+    return validators
+
+
+def refresh_response(
+    response: httpx.Response, not_modified: httpx.Response
+) -> httpx.Response:
+    """
+    Updates the stored response with the headers of the upstream 304 response,
+    which revalidated it.
+    """
+    headers = [
+        (name, value)
+        for name, value in response.headers.multi_items()
+        if name not in not_modified.headers
+    ]
+    headers.extend(
+        (name, value)
+        for name, value in not_modified.headers.multi_items()
+        if name not in _SKIP_HEADERS
+    )
+    refreshed = httpx.Response(
+        response.status_code, headers=headers, content=response.content
+    )
+    compression.set_variants(refreshed, compression.get_variants(response))
+    return refreshed
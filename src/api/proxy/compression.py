@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import functools
+import gzip
+from collections.abc import Callable, Mapping
+
+import brotli
+import httpx
+import zstandard
+
+__all__ = [
+    "ENCODINGS",
+    "add_variants",
+    "compress",
+    "get_variants",
+    "is_compressible",
+    "negotiate",
+    "set_variants",
+]
+
+# Levels that trade some of the ratio for speed, as the responses are
+# compressed on the fly.
+_COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "zstd": zstandard.ZstdCompressor(level=3).compress,
+    "br": functools.partial(brotli.compress, quality=4),
+    "gzip": functools.partial(gzip.compress, compresslevel=6, mtime=0),
+}
+
+# Supported encodings in the order of preference, when the client accepts
+# several of them equally.
+ENCODINGS = tuple(_COMPRESSORS)
+
+# Smaller bodies don't get much smaller, if at all.
+_MIN_SIZE = 1024
+
+_COMPRESSIBLE_MEDIA_TYPES = frozenset(
+    [
+        "application/javascript",
+        "application/json",
+        "application/x-ndjson",
+        "application/xml",
+    ]
+)
+
+_VARIANTS_EXTENSION = "content_variants"
+
+
+def is_compressible(content_type: str | None, content: bytes) -> bool:
+    if not content_type or len(content) < _MIN_SIZE:
+        return False
+    media_type = content_type.partition(";")[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type.endswith("+json")
+        or media_type in _COMPRESSIBLE_MEDIA_TYPES
+    )
+
+
+def _parse_qvalue(params: list[str]) -> float:
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """
+    Returns the most preferred of the supported encodings the `Accept-Encoding`
+    header allows, or None, if the body should be sent as is.
+    """
+    if not accept_encoding:
+        return None
+    qvalues = {}
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        if coding := coding.strip().lower():
+            qvalues[coding] = _parse_qvalue(params)
+
+    default = qvalues.get("*", 0.0)
+    encoding = max(ENCODINGS, key=lambda name: qvalues.get(name, default))
+    return encoding if qvalues.get(encoding, default) > 0 else None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return _COMPRESSORS[encoding](content)
+
+
+def get_variants(response: httpx.Response) -> Mapping[str, bytes]:
+    """Returns the body compressed ahead of time, keyed by the encoding."""
+    variants: Mapping[str, bytes] = response.extensions.get(_VARIANTS_EXTENSION, {})
+    return variants
+
+
+def set_variants(response: httpx.Response, variants: Mapping[str, bytes]) -> None:
+    response.extensions[_VARIANTS_EXTENSION] = variants
+
+
+def add_variants(response: httpx.Response) -> None:
+    """
+    Compresses the body with every supported encoding ahead of time, so it's
+    not compressed again for every client, e.g. when the response is cached.
+    Variants the response already has are kept.
+    """
+    if get_variants(response):
+        return
+    if is_compressible(response.headers.get("content-type"), response.content):
+        variants = {name: compress(response.content, name) for name in ENCODINGS}
+        set_variants(response, variants)
@@ -8,31 +8,57 @@ from typing import Annotated
 import httpx
 from fastapi import Depends, Request
 
+from src.api.deps import (
+    CircuitBreakersDeps,
+    ConcurrencyLimitersDeps,
+    HttpClientsDeps,
+)
 from src.config import ServiceConfig, config
 from src.toolkit.asyncio import ConcurrencyLimiter
+from src.toolkit.circuit_breaker import CircuitBreaker
+from src.toolkit.http import get_hop_by_hop_headers
+
+from .snapshot import Snapshot
 
 __all__ = [
+    "CircuitBreakerDeps",
     "ConcurrencyLimiterDeps",
     "HeadersDeps",
+    "HttpClientDeps",
     "RateLimiterKeyDeps",
     "ProxyPathDeps",
     "ServiceConfigDeps",
+    "SnapshotDeps",
 ]
 
-_concurrency_limiters: dict[str, ConcurrencyLimiter] = {}
 
+async def get_circuit_breaker(
+    circuit_breakers: CircuitBreakersDeps, service: ServiceConfigDeps
+) -> CircuitBreaker:
+    return circuit_breakers[service.name]
+
+
+async def get_concurrency_limiter(
+    concurrency_limiters: ConcurrencyLimitersDeps, service: ServiceConfigDeps
+) -> ConcurrencyLimiter:
+    return concurrency_limiters[service.name]
+
+
+async def get_http_client(
+    http_clients: HttpClientsDeps, service: ServiceConfigDeps
+) -> httpx.AsyncClient:
+    return http_clients[service.name]
 
-async def get_concurrency_limiter(service: ServiceConfigDeps) -> ConcurrencyLimiter:
-    if limiter := _concurrency_limiters.get(service.name):
-        return limiter
 
-    limiter = ConcurrencyLimiter(service.max_concurrent_requests)
-    _concurrency_limiters[service.name] = limiter
-    return limiter
+async def get_snapshot(request: Request, service: ServiceConfigDeps) -> Snapshot | None:
+    snapshot: Snapshot | None = request.state.snapshots.get(service.name)
+    return snapshot
 
 
 def get_headers(request: Request) -> Mapping[str, str]:
     headers = request.headers.mutablecopy()
+    for name in get_hop_by_hop_headers(headers.items()):
+        del headers[name]
     headers["x-forwarded-host"] = headers["host"]
     assert request.client is not None
     headers["x-forwarded-for"] = request.client.host
@@ -69,8 +95,11 @@ async def get_limiter_key(request: Request, service: ServiceConfigDeps) -> str:
     return f"{service.name}:{request.client.host}"
 
 
+CircuitBreakerDeps = Annotated[CircuitBreaker, Depends(get_circuit_breaker)]
 ConcurrencyLimiterDeps = Annotated[ConcurrencyLimiter, Depends(get_concurrency_limiter)]
 HeadersDeps = Annotated[Mapping[str, str], Depends(get_headers)]
+HttpClientDeps = Annotated[httpx.AsyncClient, Depends(get_http_client)]
 RateLimiterKeyDeps = Annotated[str, Depends(get_limiter_key)]
 ProxyPathDeps = Annotated[str, Depends(get_proxy_path)]
 ServiceConfigDeps = Annotated[ServiceConfig, Depends(get_service_config)]
+SnapshotDeps = Annotated[Snapshot | None, Depends(get_snapshot)]
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any
+
+import pydantic
+from fastapi import Request
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+
+from src.api.exceptions import (
+    APIError,
+    api_error_exception_handler,
+    rate_limit_error_handler,
+)
+from src.toolkit.rate_limit import RateLimitError
+
+from . import views
+from .deps import get_headers, get_limiter_key
+from .schemas import ProxyBatchRequest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Coroutine
+
+    from fastapi import Response
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+    from src.config import ServiceConfig
+
+    Handler = Callable[[Request, ServiceConfig, str], Coroutine[Any, Any, Response]]
+
+__all__ = [
+    "PROXY_METHODS",
+    "ProxyDispatcher",
+]
+
+PROXY_METHODS = frozenset(
+    ["DELETE", "HEAD", "GET", "OPTIONS", "POST", "PATCH", "PUT", "TRACE"]
+)
+
+_PROXY_PREFIX = "/proxy/"
+_PROXY_BATCH_PREFIX = "/proxy_batch/"
+
+
+def _is_json(content_type: str | None) -> bool:
+    """Tells whether FastAPI would parse a body of that type as JSON."""
+    if not content_type:
+        return True
+    media_type = content_type.partition(";")[0].strip().lower()
+    maintype, _, subtype = media_type.partition("/")
+    return maintype == "application" and (
+        subtype == "json" or subtype.endswith("+json")
+    )
+
+
+def _get_proxy_path(path: str, query_string: bytes) -> str:
+    """Same as `get_service_name_and_path`, but without the service part."""
+    proxy_path = "/".join(part for part in path.split("/") if part not in ("", "."))
+    if query_string:
+        return f"{proxy_path}?{query_string.decode('latin-1')}"
+    return proxy_path
+
+
+async def _read_batch_request(request: Request) -> ProxyBatchRequest:
+    """Validates the request body the same way FastAPI does for a body param."""
+    body: Any = await request.body()
+    if not body:
+        error: dict[str, Any] = {
+            "type": "missing",
+            "loc": ("body",),
+            "msg": "Field required",
+            "input": None,
+        }
+        raise RequestValidationError([error])
+
+    if _is_json(request.headers.get("content-type")):
+        try:
+            body = json.loads(body)
+        except json.JSONDecodeError as exc:
+            error = {
+                "type": "json_invalid",
+                "loc": ("body", exc.pos),
+                "msg": "JSON decode error",
+                "input": {},
+                "ctx": {"error": exc.msg},
+            }
+            raise RequestValidationError([error], body=exc.doc) from exc
+
+    try:
+        return ProxyBatchRequest.model_validate(body, from_attributes=True)
+    except pydantic.ValidationError as exc:
+        errors = [
+            {**error, "loc": ("body", *error["loc"])}
+            for error in exc.errors(include_url=False)
+        ]
+        raise RequestValidationError(errors, body=body) from exc
+
+
+async def _proxy(request: Request, service: ServiceConfig, path: str) -> Response:
+    # the same as FastAPI does, so the metrics middleware knows the endpoint
+    request.scope["endpoint"] = views.proxy
+    state = request.state
+    return await views.proxy(
+        request,
+        http_client=state.http_clients[service.name],
+        cache=state.cache,
+        singleflight=state.singleflight,
+        circuit_breaker=state.circuit_breakers[service.name],
+        concurrency_limiter=state.concurrency_limiters[service.name],
+        limiter=state.limiter,
+        limiter_key=await get_limiter_key(request, service),
+        service=service,
+        headers=get_headers(request),
+        snapshot=state.snapshots.get(service.name),
+        proxy_path=path,
+    )
+
+
+async def _proxy_batch(request: Request, service: ServiceConfig, _: str) -> Response:
+    request.scope["endpoint"] = views.proxy_batch
+    try:
+        payload = await _read_batch_request(request)
+    except RequestValidationError as exc:
+        return await request_validation_exception_handler(request, exc)
+
+    state = request.state
+    return await views.proxy_batch(
+        request,
+        payload,
+        http_client=state.http_clients[service.name],
+        cache=state.cache,
+        singleflight=state.singleflight,
+        circuit_breaker=state.circuit_breakers[service.name],
+        concurrency_limiter=state.concurrency_limiters[service.name],
+        limiter=state.limiter,
+        limiter_key=await get_limiter_key(request, service),
+        service=service,
+        headers=get_headers(request),
+        snapshot=state.snapshots.get(service.name),
+    )
+
+
+class ProxyDispatcher:
+    """
+    Serves the proxy routes straight from the ASGI scope, looking the service
+    up in a table built once, instead of going through the FastAPI routing and
+    dependency resolution on every request.
+
+    Requests the routes would reject, such as to unknown services or with
+    unsupported methods, are passed down to the app as is.
+    """
+
+    def __init__(self, app: ASGIApp, services: list[ServiceConfig]) -> None:
+        self.app = app
+        self._services = {service.name: service for service in services}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match = self._match(scope) if scope["type"] == "http" else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        handler, service, path = match
+        request = Request(scope, receive, send)
+        try:
+            response = await handler(request, service, path)
+        except APIError as exc:
+            response = await api_error_exception_handler(request, exc)
+        except RateLimitError as exc:
+            response = await rate_limit_error_handler(request, exc)
+        await response(scope, receive, send)
+
+    def _match(self, scope: Scope) -> tuple[Handler, ServiceConfig, str] | None:
+        path: str = scope["path"]
+        method: str = scope["method"]
+        if path.startswith(_PROXY_PREFIX) and method in PROXY_METHODS:
+            name, sep, rest = path[len(_PROXY_PREFIX) :].partition("/")
+            service = self._services.get(name)
+            if service is not None and sep:
+                return _proxy, service, _get_proxy_path(rest, scope["query_string"])
+        elif path.startswith(_PROXY_BATCH_PREFIX) and method == "POST":
+            service = self._services.get(path[len(_PROXY_BATCH_PREFIX) :])
+            if service is not None:
+                return _proxy_batch, service, ""
+        return None
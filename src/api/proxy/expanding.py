@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+import httpx
+
+__all__ = [
+    "collect_links",
+    "inline_links",
+    "split_expand",
+]
+
+_EXPAND_PARAM = "expand"
+
+
+def split_expand(path: str) -> tuple[str, list[str]]:
+    """
+    Removes the `expand` query parameter from the path, and returns the path
+    along with the fields listed in the parameter.
+    """
+    url = httpx.URL(path)
+    values = url.params.get_list(_EXPAND_PARAM)
+    if not values:
+        return path, []
+    fields = (field.strip() for value in values for field in value.split(","))
+    unique_fields = list(dict.fromkeys(filter(None, fields)))
+    return str(url.copy_remove_param(_EXPAND_PARAM)), unique_fields
+
+
+def _iter_objects(content: Any) -> Iterator[dict[str, Any]]:
+    """Yields the resource itself, or every resource of a list response."""
+    if not isinstance(content, dict):
+        return
+    yield content
+    results = content.get("results")
+    if isinstance(results, list):
+        yield from (item for item in results if isinstance(item, dict))
+
+
+def _to_path(url: Any, base_url: str) -> str | None:
+    base_url = base_url.rstrip("/") + "/"
+    if isinstance(url, str) and url.startswith(base_url):
+        return "/" + url[len(base_url) :]
+    return None
+
+
+def _iter_links(value: Any) -> Iterable[Any]:
+    return value if isinstance(value, list) else [value]
+
+
+def collect_links(content: Any, fields: list[str], base_url: str) -> set[str]:
+    """
+    Returns paths of the resources the given fields link to. Only links to the
+    service itself are collected, any other URLs are left alone.
+    """
+    paths = set()
+    for obj in _iter_objects(content):
+        for field in fields:
+            for url in _iter_links(obj.get(field)):
+                if path := _to_path(url, base_url):
+                    paths.add(path)
+    return paths
+
+
+def inline_links(
+    content: Any,
+    fields: list[str],
+    base_url: str,
+    resources: Mapping[str, Any],
+) -> None:
+    """
+    Replaces links in the given fields with the resources they point to. Links
+    to the resources that are missing in `resources` are kept as is.
+    """
+
+    def resolve(url: Any) -> Any:
+        path = _to_path(url, base_url)
+        return resources.get(path, url) if path else url
+
+    for obj in _iter_objects(content):
+        for field in fields:
+            if field not in obj:
+                continue
+            value = obj[field]
+            if isinstance(value, list):
+                obj[field] = [resolve(url) for url in value]
+            else:
+                obj[field] = resolve(value)
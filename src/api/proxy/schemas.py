@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
 from http import HTTPMethod
 from typing import Annotated, Any, Literal, Self
 
 import httpx
+import orjson
 from pydantic import AfterValidator, BaseModel, Field, model_validator
 
 from src.api.exceptions import APIError
@@ -19,6 +21,8 @@ def _normalize_path(value: str) -> str:
 class ProxyBatchItemSchema(BaseModel):
     method: Literal[HTTPMethod.GET] = HTTPMethod.GET
     path: Annotated[str, AfterValidator(_normalize_path)]
+    # the ETag of the response the client already has
+    etag: str | None = None
 
 
 class ProxyBatchRequest(BaseModel):
@@ -36,7 +40,10 @@ class ProxyBatchRequest(BaseModel):
 
 class ProxyBatchResponseItemResult(BaseModel):
     status_code: int
-    content: dict[str, Any] | str | bytes
+    content: dict[str, Any] | str | bytes | None
+    etag: str | None = None
+    # the response has the same ETag as the item, so the content is omitted
+    not_modified: bool = False
 
 
 class ProxyBatchResponseItemError(BaseModel):
@@ -50,16 +57,6 @@ class ProxyBatchResponseItem(BaseModel):
     result: ProxyBatchResponseItemResult | None = None
     error: ProxyBatchResponseItemError | None = None
 
-    @classmethod
-    def from_result(cls, path: str, result: httpx.Response) -> Self:
-        return cls(
-            path=path,
-            result=ProxyBatchResponseItemResult(
-                status_code=result.status_code,
-                content=result.json(),
-            ),
-        )
-
     @classmethod
     def from_error(cls, path: str, error: APIError) -> Self:
         return cls(
@@ -77,3 +74,48 @@ class ProxyBatchResponseItem(BaseModel):
 
 class ProxyBatchResponse(BaseModel):
     items: list[ProxyBatchResponseItem]
+
+
+def dump_batch_item(path: str, result: httpx.Response | APIError) -> bytes:
+    """
+    Serializes the batch item the same way as `ProxyBatchResponseItem` does,
+    but splices the upstream body into the item as is, once it's known to be
+    valid JSON, instead of parsing it and serializing it back.
+
+    A body that is not valid JSON is passed as a string. Line breaks can only
+    be insignificant whitespace in valid JSON, so they are dropped to keep the
+    item on a single line.
+    """
+    if isinstance(result, APIError):
+        item = ProxyBatchResponseItem.from_error(path, result)
+        return item.model_dump_json().encode()
+
+    not_modified = result.status_code == 304
+    content = b"null" if not_modified else result.content
+    try:
+        orjson.loads(content)
+    except orjson.JSONDecodeError:
+        content = orjson.dumps(result.text)
+    else:
+        content = content.replace(b"\n", b"").replace(b"\r", b"")
+
+    return b"".join(
+        [
+            b'{"path":',
+            orjson.dumps(path),
+            b',"result":{"status_code":',
+            str(result.status_code).encode(),
+            b',"content":',
+            content,
+            b',"etag":',
+            orjson.dumps(result.headers.get("etag")),
+            b',"not_modified":',
+            b"true" if not_modified else b"false",
+            b'},"error":null}',
+        ]
+    )
+
+
+def dump_batch_response(items: Iterable[bytes]) -> bytes:
+    """Assembles items serialized with `dump_batch_item` into the response."""
+    return b'{"items":[' + b",".join(items) + b"]}"
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import gzip
+import logging
+import math
+import os
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any, Self
+
+import httpx
+import orjson
+
+__all__ = [
+    "Collections",
+    "Snapshot",
+    "crawl",
+    "dump_collections",
+    "load_collections",
+]
+
+logger = logging.getLogger(__name__)
+
+Collections = dict[str, list[dict[str, Any]]]
+
+# the same as the upstream pages lists
+_PAGE_SIZE = 10
+
+# the fields the upstream looks `?search=` up in, by the collection
+_SEARCH_FIELDS = {
+    "films": ("title",),
+    "starships": ("name", "model"),
+    "vehicles": ("name", "model"),
+}
+_DEFAULT_SEARCH_FIELDS = ("name",)
+
+# requests with any other query parameters are passed to the upstream
+_QUERY_PARAMS = frozenset(["format", "page", "search"])
+
+_JSON_HEADERS = {"content-type": "application/json"}
+_NOT_FOUND = b'{"detail":"Not found"}'
+
+
+def load_collections(path: Path) -> Collections:
+    """Reads collections of resources from JSON, gzipped if the suffix is `.gz`."""
+    data = path.read_bytes()
+    if path.suffix == ".gz":
+        data = gzip.decompress(data)
+    collections: Collections = orjson.loads(data)
+    return collections
+
+
+def dump_collections(collections: Collections, path: Path) -> None:
+    """
+    Writes collections of resources as compact JSON, gzipped if the suffix is
+    `.gz`. The file is replaced at once, so it's never read half-written.
+    """
+    data = orjson.dumps(collections)
+    if path.suffix == ".gz":
+        data = gzip.compress(data, mtime=0)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+async def crawl(client: httpx.AsyncClient, base_url: str) -> Collections:
+    """
+    Fetches every resource of the service, following the collections listed
+    at the root and the `next` links of their pages.
+    """
+
+    async def fetch(url: str) -> list[dict[str, Any]]:
+        items = []
+        while url:
+            response = await client.get(url)
+            response.raise_for_status()
+            page = response.json()
+            items.extend(page["results"])
+            url = page["next"]
+        return items
+
+    response = await client.get(base_url.rstrip("/") + "/")
+    response.raise_for_status()
+    root: dict[str, str] = response.json()
+    results = await asyncio.gather(*(fetch(url) for url in root.values()))
+    return dict(zip(root, results, strict=True))
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _json_response(content: bytes, status_code: int = 200) -> httpx.Response:
+    return httpx.Response(status_code, headers=_JSON_HEADERS, content=content)
+
+
+class _Collection:
+    """
+    Resources of a collection in the upstream order, along with an inverted
+    index of trigrams of the searched fields, so a search only looks at the
+    resources having every trigram of the query.
+    """
+
+    def __init__(self, items: list[dict[str, Any]], search_fields: Iterable[str]):
+        self.items = items
+        self._texts = [
+            [str(item.get(field, "")).lower() for field in search_fields]
+            for item in items
+        ]
+        self._index: dict[str, set[int]] = {}
+        for i, texts in enumerate(self._texts):
+            for text in texts:
+                for trigram in _trigrams(text):
+                    self._index.setdefault(trigram, set()).add(i)
+
+    def search(self, query: str) -> list[dict[str, Any]]:
+        query = query.lower()
+        candidates: Iterable[int] = range(len(self.items))
+        if trigrams := _trigrams(query):
+            sets = [self._index.get(trigram, set()) for trigram in trigrams]
+            candidates = sorted(set.intersection(*sets))
+        return [
+            self.items[i]
+            for i in candidates
+            if any(query in text for text in self._texts[i])
+        ]
+
+
+class _Data:
+    def __init__(self, collections: Collections, base_url: str):
+        self.base_url = base_url
+        self.root = orjson.dumps({name: f"{base_url}{name}/" for name in collections})
+        self.collections = {
+            name: _Collection(items, _SEARCH_FIELDS.get(name, _DEFAULT_SEARCH_FIELDS))
+            for name, items in collections.items()
+        }
+        # pre-serialized, so a resource is served without encoding it again
+        self.resources = {
+            url.removeprefix(base_url).strip("/"): orjson.dumps(item)
+            for items in collections.values()
+            for item in items
+            if isinstance(url := item.get("url"), str) and url.startswith(base_url)
+        }
+
+
+class Snapshot:
+    """
+    Serves GET requests to a service from resources crawled ahead of time,
+    including the list pages and `?search=`, without calling the upstream.
+
+    Requests the snapshot can't answer the same way as the upstream, e.g.
+    with other query parameters or to unknown collections, are left to the
+    upstream. The snapshot is reloaded every `reload_interval` seconds, if
+    the file has changed, e.g. after it's been crawled again.
+    """
+
+    def __init__(self, path: Path, base_url: str, reload_interval: float = 0) -> None:
+        self._path = path
+        self._base_url = base_url.rstrip("/") + "/"
+        self._reload_interval = reload_interval
+        self._mtime = os.stat(path).st_mtime_ns
+        self._data = _Data(load_collections(path), self._base_url)
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        if self._reload_interval > 0:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def reload(self) -> None:
+        """Loads the file again, if it has changed since it was loaded."""
+        mtime = os.stat(self._path).st_mtime_ns
+        if mtime != self._mtime:
+            self._data = _Data(load_collections(self._path), self._base_url)
+            self._mtime = mtime
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._reload_interval)
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Failed to reload the snapshot.")
+
+    def get(self, path: str) -> httpx.Response | None:
+        """
+        Returns the response the upstream would've given to a GET request to
+        the path, or None, if the request has to go to the upstream.
+        """
+        url = httpx.URL(path)
+        params = url.params
+        if params.keys() - _QUERY_PARAMS or params.get("format", "json") != "json":
+            return None
+
+        data = self._data
+        parts = [part for part in url.path.split("/") if part]
+        if not parts:
+            return _json_response(data.root)
+
+        collection = data.collections.get(parts[0])
+        if collection is None or len(parts) > 2:
+            return None
+        if len(parts) == 2:
+            content = data.resources.get("/".join(parts))
+            if content is None:
+                return _json_response(_NOT_FOUND, 404)
+            return _json_response(content)
+        return _get_page(data, parts[0], collection, params)
+
+
+def _get_page(
+    data: _Data, name: str, collection: _Collection, params: Mapping[str, str]
+) -> httpx.Response:
+    """Returns a page of the collection, with the resources matching `?search=`."""
+    search = params.get("search")
+    items = collection.items if search is None else collection.search(search)
+    page_count = max(1, math.ceil(len(items) / _PAGE_SIZE))
+    try:
+        page = int(params.get("page", "1"))
+    except ValueError:
+        page = 0
+    if not 1 <= page <= page_count:
+        return _json_response(_NOT_FOUND, 404)
+
+    def page_url(number: int) -> str | None:
+        if not 1 <= number <= page_count:
+            return None
+        query = httpx.QueryParams({"search": search} if search is not None else {})
+        return f"{data.base_url}{name}/?{query.set('page', number)}"
+
+    start = (page - 1) * _PAGE_SIZE
+    content = {
+        "count": len(items),
+        "next": page_url(page + 1),
+        "previous": page_url(page - 1),
+        "results": items[start : start + _PAGE_SIZE],
+    }
+    return _json_response(orjson.dumps(content))
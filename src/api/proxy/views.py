@@ -1,34 +1,78 @@
 import asyncio
-from collections.abc import Awaitable, Mapping
-from typing import TypeAlias, TypeVar
+import contextlib
+import logging
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Mapping
+from typing import Any, TypeAlias, TypeVar
 
 import httpx
+import orjson
 from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from src.api import exceptions
-from src.api.deps import HttpClientDeps, RateLimiterDeps
+from src.api import exceptions, metrics
+from src.api.deps import (
+    CacheDeps,
+    RateLimiterDeps,
+    SingleFlightDeps,
+)
+from src.config import ServiceConfig
+from src.toolkit.asyncio import ConcurrencyLimiter, ConcurrencyLimitError, SingleFlight
+from src.toolkit.cache import Cache
+from src.toolkit.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.toolkit.http import get_hop_by_hop_headers
+from src.toolkit.rate_limit import Limit, RateLimiter, RateLimitError
 
+from . import caching, compression, expanding
 from .deps import (
+    CircuitBreakerDeps,
     ConcurrencyLimiterDeps,
     HeadersDeps,
+    HttpClientDeps,
     ProxyPathDeps,
     RateLimiterKeyDeps,
     ServiceConfigDeps,
+    SnapshotDeps,
 )
-from .schemas import (
-    ProxyBatchRequest,
-    ProxyBatchResponse,
-    ProxyBatchResponseItem,
-)
+from .schemas import ProxyBatchRequest, dump_batch_item, dump_batch_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 T = TypeVar("T")
 
 QueryParams: TypeAlias = Mapping[str, str]
+BatchResult: TypeAlias = httpx.Response | exceptions.APIError
 
 _METHODS_WITH_BODY = ["patch", "post", "put"]
 
+_NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Keeps references to the background tasks, so they're not garbage collected.
+_background_tasks: set[asyncio.Task[None]] = set()
+
+# Request headers that commonly affect the response, identical requests that
+# differ in any of these headers are never coalesced. The encoding is not one
+# of them, as the upstream body is decoded and then encoded for every client.
+_COALESCE_BY_HEADERS = (
+    "accept",
+    "accept-language",
+    "authorization",
+    "cookie",
+)
+
+# Headers describing the upstream body, which are not valid for a rewritten one.
+_CONTENT_HEADERS = frozenset(["content-encoding", "content-length", "etag"])
+
+# Headers describing the upstream body as it was sent, not as httpx decoded it.
+_ENCODING_HEADERS = frozenset(["content-encoding", "content-length"])
+
+# Conditional GET request headers of the client, which the proxy evaluates
+# itself, as the upstream response can be shared with other clients.
+_CONDITIONAL_HEADERS = frozenset(["if-modified-since", "if-none-match"])
+
 
 async def _reraise_httpx_errors(coro: Awaitable[T]) -> T:
     try:
@@ -41,6 +85,75 @@ async def _reraise_httpx_errors(coro: Awaitable[T]) -> T:
         raise exceptions.APIError() from exc
 
 
+async def _limit_rate(
+    limiter: RateLimiter, key: str, service: ServiceConfig, cost: int = 1
+) -> None:
+    """
+    Checks the request against every rate limit rule of the service at once,
+    each rule counting requests under its own key.
+    """
+    limits = []
+    for rule in service.get_rate_limits():
+        scope_key = key if rule.scope == "client" else service.name
+        limit_key = f"{scope_key}:{rule.limit}/{rule.period}"
+        limits.append(Limit(limit_key, limit=rule.limit, period=rule.period))
+    started_at, decision = time.perf_counter(), "error"
+    try:
+        await limiter.limit_many(limits, cost=cost)
+        decision = "allowed"
+    except RateLimitError:
+        decision = "denied"
+        raise
+    finally:
+        duration = time.perf_counter() - started_at
+        metrics.rate_limit_duration.labels(service.name).observe(duration)
+        metrics.rate_limit_decisions.labels(service.name, decision).inc()
+
+
+async def _call_upstream(
+    circuit_breaker: CircuitBreaker,
+    concurrency_limiter: ConcurrencyLimiter,
+    coro: Coroutine[Any, Any, T],
+) -> T:
+    """
+    Makes the upstream call, unless the circuit is open, as soon as the
+    concurrency limit allows. Upstream errors are left to `_reraise_httpx_errors`.
+    """
+    try:
+        with circuit_breaker:
+            return await concurrency_limiter(coro)
+    except CircuitOpenError as exc:
+        coro.close()
+        raise exceptions.CircuitOpen() from exc
+    except ConcurrencyLimitError as exc:
+        raise exceptions.ServiceUnavailable() from exc
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _cancel_on_disconnect(request: Request, coro: Awaitable[T]) -> T:
+    """
+    Awaits the coroutine, unless the client disconnects first. Must not be used
+    when the request body is yet to be read.
+    """
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait(
+            [task, watcher], return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        watcher.cancel()
+        task.cancel()
+
+    if task not in done:
+        raise exceptions.ClientClosedRequest()
+    return task.result()
+
+
 async def _return_exceptions(coro: Awaitable[T]) -> T | exceptions.APIError:
     try:
         return await _reraise_httpx_errors(coro)
@@ -48,92 +161,565 @@ async def _return_exceptions(coro: Awaitable[T]) -> T | exceptions.APIError:
         return exc
 
 
+def _refresh_in_background(coro: Awaitable[httpx.Response]) -> None:
+    """
+    Runs the upstream call in a task that outlives the request. Failures are
+    ignored, the stale entry is served until it's refreshed or gone.
+    """
+
+    async def refresh() -> None:
+        with contextlib.suppress(httpx.HTTPError, exceptions.APIError):
+            await coro
+
+    task = asyncio.ensure_future(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 def _make_proxy_url(base_url: str, path: str) -> str:
     if not base_url.endswith("/") and not path.startswith("/"):
         return f"{base_url}/{path}"
     return f"{base_url}{path}"
 
 
+def _make_cache_key(path: str) -> str:
+    return f"/{path.lstrip('/')}"
+
+
+def _with_accept_encoding(
+    headers: Mapping[str, str], accept_encoding: str | None
+) -> list[tuple[str, str]]:
+    """
+    Replaces the `Accept-Encoding` header. Without one, httpx asks for the
+    encodings it can decode.
+    """
+    items = [
+        (name, value)
+        for name, value in headers.items()
+        if name.lower() != "accept-encoding"
+    ]
+    if accept_encoding is not None:
+        items.append(("accept-encoding", accept_encoding))
+    return items
+
+
+def _with_validators(
+    headers: list[tuple[str, str]], cached: caching.CachedResponse | None
+) -> list[tuple[str, str]]:
+    """
+    Replaces the client's conditional headers with the ones revalidating
+    the cached response, if there is one.
+    """
+    items = [
+        (name, value)
+        for name, value in headers
+        if name.lower() not in _CONDITIONAL_HEADERS
+    ]
+    if cached is not None:
+        items.extend(caching.get_validators(cached.response).items())
+    return items
+
+
+async def _get_cached(cache: Cache, service: ServiceConfig, key: str) -> bytes | None:
+    """Gets a response from the cache, a backend error counts as a miss."""
+    try:
+        return await cache.get(service.name, key, service.cache_max_size)
+    except Exception:
+        logger.exception("Failed to get a response from the cache.")
+        metrics.cache_errors.labels(service.name, "get").inc()
+        return None
+
+
+async def _set_cached(
+    cache: Cache, service: ServiceConfig, key: str, data: bytes, ttl: int
+) -> None:
+    """Stores a response in the cache, a backend error is only logged."""
+    try:
+        await cache.set(
+            service.name, key, data, ttl=ttl, max_size=service.cache_max_size
+        )
+    except Exception:
+        logger.exception("Failed to store a response in the cache.")
+        metrics.cache_errors.labels(service.name, "set").inc()
+
+
+async def _get(
+    http_client: httpx.AsyncClient,
+    cache: Cache,
+    singleflight: SingleFlight,
+    circuit_breaker: CircuitBreaker,
+    concurrency_limiter: ConcurrencyLimiter,
+    service: ServiceConfig,
+    path: str,
+    headers: Mapping[str, str],
+) -> httpx.Response:
+    """
+    Makes a GET request to a given service through the response cache.
+    Identical concurrent requests share a single upstream call, which takes
+    a single slot of the concurrency limiter.
+
+    A stale response is served for `cache_stale_while_revalidate` seconds while
+    it's refreshed in the background, and for `cache_stale_if_error` seconds
+    when the upstream fails or responds with a server error. A stale response
+    is refreshed with a conditional request, if it has validators.
+    """
+    cache_key = _make_cache_key(path)
+    use_cache = service.cache_ttl > 0 and caching.is_cacheable_request(headers)
+    data = await _get_cached(cache, service, cache_key) if use_cache else None
+    cached = caching.load_response(data, headers) if data else None
+
+    async def fetch() -> httpx.Response:
+        response = await _call_upstream(
+            circuit_breaker,
+            concurrency_limiter,
+            http_client.get(
+                _make_proxy_url(str(service.host), path),
+                headers=_with_validators(_with_accept_encoding(headers, None), cached),
+                follow_redirects=True,
+            ),
+        )
+        if response.status_code == 304 and cached is not None:
+            response = caching.refresh_response(cached.response, response)
+
+        if use_cache and (ttl := caching.get_ttl(response, service.cache_ttl)):
+            compression.add_variants(response)
+            grace = max(
+                service.cache_stale_while_revalidate,
+                service.cache_stale_if_error,
+                service.cache_keep_stale,
+            )
+            await _set_cached(
+                cache,
+                service,
+                cache_key,
+                caching.dump_response(response, headers, ttl=ttl),
+                ttl=ttl + grace,
+            )
+        return response
+
+    flight_key = (
+        service.name,
+        "GET",
+        cache_key,
+        *(headers.get(name) for name in _COALESCE_BY_HEADERS),
+    )
+
+    if cached is not None and cached.is_fresh():
+        metrics.cache_lookups.labels(service.name, "hit").inc()
+        return cached.response
+
+    if cached is not None and cached.is_stale_within(
+        service.cache_stale_while_revalidate
+    ):
+        metrics.cache_lookups.labels(service.name, "stale").inc()
+        _refresh_in_background(singleflight(flight_key, fetch))
+        return cached.response
+
+    if use_cache:
+        metrics.cache_lookups.labels(service.name, "miss").inc()
+
+    stale_if_error = service.cache_stale_if_error
+    try:
+        response = await singleflight(flight_key, fetch)
+    except (httpx.HTTPError, exceptions.APIError):
+        if cached is None or not cached.is_stale_within(stale_if_error):
+            raise
+        return cached.response
+
+    if response.status_code >= 500 and (
+        cached is not None and cached.is_stale_within(stale_if_error)
+    ):
+        return cached.response
+    return response
+
+
+async def _get_expanded(
+    get: Callable[[str], Awaitable[httpx.Response]],
+    charge: Callable[[int], Awaitable[None]],
+    service: ServiceConfig,
+    path: str,
+    fields: list[str],
+) -> httpx.Response:
+    """
+    Makes a GET request and inlines the resources the given fields of the
+    response link to. Every linked resource is fetched once, concurrently,
+    and is charged to the rate limiter. Links that can't be fetched are kept.
+    """
+    response = await get(path)
+    if not fields or response.status_code != 200:
+        return response
+    try:
+        content = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+        return response
+
+    base_url = str(service.host)
+    paths = expanding.collect_links(content, fields, base_url)
+    if not paths:
+        return response
+
+    await charge(len(paths))
+    async with asyncio.TaskGroup() as tg:
+        tasks = {path: tg.create_task(_return_exceptions(get(path))) for path in paths}
+
+    resources = {}
+    for path, task in tasks.items():
+        result = task.result()
+        if isinstance(result, httpx.Response) and result.status_code == 200:
+            with contextlib.suppress(orjson.JSONDecodeError):
+                resources[path] = orjson.loads(result.content)
+
+    expanding.inline_links(content, fields, base_url, resources)
+    headers = [
+        (name, value)
+        for name, value in response.headers.multi_items()
+        if name not in _CONTENT_HEADERS
+    ]
+    return httpx.Response(200, headers=headers, content=orjson.dumps(content))
+
+
+async def _iter_raw(response: httpx.Response) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in response.aiter_raw():
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+def _add_vary(vary: str | None, name: str) -> str:
+    if not vary:
+        return name
+    names = {item.strip().lower() for item in vary.split(",")}
+    if name.lower() in names or "*" in names:
+        return vary
+    return f"{vary}, {name}"
+
+
+def _weaken_etag(response: Response) -> None:
+    """
+    Makes the `ETag` weak, as a strong one must differ between representations,
+    e.g. the ones compressed with different encodings.
+    """
+    etag = response.headers.get("etag")
+    if etag is not None and not etag.startswith("W/"):
+        response.headers["etag"] = f"W/{etag}"
+
+
+def _compress_response(
+    response: Response,
+    accept_encoding: str | None,
+    variants: Mapping[str, bytes] | None = None,
+) -> Response:
+    """
+    Compresses the body with the most preferred encoding the client accepts,
+    using the variant compressed ahead of time, if there is one.
+    """
+    if not compression.is_compressible(
+        response.headers.get("content-type"), response.body
+    ):
+        return response
+
+    response.headers["vary"] = _add_vary(
+        response.headers.get("vary"), "Accept-Encoding"
+    )
+    if encoding := compression.negotiate(accept_encoding):
+        if variants and encoding in variants:
+            response.body = variants[encoding]
+        else:
+            response.body = compression.compress(response.body, encoding)
+        response.headers["content-encoding"] = encoding
+        response.headers["content-length"] = str(len(response.body))
+        _weaken_etag(response)
+    return response
+
+
+def _make_response(
+    response: httpx.Response, accept_encoding: str | None, *, head: bool = False
+) -> Response:
+    """
+    Makes a response out of the decoded upstream one, which is compressed again
+    according to what the client accepts.
+
+    A response to HEAD has no body to measure, so it keeps the upstream
+    `Content-Length`, unless that's the length of an encoded body, in which
+    case the length is left out.
+    """
+    skip_headers = get_hop_by_hop_headers(response.headers.items()) | _ENCODING_HEADERS
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in skip_headers
+    }
+    result = Response(
+        response.content, status_code=response.status_code, headers=headers
+    )
+    if head:
+        del result.headers["content-length"]
+        length = response.headers.get("content-length")
+        if length is not None and "content-encoding" not in response.headers:
+            result.headers["content-length"] = length
+    return _compress_response(
+        result, accept_encoding, compression.get_variants(response)
+    )
+
+
+def _make_conditional_response(
+    response: httpx.Response, headers: Mapping[str, str], accept_encoding: str | None
+) -> Response:
+    """
+    Makes a response to a GET request, which is 304, if the client has the
+    response already. The `ETag` of 304 is weak, the same as it would be in the
+    full response, if the body would be compressed for the client.
+    """
+    caching.add_etag(response)
+    if not caching.is_not_modified(headers, response):
+        return _make_response(response, accept_encoding)
+
+    result = _make_response(caching.make_not_modified(response), accept_encoding)
+    content_type = response.headers.get("content-type")
+    compressible = compression.is_compressible(content_type, response.content)
+    if compressible and compression.negotiate(accept_encoding):
+        _weaken_etag(result)
+    return result
+
+
+def _get_upstream_accept_encoding(
+    method: str, accept_encoding: str | None, *, stream: bool
+) -> str | None:
+    """
+    Returns the `Accept-Encoding` to send upstream, None for the httpx default.
+    """
+    # a streamed body is passed through, so it must be in an encoding the
+    # client accepts, and not in the ones httpx asks for by default
+    if stream:
+        return accept_encoding or "identity"
+    # the upstream length of the body is passed on, see `_make_response`
+    if method == "HEAD":
+        return "identity"
+    return None
+
+
+def _make_streaming_response(response: httpx.Response) -> StreamingResponse:
+    """
+    Streams the upstream response body as is, without decoding it, along with
+    its `Content-Encoding`. The upstream response is closed when the body is
+    consumed, fails or the client disconnects, whatever comes first.
+    """
+    skip_headers = get_hop_by_hop_headers(response.headers.items())
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in skip_headers
+    }
+    return StreamingResponse(
+        _iter_raw(response),
+        status_code=response.status_code,
+        headers=headers,
+        background=BackgroundTask(response.aclose),
+    )
+
+
 async def proxy(
     request: Request,
     http_client: HttpClientDeps,
+    cache: CacheDeps,
+    singleflight: SingleFlightDeps,
+    circuit_breaker: CircuitBreakerDeps,
+    concurrency_limiter: ConcurrencyLimiterDeps,
     limiter: RateLimiterDeps,
     limiter_key: RateLimiterKeyDeps,
     service: ServiceConfigDeps,
     headers: HeadersDeps,
+    snapshot: SnapshotDeps,
     proxy_path: ProxyPathDeps,
-):
-    """Proxies a request to a given service."""
+) -> Response:
+    """
+    Proxies a request to a given service. Requests without a body stop waiting
+    for the upstream as soon as the client disconnects.
+
+    GET requests can list fields with links to inline in the `expand` query
+    parameter, e.g. `?expand=characters,planets`.
+
+    Streamed responses are passed through in the encoding the upstream chose
+    from the ones the client accepts. Buffered responses are decoded, and are
+    compressed by the proxy itself.
+
+    Buffered GET responses get an `ETag`, unless the upstream provided one, and
+    conditional GET requests are answered with 304 by the proxy.
+
+    GET requests to a service with a snapshot are answered from it, when it
+    has the resource, without calling the upstream.
+    """
     url = _make_proxy_url(str(service.host), proxy_path)
-    await limiter.limit(
-        key=limiter_key,
-        limit=service.rate_limit,
-        limit_period=service.rate_limit_period,
-    )
+    accept_encoding = headers.get("accept-encoding")
+    await _limit_rate(limiter, limiter_key, service)
+
+    path, expand = expanding.split_expand(proxy_path)
+
+    async def get(path: str) -> httpx.Response:
+        if snapshot is not None and (response := snapshot.get(path)) is not None:
+            return response
+        return await _get(
+            http_client,
+            cache,
+            singleflight,
+            circuit_breaker,
+            concurrency_limiter,
+            service,
+            path,
+            headers,
+        )
+
+    def charge(cost: int) -> Awaitable[None]:
+        return _limit_rate(limiter, limiter_key, service, cost=cost)
+
+    # cached, snapshot and expanded responses have to be buffered anyway
+    if request.method == "GET" and (
+        expand
+        or service.cache_ttl
+        or snapshot is not None
+        or not service.stream_responses
+    ):
+        response = await _cancel_on_disconnect(
+            request,
+            _reraise_httpx_errors(_get_expanded(get, charge, service, path, expand)),
+        )
+        return _make_conditional_response(response, headers, accept_encoding)
 
     content = None
     if request.method.lower() in _METHODS_WITH_BODY:
         content = request.stream()
 
-    response = await _reraise_httpx_errors(
-        http_client.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            content=content,
-            timeout=service.timeout,
-            follow_redirects=True,
+    upstream_accept_encoding = _get_upstream_accept_encoding(
+        request.method, accept_encoding, stream=service.stream_responses
+    )
+    upstream_request = http_client.build_request(
+        method=request.method,
+        url=url,
+        headers=_with_accept_encoding(headers, upstream_accept_encoding),
+        content=content,
+    )
+    send = _reraise_httpx_errors(
+        _call_upstream(
+            circuit_breaker,
+            concurrency_limiter,
+            http_client.send(
+                upstream_request,
+                stream=service.stream_responses,
+                follow_redirects=True,
+            ),
         )
     )
+    if content is None:
+        send = _cancel_on_disconnect(request, send)
+    response = await send
+
+    if service.stream_responses:
+        return _make_streaming_response(response)
+    return _make_response(response, accept_encoding, head=request.method == "HEAD")
+
+
+async def _with_path(path: str, coro: Awaitable[T]) -> tuple[str, T]:
+    return path, await coro
 
-    return Response(
-        response.content,
-        status_code=response.status_code,
-        headers=response.headers,
-        media_type=response.headers["Content-Type"],
-    )
+
+async def _iter_batch_items(
+    paths: list[str],
+    fetch: Callable[[str], Coroutine[Any, Any, BatchResult]],
+) -> AsyncIterator[bytes]:
+    """
+    Yields batch items as NDJSON in the order the calls complete. Calls that
+    are still in flight are cancelled if the client goes away.
+    """
+    pending = {asyncio.create_task(_with_path(path, fetch(path))) for path in paths}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield dump_batch_item(*task.result()) + b"\n"
+    finally:
+        for task in pending:
+            task.cancel()
 
 
 async def proxy_batch(
+    request: Request,
     payload: ProxyBatchRequest,
     http_client: HttpClientDeps,
+    cache: CacheDeps,
+    singleflight: SingleFlightDeps,
+    circuit_breaker: CircuitBreakerDeps,
     concurrency_limiter: ConcurrencyLimiterDeps,
     limiter: RateLimiterDeps,
     limiter_key: RateLimiterKeyDeps,
     service: ServiceConfigDeps,
     headers: HeadersDeps,
-):
-    """Aggregates multiple calls to the proxy API in a single call."""
-    await limiter.limit(
-        key=limiter_key,
-        limit=service.rate_limit,
-        limit_period=service.rate_limit_period,
-        cost=len(payload.items),
-    )
+    snapshot: SnapshotDeps,
+) -> Response:
+    """
+    Aggregates multiple calls to the proxy API in a single call.
 
-    tasks = {}
-    async with asyncio.TaskGroup() as tg:
-        for item in payload.items:
-            tasks[item.path] = tg.create_task(
-                concurrency_limiter(
-                    _return_exceptions(
-                        http_client.request(
-                            method=str(item.method),
-                            url=_make_proxy_url(str(service.host), item.path),
-                            headers=headers,
-                            timeout=service.timeout,
-                        )
-                    )
-                )
-            )
+    With `Accept: application/x-ndjson` the items are streamed one per line as
+    soon as each call completes, instead of waiting for all of them.
 
-    items = []
-    for path, task in tasks.items():
-        response_or_exc: httpx.Response | exceptions.APIError = task.result()
-        if isinstance(response_or_exc, httpx.Response):
-            schema = ProxyBatchResponseItem.from_result(path, response_or_exc)
-        else:
-            schema = ProxyBatchResponseItem.from_error(path, response_or_exc)
-        items.append(schema)
+    Item paths can have the `expand` query parameter, the same as the proxy.
+
+    Items can have the `etag` of the response the client already has, in which
+    case the result is `not_modified` and has no content, if it's still valid.
+    """
+    metrics.batch_size.labels(service.name).observe(len(payload.items))
+    await _limit_rate(limiter, limiter_key, service, cost=len(payload.items))
+
+    async def get(path: str) -> httpx.Response:
+        if snapshot is not None and (response := snapshot.get(path)) is not None:
+            return response
+        return await _get(
+            http_client,
+            cache,
+            singleflight,
+            circuit_breaker,
+            concurrency_limiter,
+            service,
+            path,
+            headers,
+        )
 
-    return ProxyBatchResponse(items=items)
+    async def charge(cost: int) -> None:
+        try:
+            await _limit_rate(limiter, limiter_key, service, cost=cost)
+        except RateLimitError as exc:
+            raise exceptions.RateLimit() from exc
+
+    etags = {item.path: item.etag for item in payload.items if item.etag}
+
+    async def fetch(item_path: str) -> BatchResult:
+        path, expand = expanding.split_expand(item_path)
+        result = await _return_exceptions(
+            _get_expanded(get, charge, service, path, expand)
+        )
+        if isinstance(result, httpx.Response):
+            caching.add_etag(result)
+            etag = etags.get(item_path)
+            if etag and caching.is_not_modified({"if-none-match": etag}, result):
+                return caching.make_not_modified(result)
+        return result
+
+    paths = [item.path for item in payload.items]
+    if _NDJSON_MEDIA_TYPE in headers.get("accept", ""):
+        return StreamingResponse(
+            _iter_batch_items(paths, fetch),
+            media_type=_NDJSON_MEDIA_TYPE,
+        )
+
+    async def fetch_all() -> list[bytes]:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [(path, tg.create_task(fetch(path))) for path in paths]
+        return [dump_batch_item(path, task.result()) for path, task in tasks]
+
+    items = await _cancel_on_disconnect(request, fetch_all())
+    return _compress_response(
+        Response(dump_batch_response(items), media_type="application/json"),
+        headers.get("accept-encoding"),
+    )
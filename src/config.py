@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from pathlib import Path
+from typing import Literal
+
 from pydantic import AnyHttpUrl, AnyUrl, BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,13 +17,72 @@ class RateLimiterConfig(BaseModel):
     backend_dsn: AnyUrl = AnyUrl("mem://")
 
 
+class CacheConfig(BaseModel):
+    backend_dsn: AnyUrl = AnyUrl("mem://")
+    disk_dsn: AnyUrl | None = None
+    max_disk_writes: int = 100
+
+
+class PoolConfig(BaseModel):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+    http2: bool = False
+
+
+class CircuitBreakerConfig(BaseModel):
+    failure_rate: float = 0.5
+    min_calls: int = 20
+    window: float = 10.0
+    open_timeout: float = 30.0
+
+
+class RetryConfig(BaseModel):
+    max_retries: int = 2
+    budget_ratio: float = 0.1
+    budget_min_per_second: float = 1.0
+    hedge_percentile: float | None = None
+
+
+class RateLimitRule(BaseModel):
+    limit: int
+    period: int
+    # "client" limits each client separately, "service" limits all clients together
+    scope: Literal["client", "service"] = "client"
+
+
 class ServiceConfig(BaseModel):
     name: str
     host: AnyHttpUrl
     timeout: float = 30.0
+    connect_timeout: float = 5.0
     rate_limit: int = 100
     rate_limit_period: int = 3600
+    rate_limits: list[RateLimitRule] = []
+    min_concurrent_requests: int = 5
     max_concurrent_requests: int = 10
+    max_queued_requests: int = 100
+    queue_timeout: float = 5.0
+    cache_ttl: int = 0
+    cache_max_size: int = 1024
+    cache_stale_while_revalidate: int = 0
+    cache_stale_if_error: int = 0
+    cache_keep_stale: int = 0
+    stream_responses: bool = False
+    snapshot_path: Path | None = None
+    snapshot_reload_interval: float = 60.0
+    pool: PoolConfig = PoolConfig()
+    circuit_breaker: CircuitBreakerConfig = CircuitBreakerConfig()
+    retry: RetryConfig = RetryConfig()
+
+    def get_rate_limits(self) -> list[RateLimitRule]:
+        """
+        Returns the `rate_limits`, or, if there are none, a single rule of
+        `rate_limit` requests per `rate_limit_period` for each client.
+        """
+        if self.rate_limits:
+            return self.rate_limits
+        return [RateLimitRule(limit=self.rate_limit, period=self.rate_limit_period)]
 
 
 class AppConfig(BaseSettings):
@@ -31,6 +93,7 @@ class AppConfig(BaseSettings):
     cors: CORSConfig = CORSConfig()
     services: list[ServiceConfig]
     limiter: RateLimiterConfig = RateLimiterConfig()
+    cache: CacheConfig = CacheConfig()
 
     _service_map: dict[str, ServiceConfig]
 
@@ -0,0 +1,66 @@
+"""
+Takes a snapshot of every resource of a service, which the proxy then serves
+from memory, see `snapshot_path` of the service config.
+
+A snapshot is crawled from the upstream of the service, or imported from
+a JSON file with the resources of every collection, e.g.
+`{"films": [{"url": "https://swapi.dev/api/films/1/", ...}, ...], ...}`.
+The output is gzipped, if its suffix is `.gz`.
+
+Usage:
+
+    python -m src.snapshot crawl swapi snapshots/swapi.json.gz
+    python -m src.snapshot import swapi.json snapshots/swapi.json.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+
+import httpx
+
+from src.api.proxy.snapshot import (
+    Collections,
+    crawl,
+    dump_collections,
+    load_collections,
+)
+from src.config import config
+
+
+async def _crawl(service_name: str) -> Collections:
+    service = config.get_service(service_name)
+    if service is None:
+        raise SystemExit(f"Unknown service: `{service_name}`.")
+    timeout = httpx.Timeout(service.timeout, connect=service.connect_timeout)
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+        return await crawl(client, str(service.host))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    crawl_parser = commands.add_parser("crawl", help="fetch from the upstream")
+    crawl_parser.add_argument("service")
+    crawl_parser.add_argument("output", type=Path)
+    import_parser = commands.add_parser("import", help="import from a JSON file")
+    import_parser.add_argument("input", type=Path)
+    import_parser.add_argument("output", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "crawl":
+        collections = asyncio.run(_crawl(args.service))
+    else:
+        collections = load_collections(args.input)
+    dump_collections(collections, args.output)
+
+    count = sum(len(items) for items in collections.values())
+    print(f"Saved {count} resources of {len(collections)} collections.")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,19 +1,196 @@
 from __future__ import annotations
 
 import asyncio
-from typing import TYPE_CHECKING, TypeVar
+import time
+from collections import deque
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
 
 if TYPE_CHECKING:
-    from collections.abc import Awaitable
+    from collections.abc import Awaitable, Callable, Coroutine
 
 T = TypeVar("T")
 
 
+class ConcurrencyLimitError(Exception):
+    """Raised when a call can't wait for a free slot of the limiter."""
+
+
 class ConcurrencyLimiter:
-    def __init__(self, max_concurrency: int):
-        self._max_concurrency = max_concurrency
-        self._semaphore = asyncio.Semaphore(max_concurrency)
+    """
+    Limits the number of concurrent calls, adjusting the limit between
+    `min_limit` and `max_limit` to how the calls behave (AIMD). A `min_limit`
+    above `max_limit` is lowered to it, so the limit never exceeds the maximum.
+
+    Every successful call raises the limit a little, so it grows by one after
+    a limit worth of calls. A failed call is a sign of overload, and the limit
+    is cut down by `backoff`. So is latency growing with the load: the average
+    latency of about the last `short_window` calls is compared to the baseline,
+    the average of about the last `window` calls, and the limit is cut once it
+    gets over `tolerance` times the baseline. Both are moving averages, so the
+    jitter of single calls doesn't cut the limit. The limit is cut once per
+    round: calls that were started before the last cut don't cut it again.
+
+    Calls over the limit wait in a queue of at most `max_queue_size` calls for
+    at most `queue_timeout` seconds, a call that can't join the queue or waits
+    too long fails with `ConcurrencyLimitError`.
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        *,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        window: int = 100,
+        short_window: int = 10,
+        max_queue_size: int | None = None,
+        queue_timeout: float | None = None,
+    ):
+        self.min_limit = min(min_limit, max_limit)
+        self.max_limit = max_limit
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._alpha = 1 / window
+        self._short_alpha = 1 / short_window
+        self._max_queue_size = max_queue_size
+        self._queue_timeout = queue_timeout
+
+        self._limit = float(max_limit)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._round = 0
+
+        # exponential moving averages of the latency over the long and the
+        # short windows of calls
+        self._baseline: float | None = None
+        self._latency = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def __call__(self, coro: Coroutine[Any, Any, T]) -> T:
+        try:
+            await self._acquire()
+        except BaseException:
+            coro.close()
+            raise
+
+        started_round, started_at = self._round, time.monotonic()
+        try:
+            result = await coro
+        except Exception:
+            self._decrease(started_round)
+            raise
+        else:
+            self._on_success(time.monotonic() - started_at, started_round)
+            return result
+        finally:
+            self._release()
+
+    async def _acquire(self) -> None:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+
+        max_queue_size = self._max_queue_size
+        if max_queue_size is not None and len(self._waiters) >= max_queue_size:
+            raise ConcurrencyLimitError("Too many calls are waiting.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self._queue_timeout):
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    if not waiter.cancelled():
+                        # the slot was handed over right before the cancellation
+                        self._release()
+                    elif waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    raise
+        except TimeoutError as exc:
+            raise ConcurrencyLimitError("Timed out waiting for a slot.") from exc
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _on_success(self, latency: float, started_round: int) -> None:
+        baseline = self._baseline
+        if baseline is None:
+            self._baseline = self._latency = latency
+            baseline = latency
+        else:
+            self._latency += (latency - self._latency) * self._short_alpha
+            self._baseline = baseline + (latency - baseline) * self._alpha
+
+        if self._latency > baseline * self._tolerance:
+            self._decrease(started_round)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._wake_up()
+
+    def _decrease(self, started_round: int) -> None:
+        if started_round == self._round:
+            self._limit = max(self.min_limit, self._limit * self._backoff)
+            self._round += 1
+
+
+@dataclass
+class _Call:
+    task: asyncio.Future[Any]
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Makes sure that only one call per key is in flight. Concurrent callers with
+    the same key wait for that call and share its result or exception.
+
+    Cancelling a caller doesn't affect the others, but once every caller is
+    gone, the call itself is cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _Call] = {}
+
+    async def __call__(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # forgotten right away, so callers coming while the call is
+                # being cancelled start a new one instead of joining it
+                self._forget(key, call)
+                call.task.cancel()
 
-    async def __call__(self, coro: Awaitable[T]) -> T:
-        async with self._semaphore:
-            return await coro
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,5 @@
+from .cache import Cache
+
+__all__ = [
+    "Cache",
+]
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import TypeAlias
+
+from src.toolkit.cache.cache import TTL, ICacheBackend
+
+Entry: TypeAlias = tuple[float, bytes]
+
+
+class InMemoryBackend(ICacheBackend):
+    def __init__(self) -> None:
+        self._namespaces: dict[str, OrderedDict[str, Entry]] = {}
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        entries = self._namespaces.get(namespace)
+        if entries is None or (entry := entries.get(key)) is None:
+            return None
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del entries[key]
+            return None
+
+        entries.move_to_end(key)
+        return value
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: TTL,
+        max_size: int,
+    ) -> None:
+        entries = self._namespaces.setdefault(namespace, OrderedDict())
+        entries[key] = (time.monotonic() + ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > max_size:
+            entries.popitem(last=False)
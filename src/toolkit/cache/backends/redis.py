@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import time
+from typing import Self
+
+import redis.asyncio as redis
+
+from ..cache import TTL, ICacheBackend
+
+# Stores the value and bumps it in the namespace LRU index. Everything beyond
+# `max_size` least recently used keys is evicted in the same round trip.
+#
+# KEYS[1] - the LRU index, KEYS[2] - the value key
+# ARGV[1] - value, ARGV[2] - ttl in ms, ARGV[3] - now, ARGV[4] - max size
+_SET_SCRIPT = """
+redis.call('SET', KEYS[2], ARGV[1], 'PX', ARGV[2])
+redis.call('ZADD', KEYS[1], ARGV[3], KEYS[2])
+local overflow = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[4])
+if overflow > 0 then
+    local evicted = redis.call('ZPOPMIN', KEYS[1], overflow)
+    for i = 1, #evicted, 2 do
+        redis.call('DEL', evicted[i])
+    end
+end
+"""
+
+
+class RedisBackend(ICacheBackend):
+    def __init__(self, dsn: str) -> None:
+        pool = redis.ConnectionPool.from_url(dsn)
+        self._client = redis.Redis.from_pool(pool)
+        self._set_script = self._client.register_script(_SET_SCRIPT)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self._client.aclose()
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        _key = f"{namespace}:{key}"
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.get(_key)
+            pipe.zadd(f"{namespace}:lru", {_key: time.time()}, xx=True)
+            value, _ = await pipe.execute()
+        return value  # type: ignore[no-any-return]
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: TTL,
+        max_size: int,
+    ) -> None:
+        await self._set_script(
+            keys=[f"{namespace}:lru", f"{namespace}:{key}"],
+            args=[value, ttl * 1000, time.time(), max_size],
+        )
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Self, TypeVar
+from urllib.parse import parse_qs, urlsplit
+
+from ..cache import TTL, ICacheBackend
+
+T = TypeVar("T")
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# how many expired entries at most are deleted on each write
+_SWEEP_BATCH = 16
+
+# The total size of the values is kept up to date by triggers, so checking
+# it doesn't scan the table, whichever process has written the entries.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    UNIQUE (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+
+CREATE TABLE IF NOT EXISTS size (total INTEGER NOT NULL);
+INSERT INTO size SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM size);
+
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE size SET total = total + length(NEW.value);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF value ON entries BEGIN
+    UPDATE size SET total = total - length(OLD.value) + length(NEW.value);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE size SET total = total - length(OLD.value);
+END;
+"""
+
+_GET = """
+SELECT value, expires_at FROM entries
+WHERE namespace = ? AND key = ? AND expires_at > ?
+"""
+
+_SET = """
+INSERT INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (namespace, key) DO UPDATE
+SET value = excluded.value, expires_at = excluded.expires_at
+"""
+
+_DELETE_EXPIRED = """
+DELETE FROM entries WHERE rowid IN (
+    SELECT rowid FROM entries WHERE expires_at <= ? LIMIT ?
+)
+"""
+
+_DELETE_EXPIRING_FIRST = """
+DELETE FROM entries WHERE rowid = (
+    SELECT rowid FROM entries ORDER BY expires_at LIMIT 1
+)
+"""
+
+
+class SQLiteBackend(ICacheBackend):
+    """
+    Stores entries in an SQLite database on disk, so they outlive the process,
+    and can be shared between the processes on a host.
+
+    The database takes at most `max_bytes` of values, beyond that the entries
+    which expire first are evicted. Unlike the other backends, entries are
+    evicted by the size, and not by the number of entries in a namespace, as
+    keeping the recency of use would take a write on every read.
+
+    With `readonly` the database is never written to, e.g. when it's populated
+    by another process. Queries run in a dedicated thread, so they don't block
+    the event loop.
+    """
+
+    def __init__(self, dsn: str) -> None:
+        url = urlsplit(dsn)
+        options = parse_qs(url.query)
+        self._path = url.path
+        self._max_bytes = int(options.get("max_bytes", [DEFAULT_MAX_BYTES])[0])
+        self._readonly = options.get("readonly", ["false"])[0] in ("1", "true")
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._conn: sqlite3.Connection
+
+    async def __aenter__(self) -> Self:
+        await self._run(self._connect)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self._run(self._close)
+        self._executor.shutdown()
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        entry = await self._run(self._get, namespace, key)
+        return None if entry is None else entry[0]
+
+    async def get_with_ttl(self, namespace: str, key: str) -> tuple[bytes, TTL] | None:
+        """Returns the value along with the whole seconds it has left to live."""
+        entry = await self._run(self._get, namespace, key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        return value, int(expires_at - time.time())
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: TTL,
+        max_size: int,
+    ) -> None:
+        if not self._readonly:
+            await self._run(self._set, namespace, key, value, ttl)
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _connect(self) -> None:
+        if self._readonly:
+            self._conn = sqlite3.connect(
+                f"file:{self._path}?mode=ro", uri=True, isolation_level=None
+            )
+            return
+        self._conn = sqlite3.connect(self._path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA busy_timeout = 5000")
+        self._conn.executescript(_SCHEMA)
+
+    def _close(self) -> None:
+        self._conn.close()
+
+    def _get(self, namespace: str, key: str) -> tuple[bytes, float] | None:
+        row = self._conn.execute(_GET, (namespace, key, time.time())).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def _set(self, namespace: str, key: str, value: bytes, ttl: TTL) -> None:
+        now = time.time()
+        # the write lock is taken upfront, so the size checked is up to date
+        self._conn.execute("BEGIN IMMEDIATE")
+        with self._conn:
+            self._conn.execute(_SET, (namespace, key, value, now + ttl))
+            self._conn.execute(_DELETE_EXPIRED, (now, _SWEEP_BATCH))
+            while self._get_size() > self._max_bytes:
+                self._conn.execute(_DELETE_EXPIRING_FIRST)
+
+    def _get_size(self) -> int:
+        (total,) = self._conn.execute("SELECT total FROM size").fetchone()
+        return int(total)
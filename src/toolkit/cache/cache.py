@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING, Protocol, Self, TypeAlias
+
+from src.config import CacheConfig
+
+if TYPE_CHECKING:
+    from .backends.sqlite import SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+TTL: TypeAlias = int
+
+
+class ICacheBackend(Protocol):
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        return None
+
+    @abc.abstractmethod
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        raise NotImplementedError()  # pragma: no cover
+
+    @abc.abstractmethod
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: TTL,
+        max_size: int,
+    ) -> None:
+        """
+        Stores the value for `ttl` seconds. When the namespace grows larger than
+        `max_size` entries, the least recently used ones are evicted.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+
+class Cache:
+    """
+    Caches values in the backend, and, if `disk_dsn` is set, in the disk tier
+    beneath it, which is looked up when the backend misses, e.g. after a
+    restart emptied the in-memory backend. A value found on disk is put back
+    to the backend for the time it has left, so it's read from disk only once.
+
+    Writes to disk are best-effort: they run in the background, so a request
+    doesn't wait for the database lock, and a failed write is only logged.
+    At most `max_disk_writes` of them are pending at a time, the ones beyond
+    that are skipped, so a slow disk doesn't pile up values in memory.
+    """
+
+    def __init__(self, config: CacheConfig):
+        self._config = config
+        self.backend = get_backend(str(config.backend_dsn))
+        self.disk = get_disk_backend(str(config.disk_dsn)) if config.disk_dsn else None
+        self._stack = contextlib.AsyncExitStack()
+        self._disk_writes: set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> Self:
+        await self._stack.enter_async_context(self.backend)
+        if self.disk is not None:
+            await self._stack.enter_async_context(self.disk)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._disk_writes:
+            await asyncio.wait(self._disk_writes)
+        await self._stack.aclose()
+
+    async def get(self, namespace: str, key: str, max_size: int) -> bytes | None:
+        _namespace = f"cache:{namespace}"
+        value = await self.backend.get(_namespace, key)
+        if value is None and self.disk is not None:
+            entry = await self.disk.get_with_ttl(_namespace, key)
+            if entry is not None:
+                value, ttl = entry
+                if ttl > 0:
+                    await self.backend.set(_namespace, key, value, ttl, max_size)
+        return value
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: TTL,
+        max_size: int,
+    ) -> None:
+        _namespace = f"cache:{namespace}"
+        await self.backend.set(_namespace, key, value, ttl, max_size)
+        if self.disk is None:
+            return
+        if len(self._disk_writes) >= self._config.max_disk_writes:
+            logger.warning("Too many pending disk cache writes, skipping a write.")
+            return
+        write = self._set_on_disk(self.disk, _namespace, key, value, ttl, max_size)
+        task = asyncio.create_task(write)
+        self._disk_writes.add(task)
+        task.add_done_callback(self._disk_writes.discard)
+
+    async def _set_on_disk(
+        self,
+        disk: SQLiteBackend,
+        namespace: str,
+        key: str,
+        value: bytes,
+        ttl: TTL,
+        max_size: int,
+    ) -> None:
+        try:
+            await disk.set(namespace, key, value, ttl, max_size)
+        except Exception:
+            logger.exception("Failed to write to the disk cache.")
+
+
+def get_backend(dsn: str) -> ICacheBackend:
+    if dsn.startswith("mem://"):
+        from .backends.memory import InMemoryBackend
+
+        return InMemoryBackend()
+    if dsn.startswith("sqlite://"):
+        from .backends.sqlite import SQLiteBackend
+
+        return SQLiteBackend(dsn)
+    if dsn.startswith("redis"):
+        from .backends.redis import RedisBackend
+
+        return RedisBackend(dsn)
+    raise ValueError(f"Unsupported backend from DSN: `{dsn}`.")
+
+
+def get_disk_backend(dsn: str) -> SQLiteBackend:
+    if dsn.startswith("sqlite://"):
+        from .backends.sqlite import SQLiteBackend
+
+        return SQLiteBackend(dsn)
+    raise ValueError(f"Unsupported disk backend from DSN: `{dsn}`.")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import enum
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "State",
+]
+
+# how many buckets the rolling window is split into
+_BUCKETS = 10
+
+
+class State(enum.StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is not allowed, because the circuit is open."""
+
+
+class _Bucket:
+    __slots__ = ("started_at", "calls", "failures")
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.calls = 0
+        self.failures = 0
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing dependency for a while.
+
+    The circuit opens when at least `failure_rate` of the calls made within the
+    last `window` seconds have failed, but only when there were at least
+    `min_calls` of them. While the circuit is open, calls fail immediately with
+    `CircuitOpenError`. After `open_timeout` seconds, up to `half_open_calls`
+    trial calls are let through: a successful call closes the circuit, and
+    a failed one opens it again.
+
+    A call is wrapped in the `with` block, and fails when the block raises one of
+    the `failure_exceptions`. Other exceptions are not counted at all.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window: float = 10.0,
+        open_timeout: float = 30.0,
+        half_open_calls: int = 1,
+        failure_exceptions: tuple[type[BaseException], ...] = (Exception,),
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_timeout = open_timeout
+        self.half_open_calls = half_open_calls
+        self.failure_exceptions = failure_exceptions
+
+        self._state = State.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._buckets: deque[_Bucket] = deque()
+
+    @property
+    def state(self) -> State:
+        if self._state == State.OPEN and self._is_open_timeout_expired():
+            return State.HALF_OPEN
+        return self._state
+
+    def __enter__(self) -> None:
+        if self._state == State.OPEN:
+            if not self._is_open_timeout_expired():
+                raise CircuitOpenError()
+            self._state, self._trial_calls = State.HALF_OPEN, 0
+
+        if self._state == State.HALF_OPEN:
+            if self._trial_calls >= self.half_open_calls:
+                raise CircuitOpenError()
+            self._trial_calls += 1
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if exc_val is None:
+            self._on_success()
+        elif isinstance(exc_val, self.failure_exceptions):
+            self._on_failure()
+        elif self._state == State.HALF_OPEN:
+            self._trial_calls = max(0, self._trial_calls - 1)
+
+    def _on_success(self) -> None:
+        if self._state == State.HALF_OPEN:
+            self._state = State.CLOSED
+            self._buckets.clear()
+        elif self._state == State.CLOSED:
+            self._record(failed=False)
+
+    def _on_failure(self) -> None:
+        if self._state == State.HALF_OPEN:
+            self._open()
+        elif self._state == State.CLOSED:
+            calls, failures = self._record(failed=True)
+            if calls >= self.min_calls and failures >= calls * self.failure_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self._state, self._opened_at = State.OPEN, time.monotonic()
+
+    def _is_open_timeout_expired(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.open_timeout
+
+    def _record(self, failed: bool) -> tuple[int, int]:
+        """Records the call, and returns the number of calls and failures."""
+        now = time.monotonic()
+        buckets = self._buckets
+        while buckets and buckets[0].started_at <= now - self.window:
+            buckets.popleft()
+
+        if not buckets or buckets[-1].started_at <= now - self.window / _BUCKETS:
+            buckets.append(_Bucket(now))
+        buckets[-1].calls += 1
+        buckets[-1].failures += failed
+
+        return (
+            sum(bucket.calls for bucket in buckets),
+            sum(bucket.failures for bucket in buckets),
+        )
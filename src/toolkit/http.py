@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Collection, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import httpx
+
+if TYPE_CHECKING:
+    from src.toolkit.retry import RetryBudget
+
+__all__ = [
+    "InstrumentedTransport",
+    "PoolStats",
+    "RetryTransport",
+    "get_hop_by_hop_headers",
+]
+
+# Headers meaningful only for a single connection, which a proxy must not
+# forward, see https://www.rfc-editor.org/rfc/rfc9110#section-7.6.1
+_HOP_BY_HOP_HEADERS = frozenset(
+    [
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "proxy-connection",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    ]
+)
+
+
+def get_hop_by_hop_headers(headers: Iterable[tuple[str, str]]) -> frozenset[str]:
+    """
+    Returns lowercased names of the hop-by-hop headers, including the ones
+    listed in the `Connection` header.
+    """
+    names = set(_HOP_BY_HOP_HEADERS)
+    for name, value in headers:
+        if name.lower() == "connection":
+            names.update(token.strip().lower() for token in value.split(","))
+    return frozenset(names)
+
+
+@dataclass(slots=True)
+class PoolStats:
+    max_connections: int | None = None
+    # requests holding a connection, including the ones streaming a response
+    in_flight: int = 0
+    # how many times a request found all connections busy and had to wait
+    saturated: int = 0
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+def _get_error_status(exc: BaseException) -> str:
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, Exception):
+        return "error"
+    return "cancelled"
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    A transport that keeps track of the connection pool usage. A request holds
+    a connection until the response is closed, so a streamed response counts as
+    in flight until its body is consumed.
+
+    If given, `observe` is called with the response status code (or `timeout`,
+    `error` or `cancelled`) and how long it took to get the response headers.
+    """
+
+    def __init__(
+        self,
+        stats: PoolStats,
+        observe: Callable[[str, float], None] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.stats = stats
+        self._observe = observe
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        limit = stats.max_connections
+        if limit is not None and stats.in_flight >= limit:
+            stats.saturated += 1
+        stats.in_flight += 1
+
+        started_at = time.perf_counter()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException as exc:
+            self._release()
+            self._on_response(_get_error_status(exc), started_at)
+            raise
+
+        self._on_response(str(response.status_code), started_at)
+
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    def _on_response(self, status: str, started_at: float) -> None:
+        if self._observe is not None:
+            self._observe(status, time.perf_counter() - started_at)
+
+    def _release(self) -> None:
+        self.stats.in_flight -= 1
+
+
+class _Latencies:
+    """Keeps the latencies of the last `size` calls to estimate percentiles."""
+
+    def __init__(self, size: int = 100):
+        self._size = size
+        self._values: deque[float] = deque(maxlen=size)
+
+    def add(self, value: float) -> None:
+        self._values.append(value)
+
+    def percentile(self, percentile: float) -> float | None:
+        """Returns the percentile, or None until enough latencies are known."""
+        values = self._values
+        if len(values) < self._size:
+            return None
+        index = math.ceil(len(values) * percentile / 100) - 1
+        return sorted(values)[max(0, index)]
+
+
+def _limit_timeouts(request: httpx.Request, deadline: float | None) -> bool:
+    """
+    Cuts the timeouts of the request down to the time left until the deadline,
+    returns False, if there is no time left.
+    """
+    if deadline is None:
+        return True
+    left = deadline - time.monotonic()
+    if left <= 0:
+        return False
+    timeouts = request.extensions.get("timeout", {})
+    request.extensions = {
+        **request.extensions,
+        "timeout": {
+            name: left if timeouts.get(name) is None else min(timeouts[name], left)
+            for name in ("connect", "read", "write", "pool")
+        },
+    }
+    return True
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    A transport that retries idempotent requests on connect errors and timeouts,
+    at most `max_retries` times. With `timeout`, every attempt has to fit in
+    that many seconds overall: the timeouts of a retry are cut down to the time
+    left, and there is no retry once the time is up.
+
+    With `hedge_percentile`, a request that hasn't got the response headers within
+    that percentile of the recent latencies is hedged: the same request is sent
+    once again, the first response wins and the other request is cancelled.
+
+    Every request deposits to the `budget`, and every retry or hedged request
+    withdraws from it, so extra requests stay a fraction of the regular ones.
+    If given, `on_extra_request` is called with `retry` or `hedge` each time.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        budget: RetryBudget,
+        *,
+        max_retries: int = 2,
+        timeout: float | None = None,
+        hedge_percentile: float | None = None,
+        methods: Collection[str] = ("GET", "HEAD"),
+        on_extra_request: Callable[[str], None] | None = None,
+    ) -> None:
+        self._transport = transport
+        self._budget = budget
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self._methods = frozenset(methods)
+        self._on_extra_request = on_extra_request
+        self._latencies = _Latencies()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in self._methods:
+            return await self._transport.handle_async_request(request)
+
+        self._budget.deposit()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        retries = 0
+        while True:
+            try:
+                return await self._hedge(request)
+            except (httpx.ConnectError, httpx.TimeoutException):
+                if (
+                    retries >= self.max_retries
+                    or not _limit_timeouts(request, deadline)
+                    or not self._withdraw("retry")
+                ):
+                    raise
+                retries += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    async def _hedge(self, request: httpx.Request) -> httpx.Response:
+        delay = None
+        if self.hedge_percentile is not None:
+            delay = self._latencies.percentile(self.hedge_percentile)
+        if delay is None:
+            return await self._send(request)
+
+        tasks = [asyncio.ensure_future(self._send(request))]
+        winner = None
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=delay)
+            if pending and self._withdraw("hedge"):
+                tasks.append(asyncio.ensure_future(self._send(request)))
+
+            pending = set(tasks)
+            while winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = next((t for t in done if t.exception() is None), None)
+                if winner is None and not pending:
+                    # every request has failed, report the last failure
+                    return done.pop().result()
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled():
+                    # the other request may have got a response as well
+                    with contextlib.suppress(httpx.HTTPError):
+                        await task.result().aclose()
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        started_at = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        self._latencies.add(time.perf_counter() - started_at)
+        return response
+
+    def _withdraw(self, reason: str) -> bool:
+        if not self._budget.withdraw():
+            return False
+        if self._on_extra_request is not None:
+            self._on_extra_request(reason)
+        return True
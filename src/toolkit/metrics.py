@@ -0,0 +1,196 @@
+"""
+Minimal metrics in the Prometheus text exposition format.
+
+Metrics are meant to be updated from the event loop thread only, so recording
+a value is just a dict lookup and an addition, without any locks.
+"""
+
+from __future__ import annotations
+
+import abc
+import bisect
+import math
+from collections.abc import Iterator, Sequence
+from typing import Any, ClassVar, Generic, TypeVar
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+C = TypeVar("C")
+M = TypeVar("M", bound="_Metric[Any]")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric(abc.ABC, Generic[C]):
+    type: ClassVar[str]
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], C] = {}
+
+    def labels(self, *values: str) -> C:
+        child = self._children.get(values)
+        if child is None:
+            assert len(values) == len(self.labelnames), "Wrong number of labels."
+            child = self._children[values] = self._create_child()
+        return child
+
+    def expose(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for values, child in self._children.items():
+            yield from self._expose_child(values, child)
+
+    @abc.abstractmethod
+    def _create_child(self) -> C:
+        """Creates a value for a new combination of labels."""
+
+    @abc.abstractmethod
+    def _expose_child(self, values: tuple[str, ...], child: C) -> Iterator[str]:
+        """Yields the samples of the value with the given labels."""
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric[_Value]):
+    """A value that only goes up. The name is exposed with the `_total` suffix."""
+
+    type = "counter"
+
+    def _create_child(self) -> _Value:
+        return _Value()
+
+    def _expose_child(self, values: tuple[str, ...], child: _Value) -> Iterator[str]:
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_total{labels} {_format_value(child.value)}"
+
+
+class Gauge(_Metric[_Value]):
+    """A value that can go up and down."""
+
+    type = "gauge"
+
+    def _create_child(self) -> _Value:
+        return _Value()
+
+    def _expose_child(self, values: tuple[str, ...], child: _Value) -> Iterator[str]:
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric[_HistogramValue]):
+    """Counts observed values in buckets with the given upper bounds."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = (*sorted(buckets), math.inf)
+
+    def _create_child(self) -> _HistogramValue:
+        return _HistogramValue(self.bounds)
+
+    def _expose_child(
+        self, values: tuple[str, ...], child: _HistogramValue
+    ) -> Iterator[str]:
+        labelnames = (*self.labelnames, "le")
+        total = 0
+        for bound, count in zip(self.bounds, child.counts, strict=True):
+            total += count
+            labels = _format_labels(labelnames, (*values, _format_value(bound)))
+            yield f"{self.name}_bucket{labels} {total}"
+
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {total}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric[Any]] = []
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = [line for metric in self._metrics for line in metric.expose()]
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
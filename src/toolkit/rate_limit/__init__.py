@@ -1,6 +1,7 @@
-from .rate_limit import RateLimiter, RateLimitError
+from .rate_limit import Limit, RateLimiter, RateLimitError
 
 __all__ = [
+    "Limit",
     "RateLimiter",
     "RateLimitError",
 ]
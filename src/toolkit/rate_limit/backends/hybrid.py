@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections.abc import Sequence
+from typing import Self
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+import redis.asyncio as redis
+
+from ..rate_limit import TTL, IBackend, Limit, RateLimitResult, merge_results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_INTERVAL = 0.1
+DEFAULT_MAX_OVERSHOOT = 0.05
+
+
+class _Counter:
+    __slots__ = ("key", "period", "expires_at", "synced", "pending", "touched")
+
+    def __init__(self, key: str, period: TTL, expires_at: float):
+        self.key = key
+        self.period = period
+        self.expires_at = expires_at
+        self.synced = 0
+        self.pending = 0
+        self.touched = True
+
+
+class HybridBackend(IBackend):
+    """
+    Counts requests in fixed windows in-process and syncs the counters with Redis
+    in the background, so checking a limit never waits for Redis.
+
+    Every `sync_interval` seconds the local deltas of the recently used counters
+    are flushed with pipelined `INCRBY`, which also brings back the counts of
+    the other processes. A process doesn't admit more than `max_overshoot`
+    of the limit per key without flushing it first, so each process can exceed
+    the limit by at most that much.
+    """
+
+    def __init__(self, dsn: str) -> None:
+        url = urlsplit(dsn.removeprefix("hybrid+"))
+        options = parse_qs(url.query)
+        sync_interval = options.pop("sync_interval", [DEFAULT_SYNC_INTERVAL])
+        max_overshoot = options.pop("max_overshoot", [DEFAULT_MAX_OVERSHOOT])
+        self._sync_interval = float(sync_interval[0])
+        self._max_overshoot = float(max_overshoot[0])
+
+        redis_dsn = urlunsplit(url._replace(query=urlencode(options, doseq=True)))
+        pool = redis.ConnectionPool.from_url(redis_dsn)
+        self._client = redis.Redis.from_pool(pool)
+        self._counters: dict[str, _Counter] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        with contextlib.suppress(redis.RedisError):
+            await self.sync()
+        await self._client.aclose()
+
+    async def hit_many(self, limits: Sequence[Limit], cost: int = 1) -> RateLimitResult:
+        now = time.time()
+        counters = [self._get_counter(limit, now) for limit in limits]
+        if overshot := [
+            counter
+            for counter, limit in zip(counters, limits, strict=True)
+            if counter.pending + cost
+            > max(1, math.floor(limit.limit * self._max_overshoot))
+        ]:
+            await self._flush(overshot)
+
+        results = []
+        for counter, limit in zip(counters, limits, strict=True):
+            reset_after = counter.expires_at - now
+            count = counter.synced + counter.pending + cost
+            if count > limit.limit:
+                result = RateLimitResult(
+                    allowed=False,
+                    remaining=max(0, limit.limit - count + cost),
+                    reset_after=reset_after,
+                    retry_after=reset_after,
+                )
+            else:
+                result = RateLimitResult(
+                    allowed=True,
+                    remaining=limit.limit - count,
+                    reset_after=reset_after,
+                )
+            results.append(result)
+
+        result = merge_results(results)
+        if result.allowed:
+            for counter in counters:
+                counter.pending += cost
+        return result
+
+    def _get_counter(self, limit: Limit, now: float) -> _Counter:
+        window = int(now // limit.period)
+        key = f"{limit.key}:{window}"
+        counter = self._counters.get(key)
+        if counter is None:
+            expires_at = (window + 1) * limit.period
+            counter = self._counters[key] = _Counter(key, limit.period, expires_at)
+        counter.touched = True
+        return counter
+
+    async def sync(self) -> None:
+        """Flushes recently used counters and drops the ones of past windows."""
+        counters = [counter for counter in self._counters.values() if counter.touched]
+        if counters:
+            await self._flush(counters)
+
+        now = time.time()
+        for key, counter in list(self._counters.items()):
+            if counter.expires_at <= now and not counter.pending:
+                del self._counters[key]
+
+    async def _flush(self, counters: list[_Counter]) -> None:
+        amounts = []
+        async with self._client.pipeline(transaction=False) as pipe:
+            for counter in counters:
+                amounts.append(counter.pending)
+                counter.pending, counter.touched = 0, False
+                pipe.incrby(counter.key, amounts[-1])
+                pipe.expire(counter.key, counter.period)
+            try:
+                results = await pipe.execute()
+            except BaseException:
+                for counter, amount in zip(counters, amounts, strict=True):
+                    counter.pending += amount
+                    counter.touched = True
+                raise
+
+        for counter, count in zip(counters, results[::2], strict=True):
+            counter.synced = max(counter.synced, count)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._sync_interval)
+            try:
+                await self.sync()
+            except redis.RedisError:
+                logger.exception("Failed to sync rate limits with Redis.")
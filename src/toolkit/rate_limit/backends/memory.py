@@ -1,50 +1,116 @@
 from __future__ import annotations
 
+import heapq
+import math
 import time
-from dataclasses import dataclass, field
+from collections.abc import Sequence
 from typing import Any
+from urllib.parse import parse_qs, urlsplit
 
-from src.toolkit.rate_limit.rate_limit import TTL, IBackend
+from src.toolkit.rate_limit.rate_limit import (
+    IBackend,
+    Limit,
+    RateLimitResult,
+    gcra,
+    merge_results,
+)
+
+DEFAULT_MAX_KEYS = 1_000_000
+
+# how many keys at most are looked at in the expiry heap on each write
+_SWEEP_BATCH = 4
 
 
-@dataclass
 class Value:
-    key: str
-    value: Any
-    ttl: float | None
-    timestamp: float = field(default_factory=time.monotonic)
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value: Any, expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
 
 
 class InMemoryStorage:
-    def __init__(self):
+    """
+    A key-value storage that holds at most `max_keys` keys.
+
+    Every key has exactly one entry in the expiry heap. The entry is not updated
+    when the key gets a new TTL, instead, it is re-scheduled once it reaches the
+    top of the heap, so frequently updated keys don't pile up in the heap. Each
+    write reclaims a few expired keys from the top of the heap, and when the
+    storage is full, the key which expires first is evicted.
+    """
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS):
+        self._max_keys = max_keys
         self._data: dict[str, Value] = {}
+        self._expiry: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._data)
 
     def get(self, key: str) -> Value | None:
         value = self._data.get(key)
-        if not value:
+        if value is None or value.expires_at <= time.monotonic():
             return None
+        return value
 
-        if value.ttl and time.monotonic() - value.timestamp > value.ttl:
-            del self._data[key]
-            return None
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        now = time.monotonic()
+        expires_at = now + ttl if ttl is not None else math.inf
+        self._sweep(now)
 
-        return value
+        if entry := self._data.get(key):
+            entry.value = value
+            entry.expires_at = expires_at
+            return
+
+        if len(self._data) >= self._max_keys:
+            self._evict()
+        self._data[key] = Value(value, expires_at)
+        heapq.heappush(self._expiry, (expires_at, key))
 
-    def set(self, key: str, value: Any, ttl: TTL | None = None) -> None:
-        self._data[key] = Value(
-            key=key,
-            value=value,
-            ttl=float(ttl) if ttl is not None else None,
-        )
+    def _sweep(self, now: float) -> None:
+        for _ in range(_SWEEP_BATCH):
+            if not self._expiry or self._expiry[0][0] > now:
+                return
+            _, key = self._expiry[0]
+            expires_at = self._data[key].expires_at
+            if expires_at <= now:
+                heapq.heappop(self._expiry)
+                del self._data[key]
+            else:
+                heapq.heapreplace(self._expiry, (expires_at, key))
+
+    def _evict(self) -> None:
+        while True:
+            scheduled_at, key = self._expiry[0]
+            expires_at = self._data[key].expires_at
+            if expires_at <= scheduled_at:
+                heapq.heappop(self._expiry)
+                del self._data[key]
+                return
+            heapq.heapreplace(self._expiry, (expires_at, key))
 
 
 class InMemoryBackend(IBackend):
-    def __init__(self) -> None:
-        self._storage = InMemoryStorage()
-
-    async def incr(self, key: str, value: int = 1, ttl: TTL | None = None) -> int:
-        _key = f"limiter:{key}"
-        result = self._storage.get(_key)
-        incr_by: int = result.value + value if result else value
-        self._storage.set(_key, incr_by, ttl)
-        return incr_by
+    def __init__(self, dsn: str = "mem://") -> None:
+        options = parse_qs(urlsplit(dsn).query)
+        max_keys = int(options.get("max_keys", [DEFAULT_MAX_KEYS])[0])
+        self._storage = InMemoryStorage(max_keys=max_keys)
+
+    async def hit_many(self, limits: Sequence[Limit], cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        tats, results = [], []
+        for limit in limits:
+            value = self._storage.get(limit.key)
+            tat, result = gcra(
+                value.value if value else None, now, limit.limit, limit.period, cost
+            )
+            tats.append(tat)
+            results.append(result)
+
+        result = merge_results(results)
+        if result.allowed:
+            for limit, tat in zip(limits, tats, strict=True):
+                self._storage.set(limit.key, tat, ttl=tat - now)
+        return result
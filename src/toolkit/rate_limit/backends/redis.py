@@ -1,27 +1,171 @@
 from __future__ import annotations
 
-import contextlib
-from typing import Self
+import asyncio
+import itertools
+from collections.abc import Sequence
+from typing import Any, Self
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
 
 import redis.asyncio as redis
+from redis.exceptions import NoScriptError
 
-from ..rate_limit import TTL, IBackend
+from ..rate_limit import IBackend, Limit, RateLimitResult, merge_results
+
+# GCRA (see `rate_limit.gcra`) evaluated on the server for every key, so
+# checking and counting a request against all the limits is atomic and takes
+# a single round trip. Lua numbers are truncated to integers on return, so
+# fractional values are returned as strings.
+#
+# KEYS - the keys, ARGV[1] - cost, followed by the limit and the period of
+# every key. Returns the allowed flag, remaining, reset after and retry after
+# of every key, one after another.
+_GCRA_SCRIPT = """
+local cost = tonumber(ARGV[1])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local allowed = true
+local new_tats = {}
+local results = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local period = tonumber(ARGV[i * 2 + 1])
+    local interval = period / limit
+
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then
+        tat = now
+    end
+
+    local new_tat = tat + cost * interval
+    local allow_at = new_tat - period
+    if allow_at > now then
+        allowed = false
+        local remaining = math.floor((period - (tat - now)) / interval + 1e-9)
+        table.insert(results, 0)
+        table.insert(results, remaining)
+        table.insert(results, tostring(tat - now))
+        table.insert(results, tostring(allow_at - now))
+    else
+        new_tats[i] = new_tat
+        local remaining = math.floor((period - (new_tat - now)) / interval + 1e-9)
+        table.insert(results, 1)
+        table.insert(results, remaining)
+        table.insert(results, tostring(new_tat - now))
+        table.insert(results, '0')
+    end
+end
+
+if allowed then
+    for i, key in ipairs(KEYS) do
+        -- a hit of zero cost on an idle key has nothing to store
+        local ttl = math.ceil((new_tats[i] - now) * 1000)
+        if ttl > 0 then
+            redis.call('SET', key, tostring(new_tats[i]), 'PX', ttl)
+        end
+    end
+end
+return results
+"""
+
+
+DEFAULT_PIPELINE_WINDOW = 0.0
+
+_Call = tuple[list[str], list[int], "asyncio.Future[Any]"]
 
 
 class RedisBackend(IBackend):
+    """
+    Evaluates GCRA on the Redis server.
+
+    Hits are not sent right away, instead, the ones made within
+    `pipeline_window` seconds are sent in a single pipeline, and the replies
+    are handed back to the waiting callers. With the default window of zero,
+    that gathers the hits made within the same event loop iteration, so under
+    load it takes a single round trip and a single connection for many of them.
+    """
+
     def __init__(self, dsn: str) -> None:
-        pool = redis.ConnectionPool.from_url(dsn)
+        url = urlsplit(dsn)
+        options = parse_qs(url.query)
+        window = options.pop("pipeline_window", [DEFAULT_PIPELINE_WINDOW])
+        self._pipeline_window = float(window[0])
+
+        redis_dsn = urlunsplit(url._replace(query=urlencode(options, doseq=True)))
+        pool = redis.ConnectionPool.from_url(redis_dsn)
         self._client = redis.Redis.from_pool(pool)
-        self._stack = contextlib.AsyncExitStack()
+        self._gcra = self._client.register_script(_GCRA_SCRIPT)
+        self._pending: list[_Call] = []
+        self._flushes: set[asyncio.Task[None]] = set()
 
     async def __aenter__(self) -> Self:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._flushes:
+            await asyncio.wait(self._flushes)
         await self._client.aclose()
 
-    async def incr(self, key: str, value: int, ttl: TTL | None = None) -> int:
-        result: int = await self._client.incr(key, amount=value)
-        if ttl:
-            await self._client.expire(key, ttl)
-        return result
+    async def hit_many(self, limits: Sequence[Limit], cost: int = 1) -> RateLimitResult:
+        keys, args = [], [cost]
+        for limit in limits:
+            keys.append(limit.key)
+            args.extend([limit.limit, limit.period])
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((keys, args, future))
+        if len(self._pending) == 1:
+            task = asyncio.create_task(self._flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+        results = [
+            RateLimitResult(
+                allowed=bool(allowed),
+                remaining=remaining,
+                reset_after=float(reset_after),
+                retry_after=float(retry_after),
+            )
+            for allowed, remaining, reset_after, retry_after in itertools.batched(
+                await future, 4
+            )
+        ]
+        return merge_results(results)
+
+    async def _flush(self) -> None:
+        """Sends the pending hits once the window is over."""
+        await asyncio.sleep(self._pipeline_window)
+        calls, self._pending = self._pending, []
+        try:
+            replies = await self._evaluate(calls)
+            missing = [i for i, r in enumerate(replies) if isinstance(r, NoScriptError)]
+            if missing:
+                # the server doesn't have the script cached (yet), load it once
+                # and send the hits again
+                await self._client.script_load(_GCRA_SCRIPT)
+                retried = await self._evaluate([calls[i] for i in missing])
+                for i, reply in zip(missing, retried, strict=True):
+                    replies[i] = reply
+        except Exception as exc:
+            replies = [exc] * len(calls)
+
+        for (_, _, future), reply in zip(calls, replies, strict=True):
+            if future.done():
+                continue
+            if isinstance(reply, Exception):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+    async def _evaluate(self, calls: list[_Call]) -> list[Any]:
+        """
+        Sends the hits in a single pipeline of `EVALSHA`. Unlike calling the
+        script on the pipeline, that doesn't check whether the script exists
+        with an extra round trip before every pipeline.
+        """
+        async with self._client.pipeline(transaction=False) as pipe:
+            for keys, args, _ in calls:
+                pipe.evalsha(self._gcra.sha, len(keys), *keys, *map(str, args))
+            replies: list[Any] = await pipe.execute(raise_on_error=False)
+        return replies
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Sequence
+from urllib.parse import parse_qs, urlsplit
+
+from ..rate_limit import IBackend, Limit, RateLimitResult, gcra, merge_results
+
+DEFAULT_PATH = os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    "swapi-proxy-limiter",
+)
+DEFAULT_SLOTS = 65_536
+DEFAULT_STRIPES = 64
+
+_MAGIC = b"SWPLIM01"
+_HEADER = struct.Struct("<8sII")
+_HEADER_SIZE = 64
+
+# a 64-bit fingerprint of the key, zero for an empty slot, and the TAT,
+# which is also when the slot expires
+_SLOT = struct.Struct("<Qd")
+
+# how many slots at most are looked at for a key
+_MAX_PROBES = 16
+
+
+def _fingerprint(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedMemoryBackend(IBackend):
+    """
+    Keeps the TAT of every key in a fixed-size hash table in a memory-mapped
+    file, so all the processes on a host that open the same file share limits.
+
+    The table is split into `stripes`, each guarded by a lock on its byte range
+    of the file, and a key is looked up within its stripe by probing a few
+    slots. A new key takes an empty or an expired slot, and when there is none,
+    the key which expires first is evicted. Keys are identified by a 64-bit
+    hash, so a collision makes two keys share a limit, which is unlikely enough
+    with the default number of slots.
+
+    Locks are held by a process, not by a coroutine, which is fine as `hit`
+    never awaits while holding one.
+    """
+
+    def __init__(self, dsn: str = "shm://") -> None:
+        url = urlsplit(dsn)
+        options = parse_qs(url.query)
+        self._slots = int(options.get("slots", [DEFAULT_SLOTS])[0])
+        self._stripes = int(options.get("stripes", [DEFAULT_STRIPES])[0])
+        if self._slots < self._stripes or self._slots % self._stripes:
+            raise ValueError("The number of slots must be a multiple of stripes.")
+
+        self._stripe_size = self._slots // self._stripes
+        self._probes = min(_MAX_PROBES, self._stripe_size)
+        size = _HEADER_SIZE + self._slots * _SLOT.size
+        self._fd = os.open(url.path or DEFAULT_PATH, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._init_file(size)
+            self._map = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def _init_file(self, size: int) -> None:
+        """Lays the table out, unless another process has done that already."""
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _HEADER_SIZE)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                header = _HEADER.pack(_MAGIC, self._slots, self._stripes)
+                os.pwrite(self._fd, header, 0)
+                return
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if _HEADER.unpack(header) != (_MAGIC, self._slots, self._stripes):
+                raise ValueError("The file was laid out with other slots or stripes.")
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _HEADER_SIZE)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    async def hit_many(self, limits: Sequence[Limit], cost: int = 1) -> RateLimitResult:
+        fingerprints = [_fingerprint(limit.key) for limit in limits]
+        starts = [self._get_stripe_start(fingerprint) for fingerprint in fingerprints]
+        length = self._stripe_size * _SLOT.size
+
+        # stripes are always locked in the same order, so processes locking
+        # several of them can't deadlock
+        locked = sorted(set(starts))
+        for start in locked:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, start)
+        try:
+            now = time.time()
+            tats, results = [], []
+            for limit, fingerprint, start in zip(
+                limits, fingerprints, starts, strict=True
+            ):
+                _, tat = self._lookup(fingerprint, start, now)
+                tat, result = gcra(tat, now, limit.limit, limit.period, cost)
+                tats.append(tat)
+                results.append(result)
+
+            result = merge_results(results)
+            if result.allowed:
+                for fingerprint, start, tat in zip(
+                    fingerprints, starts, tats, strict=True
+                ):
+                    # looked up again, as new keys could've been given the same slot
+                    offset, _ = self._lookup(fingerprint, start, now)
+                    _SLOT.pack_into(self._map, offset, fingerprint, tat)
+            return result
+        finally:
+            for start in reversed(locked):
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, start)
+
+    def _get_stripe_start(self, fingerprint: int) -> int:
+        stripe = (fingerprint >> 32) % self._stripes
+        return _HEADER_SIZE + stripe * self._stripe_size * _SLOT.size
+
+    def _lookup(
+        self, fingerprint: int, start: int, now: float
+    ) -> tuple[int, float | None]:
+        """
+        Returns the offset of the slot for the key along with its TAT, or, if
+        the key is not in the table, the offset of a slot to put it to.
+        """
+        home = fingerprint % self._stripe_size
+        free, oldest, oldest_tat = None, 0, float("inf")
+        for i in range(self._probes):
+            offset = start + (home + i) % self._stripe_size * _SLOT.size
+            slot_fingerprint, tat = _SLOT.unpack_from(self._map, offset)
+            if slot_fingerprint == fingerprint:
+                return offset, tat if tat > now else None
+            if free is None and (slot_fingerprint == 0 or tat <= now):
+                free = offset
+            elif tat < oldest_tat:
+                oldest, oldest_tat = offset, tat
+        return (oldest if free is None else free), None
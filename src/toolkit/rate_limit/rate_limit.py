@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import abc
 import contextlib
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Protocol, Self, TypeAlias
 
 from src.config import RateLimiterConfig
@@ -9,6 +12,21 @@ from src.config import RateLimiterConfig
 TTL: TypeAlias = int
 
 
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    reset_after: float
+    retry_after: float = 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class Limit:
+    key: str
+    limit: int
+    period: TTL
+
+
 class IBackend(Protocol):
     async def __aenter__(self) -> Self:
         return self
@@ -16,13 +34,33 @@ class IBackend(Protocol):
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         return None
 
+    async def hit(
+        self,
+        key: str,
+        limit: int,
+        period: TTL,
+        cost: int = 1,
+    ) -> RateLimitResult:
+        """
+        Atomically checks whether `cost` requests fit into `limit` requests per
+        `period` seconds, and if so, counts them.
+        """
+        return await self.hit_many([Limit(key, limit, period)], cost=cost)
+
     @abc.abstractmethod
-    async def incr(self, key: str, value: int, ttl: TTL | None = None) -> int:
+    async def hit_many(self, limits: Sequence[Limit], cost: int = 1) -> RateLimitResult:
+        """
+        Atomically checks whether `cost` requests fit into every limit, and if
+        so, counts them against all of them. Returns the limits' results merged
+        with `merge_results`.
+        """
         raise NotImplementedError()  # pragma: no cover
 
 
 class RateLimitError(Exception):
-    pass
+    def __init__(self, result: RateLimitResult):
+        super().__init__()
+        self.result = result
 
 
 class RateLimiter:
@@ -44,18 +82,96 @@ class RateLimiter:
         limit: int,
         limit_period: TTL,
         cost: int = 1,
-    ) -> None:
+    ) -> RateLimitResult:
         _key = f"limiter:{key}"
-        requests_count = await self.backend.incr(_key, value=cost, ttl=limit_period)
-        if requests_count and requests_count > limit:
-            raise RateLimitError()
+        result = await self.backend.hit(
+            _key, limit=limit, period=limit_period, cost=cost
+        )
+        if not result.allowed:
+            raise RateLimitError(result)
+        return result
+
+    async def limit_many(
+        self, limits: Sequence[Limit], cost: int = 1
+    ) -> RateLimitResult:
+        """Same as `limit`, but checks all the limits at once, e.g. several tiers."""
+        _limits = [
+            Limit(f"limiter:{limit.key}", limit.limit, limit.period) for limit in limits
+        ]
+        result = await self.backend.hit_many(_limits, cost=cost)
+        if not result.allowed:
+            raise RateLimitError(result)
+        return result
+
+
+def gcra(
+    tat: float | None,
+    now: float,
+    limit: int,
+    period: float,
+    cost: int = 1,
+) -> tuple[float, RateLimitResult]:
+    """
+    Generic cell rate algorithm: every request pushes the theoretical arrival
+    time (TAT) forward by `period / limit` seconds, and a request is allowed as
+    long as the TAT doesn't get further than `period` seconds ahead of now. That
+    allows a burst of `limit` requests, which is then replenished gradually.
+
+    Returns the TAT to store (unchanged when the request is not allowed) along
+    with the result.
+    """
+    interval = period / limit
+    tat = max(tat or now, now)
+    new_tat = tat + cost * interval
+    allow_at = new_tat - period
+    if allow_at > now:
+        return tat, RateLimitResult(
+            allowed=False,
+            remaining=_remaining(period - (tat - now), interval),
+            reset_after=tat - now,
+            retry_after=allow_at - now,
+        )
+    return new_tat, RateLimitResult(
+        allowed=True,
+        remaining=_remaining(period - (new_tat - now), interval),
+        reset_after=new_tat - now,
+    )
+
+
+def merge_results(results: Sequence[RateLimitResult]) -> RateLimitResult:
+    """
+    Merges results of several limits into the one of the most restrictive
+    limit: a request is allowed only if every limit allows it, and has to wait
+    until every limit that denied it allows it.
+    """
+    if len(results) == 1:
+        return results[0]
+    return RateLimitResult(
+        allowed=all(result.allowed for result in results),
+        remaining=min(result.remaining for result in results),
+        reset_after=max(result.reset_after for result in results),
+        retry_after=max(result.retry_after for result in results),
+    )
+
+
+def _remaining(capacity: float, interval: float) -> int:
+    # a small epsilon compensates for floating point errors
+    return math.floor(capacity / interval + 1e-9)
 
 
 def get_backend(dsn: str) -> IBackend:
     if dsn.startswith("mem://"):
         from .backends.memory import InMemoryBackend
 
-        return InMemoryBackend()
+        return InMemoryBackend(dsn)
+    if dsn.startswith("shm://"):
+        from .backends.shm import SharedMemoryBackend
+
+        return SharedMemoryBackend(dsn)
+    if dsn.startswith("hybrid+redis"):
+        from .backends.hybrid import HybridBackend
+
+        return HybridBackend(dsn)
     if dsn.startswith("redis"):
         from .backends.redis import RedisBackend
 
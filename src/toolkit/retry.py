@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import time
+
+__all__ = [
+    "RetryBudget",
+]
+
+
+class RetryBudget:
+    """
+    Caps extra calls, such as retries, to a fraction of the regular ones, so that
+    retrying can't multiply the load on a dependency that is already failing.
+
+    Every regular call deposits `ratio` of a token, and every extra call has to
+    withdraw a whole one. On top of that, the budget refills by `min_per_second`
+    tokens a second, so that rarely used dependencies can still be retried.
+    The budget never holds more than `capacity` tokens.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.1,
+        min_per_second: float = 1.0,
+        capacity: float = 10.0,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def deposit(self) -> None:
+        self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        """Takes a token for an extra call, returns False if there is none."""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _refill(self, amount: float = 0.0) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated_at) * self.min_per_second
+        self._tokens = min(self.capacity, self._tokens + amount)
+        self._updated_at = now
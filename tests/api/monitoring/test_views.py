@@ -5,6 +5,8 @@ from typing import TYPE_CHECKING
 import pytest
 
 if TYPE_CHECKING:
+    from pytest_httpx import HTTPXMock
+
     from tests.api.conftest import TestClient
 
 pytestmark = [pytest.mark.anyio]
@@ -19,3 +21,43 @@ class TestPing:
         # THEN
         assert response.status_code == 200
         assert response.json() == {"status": "OK"}
+
+
+class TestServices:
+    url = "/monitoring/services"
+
+    async def test(self, client: TestClient):
+        # WHEN
+        response = await client.get(self.url)
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == {
+            "swapi": {
+                "pool": {"max_connections": 100, "in_flight": 0, "saturated": 0},
+                "concurrency": {"limit": 10, "in_flight": 0, "queued": 0},
+                "circuit_breaker": {"state": "closed"},
+            },
+        }
+
+
+class TestPrometheus:
+    url = "/monitoring/metrics"
+
+    async def test(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        httpx_mock.add_response(url="https://swapi.dev/api/films/1", json={})
+        await client.get("/proxy/swapi/films/1")
+        # WHEN
+        response = await client.get(self.url)
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        samples = [
+            'proxy_request_duration_seconds_count{service="swapi",endpoint="proxy"',
+            'proxy_upstream_request_duration_seconds_count{service="swapi",status="200"}',
+            'proxy_rate_limit_decisions_total{service="swapi",decision="allowed"}',
+            'proxy_concurrency_limit{service="swapi"} 10',
+            'proxy_pool_saturated_total{service="swapi"} 0',
+        ]
+        for sample in samples:
+            assert sample in response.text
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import httpx
+import pytest
+
+from src.api.proxy import caching, compression
+
+
+class TestIsCacheableRequest:
+    @pytest.mark.parametrize(
+        ["headers", "expected"],
+        [
+            ({"accept": "application/json"}, True),
+            ({"authorization": "Bearer token"}, False),
+        ],
+    )
+    def test(self, headers: dict[str, str], expected: bool):
+        assert caching.is_cacheable_request(headers) is expected
+
+
+class TestGetTTL:
+    @pytest.mark.parametrize(
+        ["status_code", "headers", "expected"],
+        [
+            (200, {}, 60),
+            (404, {}, 60),
+            (500, {}, 0),
+            (200, {"set-cookie": "session=1"}, 0),
+            (200, {"vary": "*"}, 0),
+            (200, {"cache-control": "no-store"}, 0),
+            (200, {"cache-control": "private, max-age=30"}, 0),
+            (200, {"cache-control": "max-age=30"}, 30),
+            (200, {"cache-control": "public, max-age=3600"}, 60),
+            (200, {"cache-control": "max-age=30, s-maxage=10"}, 10),
+            (200, {"cache-control": "max-age=invalid"}, 0),
+            (200, {"cache-control": "max-age=30", "age": "25"}, 5),
+            (200, {"cache-control": "max-age=30", "age": "45"}, 0),
+            (
+                200,
+                {
+                    "date": "Mon, 01 Jan 2024 00:00:00 GMT",
+                    "expires": "Mon, 01 Jan 2024 00:00:20 GMT",
+                },
+                20,
+            ),
+            (
+                200,
+                {
+                    "date": "Mon, 01 Jan 2024 00:00:00 -0000",
+                    "expires": "Mon, 01 Jan 2024 00:00:20 -0000",
+                },
+                20,
+            ),
+            (200, {"expires": "Mon, 01 Jan 2024 00:00:20 GMT"}, 0),
+            (200, {"expires": "0"}, 0),
+        ],
+    )
+    def test(self, status_code: int, headers: dict[str, str], expected: int):
+        # GIVEN
+        response = httpx.Response(status_code, headers=headers)
+        # WHEN
+        result = caching.get_ttl(response, max_ttl=60)
+        # THEN
+        assert result == expected
+
+
+class TestDumpLoadResponse:
+    def test(self):
+        # GIVEN
+        response = httpx.Response(
+            200,
+            headers={"content-type": "application/json", "vary": "Accept"},
+            json={"title": "A New Hope"},
+        )
+        request_headers = {"accept": "application/json"}
+        # WHEN
+        data = caching.dump_response(response, request_headers)
+        result = caching.load_response(data, request_headers)
+        # THEN
+        assert result is not None
+        assert result.is_fresh()
+        assert result.response.status_code == 200
+        assert result.response.headers["content-type"] == "application/json"
+        assert result.response.json() == {"title": "A New Hope"}
+
+    def test_transfer_headers_are_not_stored(self):
+        # GIVEN
+        response = httpx.Response(
+            200,
+            headers={"content-encoding": "identity", "transfer-encoding": "chunked"},
+            content=b"content",
+        )
+        # WHEN
+        data = caching.dump_response(response, {})
+        result = caching.load_response(data, {})
+        # THEN
+        assert result is not None
+        assert "content-encoding" not in result.response.headers
+        assert "transfer-encoding" not in result.response.headers
+        assert result.response.headers["content-length"] == "7"
+
+    def test_compressed_variants(self):
+        # GIVEN
+        response = httpx.Response(200, content=b"content")
+        variants = {"gzip": b"gzipped", "br": b"brotlied"}
+        compression.set_variants(response, variants)
+        # WHEN
+        data = caching.dump_response(response, {})
+        result = caching.load_response(data, {})
+        # THEN
+        assert result is not None
+        assert result.response.content == b"content"
+        assert compression.get_variants(result.response) == variants
+
+    def test_accept_encoding_is_not_varied_by(self):
+        # GIVEN
+        headers = {"vary": "Accept-Encoding, Accept"}
+        response = httpx.Response(200, headers=headers, content=b"")
+        data = caching.dump_response(response, {"accept-encoding": "gzip"})
+        # WHEN
+        result = caching.load_response(data, {"accept-encoding": "br"})
+        # THEN
+        assert result is not None
+
+    def test_staleness(self):
+        # GIVEN
+        response = httpx.Response(200, content=b"")
+        with mock.patch("time.time", return_value=0):
+            data = caching.dump_response(response, {}, ttl=10)
+        result = caching.load_response(data, {})
+        assert result is not None
+        # WHEN
+        with mock.patch("time.time", return_value=15):
+            # THEN
+            assert not result.is_fresh()
+            assert result.is_stale_within(10)
+            assert not result.is_stale_within(5)
+
+    def test_when_vary_headers_do_not_match(self):
+        # GIVEN
+        response = httpx.Response(200, headers={"vary": "Accept"}, content=b"")
+        data = caching.dump_response(response, {"accept": "application/json"})
+        # WHEN
+        result = caching.load_response(data, {"accept": "text/html"})
+        # THEN
+        assert result is None
+
+
+class TestAddEtag:
+    def test(self):
+        # GIVEN
+        response = httpx.Response(200, content=b"content")
+        # WHEN
+        caching.add_etag(response)
+        # THEN
+        etag = response.headers["etag"]
+        assert etag.startswith('"') and etag.endswith('"')
+        other = httpx.Response(200, content=b"other content")
+        caching.add_etag(other)
+        assert other.headers["etag"] != etag
+
+    @pytest.mark.parametrize(
+        ["status_code", "headers", "expected"],
+        [
+            (200, {"etag": '"upstream"'}, '"upstream"'),
+            (404, {}, None),
+        ],
+    )
+    def test_when_not_added(
+        self, status_code: int, headers: dict[str, str], expected: str | None
+    ):
+        # GIVEN
+        response = httpx.Response(status_code, headers=headers, content=b"")
+        # WHEN
+        caching.add_etag(response)
+        # THEN
+        assert response.headers.get("etag") == expected
+
+
+class TestIsNotModified:
+    @pytest.mark.parametrize(
+        ["request_headers", "expected"],
+        [
+            ({}, False),
+            ({"if-none-match": '"v1"'}, True),
+            ({"if-none-match": '"v0", W/"v1"'}, True),
+            ({"if-none-match": "*"}, True),
+            ({"if-none-match": '"v2"'}, False),
+            # If-None-Match takes precedence
+            (
+                {
+                    "if-none-match": '"v2"',
+                    "if-modified-since": "Sun, 18 Oct 2026 07:28:00 GMT",
+                },
+                False,
+            ),
+            ({"if-modified-since": "Sat, 17 Oct 2026 07:28:00 GMT"}, True),
+            ({"if-modified-since": "Sun, 18 Oct 2026 07:28:00 GMT"}, True),
+            ({"if-modified-since": "Fri, 16 Oct 2026 07:28:00 GMT"}, False),
+            ({"if-modified-since": "invalid"}, False),
+        ],
+    )
+    def test(self, request_headers: dict[str, str], expected: bool):
+        # GIVEN
+        headers = {"etag": '"v1"', "last-modified": "Sat, 17 Oct 2026 07:28:00 GMT"}
+        response = httpx.Response(200, headers=headers)
+        # WHEN
+        result = caching.is_not_modified(request_headers, response)
+        # THEN
+        assert result is expected
+
+    @pytest.mark.parametrize(
+        ["status_code", "headers"],
+        [(404, {"etag": '"v1"'}), (200, {})],
+    )
+    def test_when_response_can_not_match(
+        self, status_code: int, headers: dict[str, str]
+    ):
+        # GIVEN
+        response = httpx.Response(status_code, headers=headers)
+        # WHEN
+        result = caching.is_not_modified({"if-none-match": "*"}, response)
+        # THEN
+        assert result is False
+
+
+class TestMakeNotModified:
+    def test(self):
+        # GIVEN
+        headers = {
+            "cache-control": "max-age=60",
+            "content-type": "application/json",
+            "etag": '"v1"',
+            "vary": "Accept",
+        }
+        response = httpx.Response(200, headers=headers, json={})
+        # WHEN
+        result = caching.make_not_modified(response)
+        # THEN
+        assert result.status_code == 304
+        assert result.content == b""
+        assert dict(result.headers) == {
+            "cache-control": "max-age=60",
+            "etag": '"v1"',
+            "vary": "Accept",
+        }
+
+
+class TestGetValidators:
+    def test(self):
+        # GIVEN
+        headers = {"etag": '"v1"', "last-modified": "Sat, 17 Oct 2026 07:28:00 GMT"}
+        response = httpx.Response(200, headers=headers)
+        # WHEN
+        result = caching.get_validators(response)
+        # THEN
+        assert result == {
+            "if-none-match": '"v1"',
+            "if-modified-since": "Sat, 17 Oct 2026 07:28:00 GMT",
+        }
+
+    def test_without_validators(self):
+        assert caching.get_validators(httpx.Response(200)) == {}
+
+
+class TestRefreshResponse:
+    def test(self):
+        # GIVEN
+        headers = {
+            "cache-control": "max-age=10",
+            "content-type": "application/json",
+            "etag": '"v1"',
+        }
+        response = httpx.Response(200, headers=headers, content=b"{}")
+        compression.set_variants(response, {"gzip": b"gzipped"})
+        not_modified = httpx.Response(
+            304,
+            headers={"cache-control": "max-age=60", "content-length": "0"},
+        )
+        # WHEN
+        result = caching.refresh_response(response, not_modified)
+        # THEN
+        assert result.status_code == 200
+        assert result.content == b"{}"
+        assert result.headers["cache-control"] == "max-age=60"
+        assert result.headers["content-type"] == "application/json"
+        assert result.headers["content-length"] == "2"
+        assert result.headers["etag"] == '"v1"'
+        assert compression.get_variants(result) == {"gzip": b"gzipped"}
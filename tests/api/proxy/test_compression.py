@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import gzip
+from typing import TYPE_CHECKING
+
+import brotli
+import httpx
+import pytest
+import zstandard
+
+from src.api.proxy import compression
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+CONTENT = b'{"opening_crawl": "It is a period of civil war."}' * 30
+
+
+class TestIsCompressible:
+    @pytest.mark.parametrize(
+        ["content_type", "content", "expected"],
+        [
+            ("application/json", CONTENT, True),
+            ("application/vnd.api+json; charset=utf-8", CONTENT, True),
+            ("text/html", CONTENT, True),
+            ("application/json", b"{}", False),
+            ("image/png", CONTENT, False),
+            (None, CONTENT, False),
+        ],
+    )
+    def test(self, content_type: str | None, content: bytes, expected: bool):
+        assert compression.is_compressible(content_type, content) is expected
+
+
+class TestNegotiate:
+    @pytest.mark.parametrize(
+        ["accept_encoding", "expected"],
+        [
+            (None, None),
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("gzip, deflate, br, zstd", "zstd"),
+            ("br;q=0.5, GZIP", "gzip"),
+            ("zstd;q=0, gzip;q=0.1", "gzip"),
+            ("gzip;q=invalid", None),
+            ("gzip;level=1, , deflate", "gzip"),
+            ("*", "zstd"),
+            ("*;q=0.5, br", "br"),
+            ("*, zstd;q=0, br;q=0", "gzip"),
+        ],
+    )
+    def test(self, accept_encoding: str | None, expected: str | None):
+        assert compression.negotiate(accept_encoding) == expected
+
+
+class TestCompress:
+    @pytest.mark.parametrize(
+        ["encoding", "decompress"],
+        [
+            ("gzip", gzip.decompress),
+            ("br", brotli.decompress),
+            ("zstd", zstandard.ZstdDecompressor().decompress),
+        ],
+    )
+    def test(self, encoding: str, decompress: Callable[[bytes], bytes]):
+        # WHEN
+        content = compression.compress(CONTENT, encoding)
+        # THEN
+        assert len(content) < len(CONTENT)
+        assert decompress(content) == CONTENT
+
+
+class TestAddVariants:
+    def test(self):
+        # GIVEN
+        headers = {"content-type": "application/json"}
+        response = httpx.Response(200, headers=headers, content=CONTENT)
+        # WHEN
+        compression.add_variants(response)
+        # THEN
+        variants = compression.get_variants(response)
+        assert list(variants) == list(compression.ENCODINGS)
+        assert variants["gzip"] == compression.compress(CONTENT, "gzip")
+
+    def test_when_not_compressible(self):
+        # GIVEN
+        response = httpx.Response(200, content=CONTENT)
+        # WHEN
+        compression.add_variants(response)
+        # THEN
+        assert compression.get_variants(response) == {}
+
+    def test_when_variants_exist(self):
+        # GIVEN
+        headers = {"content-type": "application/json"}
+        response = httpx.Response(200, headers=headers, content=CONTENT)
+        compression.set_variants(response, {"gzip": b"gzipped"})
+        # WHEN
+        compression.add_variants(response)
+        # THEN
+        assert compression.get_variants(response) == {"gzip": b"gzipped"}
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import pytest
+from asgi_lifespan import LifespanManager
+
+from src.api.main import create_app
+from src.api.proxy import ProxyDispatcher
+from src.api.proxy.dispatcher import _get_proxy_path
+from tests.api import conftest
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from fastapi import FastAPI
+    from pytest_httpx import HTTPXMock
+
+    from tests.api.conftest import TestClient
+
+pytestmark = [pytest.mark.anyio]
+
+
+@pytest.fixture(scope="module")
+async def routes_app():
+    """The app serving the proxy with the FastAPI routes only."""
+    app = create_app()
+    app.user_middleware = [
+        middleware
+        for middleware in app.user_middleware
+        if middleware.cls is not ProxyDispatcher
+    ]
+    async with LifespanManager(app) as manager:
+        yield manager.app
+
+
+@pytest.fixture
+async def routes_client(routes_app: FastAPI) -> AsyncIterator[TestClient]:
+    async with conftest.TestClient(app=routes_app, base_url="http://test") as cli:
+        yield cli
+
+
+class TestGetProxyPath:
+    @pytest.mark.parametrize(
+        ["path", "query_string", "expected"],
+        [
+            ("", b"", ""),
+            ("films/1/", b"", "films/1"),
+            ("films//./1", b"", "films/1"),
+            ("people/", b"search=r2&page=2", "people?search=r2&page=2"),
+        ],
+    )
+    def test(self, path: str, query_string: bytes, expected: str):
+        assert _get_proxy_path(path, query_string) == expected
+
+
+class TestProxyDispatcher:
+    async def test_same_response_as_routes(
+        self, client: TestClient, routes_client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        url = "/proxy/swapi/vehicles/4/?format=json"
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/vehicles/4?format=json",
+            json={"name": "Sand Crawler"},
+        )
+        # WHEN
+        response = await client.get(url)
+        expected = await routes_client.get(url)
+        # THEN
+        assert response.status_code == expected.status_code == 200
+        assert response.content == expected.content
+
+    @pytest.mark.usefixtures("httpx_mock")
+    @pytest.mark.parametrize(
+        ["method", "url", "kwargs"],
+        [
+            ("GET", "/proxy/swapi", {}),
+            ("GET", "/proxy/unknown/films/1", {}),
+            ("CONNECT", "/proxy/swapi/films/1", {}),
+            ("GET", "/proxy_batch/swapi", {}),
+            ("POST", "/proxy_batch/unknown", {"json": {"items": []}}),
+            ("POST", "/proxy_batch/swapi", {"json": {"items": []}}),
+            ("POST", "/proxy_batch/swapi", {}),
+            ("POST", "/proxy_batch/swapi", {"content": b"{bad"}),
+            ("POST", "/proxy_batch/swapi", {"json": []}),
+            ("POST", "/proxy_batch/swapi", {"json": {"items": [{"path": "x"}]}}),
+            (
+                "POST",
+                "/proxy_batch/swapi",
+                {"json": {"items": [{"path": "/films/1"}, {"path": "/films/1"}]}},
+            ),
+            (
+                "POST",
+                "/proxy_batch/swapi",
+                {
+                    "content": b'{"items": []}',
+                    "headers": {"content-type": "text/plain"},
+                },
+            ),
+            (
+                "POST",
+                "/proxy_batch/swapi",
+                {
+                    "content": b'{"items": []}',
+                    "headers": {"content-type": "application/vnd.api+json"},
+                },
+            ),
+        ],
+    )
+    async def test_same_errors_as_routes(
+        self,
+        client: TestClient,
+        routes_client: TestClient,
+        method: str,
+        url: str,
+        kwargs: dict[str, Any],
+    ):
+        # WHEN
+        response = await client.request(method, url, **kwargs)
+        expected = await routes_client.request(method, url, **kwargs)
+        # THEN
+        assert response.status_code == expected.status_code
+        assert response.content == expected.content
+        assert response.headers.get("location") == expected.headers.get("location")
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from src.api.proxy import expanding
+
+BASE_URL = "https://swapi.dev/api"
+
+
+class TestSplitExpand:
+    @pytest.mark.parametrize(
+        ["path", "expected"],
+        [
+            ("films/1/", ("films/1/", [])),
+            ("films/1/?expand=", ("films/1/", [])),
+            ("/films/1/?expand=planets", ("/films/1/", ["planets"])),
+            (
+                "/films/?expand=characters,%20planets&search=hope",
+                ("/films/?search=hope", ["characters", "planets"]),
+            ),
+            (
+                "/films/1/?expand=planets&expand=characters,planets",
+                ("/films/1/", ["planets", "characters"]),
+            ),
+        ],
+    )
+    def test(self, path: str, expected: tuple[str, list[str]]):
+        assert expanding.split_expand(path) == expected
+
+
+class TestCollectLinks:
+    @pytest.mark.parametrize(
+        ["content", "expected"],
+        [
+            (
+                {
+                    "homeworld": f"{BASE_URL}/planets/1/",
+                    "films": [f"{BASE_URL}/films/1/", f"{BASE_URL}/films/2/"],
+                },
+                {"/planets/1/", "/films/1/", "/films/2/"},
+            ),
+            (
+                {
+                    "results": [
+                        {"homeworld": f"{BASE_URL}/planets/1/", "films": []},
+                        {"homeworld": f"{BASE_URL}/planets/1/", "films": None},
+                    ]
+                },
+                {"/planets/1/"},
+            ),
+            ({"homeworld": "https://example.com/planets/1/"}, set()),
+            ({"homeworld": f"{BASE_URL}x/planets/1/"}, set()),
+            ({"name": "Luke Skywalker"}, set()),
+            (["not", "a", "resource"], set()),
+        ],
+    )
+    def test(self, content: Any, expected: set[str]):
+        fields = ["homeworld", "films"]
+        assert expanding.collect_links(content, fields, BASE_URL) == expected
+
+
+class TestInlineLinks:
+    def test(self):
+        # GIVEN
+        content = {
+            "name": "Luke Skywalker",
+            "homeworld": f"{BASE_URL}/planets/1/",
+            "films": [f"{BASE_URL}/films/1/", f"{BASE_URL}/films/2/"],
+            "url": f"{BASE_URL}/people/1/",
+        }
+        resources = {
+            "/planets/1/": {"name": "Tatooine"},
+            "/films/1/": {"title": "A New Hope"},
+            "/people/1/": {"name": "Luke Skywalker"},
+        }
+        # WHEN
+        expanding.inline_links(
+            content, ["homeworld", "films", "species"], BASE_URL, resources
+        )
+        # THEN
+        assert content == {
+            "name": "Luke Skywalker",
+            "homeworld": {"name": "Tatooine"},
+            "films": [{"title": "A New Hope"}, f"{BASE_URL}/films/2/"],
+            "url": f"{BASE_URL}/people/1/",
+        }
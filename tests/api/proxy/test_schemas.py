@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from src.api.exceptions import GatewayTimeout
+from src.api.proxy import schemas
+
+
+class TestDumpBatchItem:
+    @pytest.mark.parametrize(
+        ["content", "expected"],
+        [
+            (b'{"name": "Luke Skywalker"}', {"name": "Luke Skywalker"}),
+            (b'{\r\n  "name": "Luke\\nSkywalker"\n}\n', {"name": "Luke\nSkywalker"}),
+            (b"Not Found", "Not Found"),
+            (b"", ""),
+        ],
+    )
+    def test_result(self, content: bytes, expected: object):
+        # GIVEN
+        response = httpx.Response(200, content=content)
+        # WHEN
+        data = schemas.dump_batch_item("/people/1", response)
+        # THEN
+        assert b"\n" not in data
+        assert json.loads(data) == {
+            "path": "/people/1",
+            "result": {
+                "status_code": 200,
+                "content": expected,
+                "etag": None,
+                "not_modified": False,
+            },
+            "error": None,
+        }
+
+    def test_not_modified(self):
+        # GIVEN
+        response = httpx.Response(304, headers={"etag": '"33a64df5"'})
+        # WHEN
+        data = schemas.dump_batch_item("/people/1", response)
+        # THEN
+        assert json.loads(data) == {
+            "path": "/people/1",
+            "result": {
+                "status_code": 304,
+                "content": None,
+                "etag": '"33a64df5"',
+                "not_modified": True,
+            },
+            "error": None,
+        }
+
+    def test_error(self):
+        # GIVEN
+        error = GatewayTimeout()
+        # WHEN
+        data = schemas.dump_batch_item("/people/1", error)
+        # THEN
+        assert json.loads(data) == {
+            "path": "/people/1",
+            "result": None,
+            "error": error.as_dict(),
+        }
+
+
+class TestDumpBatchResponse:
+    def test(self):
+        # GIVEN
+        items = [b'{"path":"/films/1"}', b'{"path":"/films/2"}']
+        # WHEN
+        data = schemas.dump_batch_response(items)
+        # THEN
+        assert json.loads(data) == {
+            "items": [{"path": "/films/1"}, {"path": "/films/2"}],
+        }
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import TYPE_CHECKING, Any
+
+import httpx
+import pytest
+
+from src.api.proxy.snapshot import (
+    Snapshot,
+    crawl,
+    dump_collections,
+    load_collections,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_httpx import HTTPXMock
+
+pytestmark = [pytest.mark.anyio]
+
+BASE_URL = "https://swapi.dev/api/"
+
+
+def _person(i: int, name: str) -> dict[str, Any]:
+    return {"name": name, "url": f"{BASE_URL}people/{i}/"}
+
+
+PEOPLE = [
+    _person(1, "Luke Skywalker"),
+    _person(2, "C-3PO"),
+    _person(3, "R2-D2"),
+    _person(4, "Darth Vader"),
+    *(_person(i, f"Trooper {i}") for i in range(5, 26)),
+]
+
+FILMS = [{"title": "A New Hope", "url": f"{BASE_URL}films/1/"}]
+
+
+@pytest.fixture
+def snapshot(tmp_path: Path) -> Snapshot:
+    path = tmp_path / "swapi.json"
+    dump_collections({"films": FILMS, "people": PEOPLE}, path)
+    return Snapshot(path, BASE_URL)
+
+
+class TestLoadCollections:
+    @pytest.mark.parametrize("name", ["swapi.json", "swapi.json.gz"])
+    def test_dumped(self, tmp_path: Path, name: str):
+        # GIVEN
+        path = tmp_path / name
+        collections = {"films": FILMS}
+        # WHEN
+        dump_collections(collections, path)
+        # THEN
+        assert load_collections(path) == collections
+        assert [p.name for p in tmp_path.iterdir()] == [name]
+
+    def test_gzipped(self, tmp_path: Path):
+        # GIVEN
+        path = tmp_path / "swapi.json.gz"
+        # WHEN
+        dump_collections({"films": FILMS}, path)
+        # THEN
+        assert path.read_bytes().startswith(b"\x1f\x8b")
+
+
+class TestCrawl:
+    async def test(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        httpx_mock.add_response(
+            url=BASE_URL,
+            json={"films": f"{BASE_URL}films/", "people": f"{BASE_URL}people/"},
+        )
+        httpx_mock.add_response(
+            url=f"{BASE_URL}films/",
+            json={"count": 1, "next": None, "results": FILMS},
+        )
+        httpx_mock.add_response(
+            url=f"{BASE_URL}people/",
+            json={
+                "count": 25,
+                "next": f"{BASE_URL}people/?page=2",
+                "results": PEOPLE[:10],
+            },
+        )
+        httpx_mock.add_response(
+            url=f"{BASE_URL}people/?page=2",
+            json={"count": 25, "next": None, "results": PEOPLE[10:]},
+        )
+        # WHEN
+        async with httpx.AsyncClient() as client:
+            collections = await crawl(client, BASE_URL)
+        # THEN
+        assert collections == {"films": FILMS, "people": PEOPLE}
+
+    async def test_when_upstream_fails(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        httpx_mock.add_response(url=BASE_URL, status_code=503)
+        # WHEN
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await crawl(client, BASE_URL)
+
+
+class TestSnapshot:
+    def test_root(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/")
+        # THEN
+        assert response is not None
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == {
+            "films": f"{BASE_URL}films/",
+            "people": f"{BASE_URL}people/",
+        }
+
+    def test_detail(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/people/4?format=json")
+        # THEN
+        assert response is not None
+        assert response.status_code == 200
+        assert response.json() == PEOPLE[3]
+
+    def test_detail_not_found(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/people/99")
+        # THEN
+        assert response is not None
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Not found"}
+
+    def test_page(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/people?page=2")
+        # THEN
+        assert response is not None
+        assert response.status_code == 200
+        assert response.json() == {
+            "count": 25,
+            "next": f"{BASE_URL}people/?page=3",
+            "previous": f"{BASE_URL}people/?page=1",
+            "results": PEOPLE[10:20],
+        }
+
+    def test_first_page(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/films")
+        # THEN
+        assert response is not None
+        assert response.json() == {
+            "count": 1,
+            "next": None,
+            "previous": None,
+            "results": FILMS,
+        }
+
+    @pytest.mark.parametrize("page", ["0", "4", "last"])
+    def test_page_not_found(self, snapshot: Snapshot, page: str):
+        # WHEN
+        response = snapshot.get(f"/people?page={page}")
+        # THEN
+        assert response is not None
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize(
+        ["search", "expected"],
+        [
+            ("sky", [PEOPLE[0]]),
+            ("D2", [PEOPLE[2]]),
+            ("r", [PEOPLE[0], PEOPLE[2], PEOPLE[3], *PEOPLE[4:11]]),
+            ("", PEOPLE[:10]),
+            ("yoda", []),
+        ],
+    )
+    def test_search(self, snapshot: Snapshot, search: str, expected: list[Any]):
+        # WHEN
+        response = snapshot.get(f"/people?search={search}")
+        # THEN
+        assert response is not None
+        assert response.json()["results"] == expected
+
+    def test_search_pages(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/people?search=trooper&page=2")
+        # THEN
+        assert response is not None
+        assert response.json() == {
+            "count": 21,
+            "next": f"{BASE_URL}people/?search=trooper&page=3",
+            "previous": f"{BASE_URL}people/?search=trooper&page=1",
+            "results": PEOPLE[14:24],
+        }
+
+    def test_search_fields(self, snapshot: Snapshot):
+        # WHEN
+        response = snapshot.get("/films?search=hope")
+        # THEN
+        assert response is not None
+        assert response.json()["results"] == FILMS
+
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/people?format=wookiee",
+            "/people?expand=true",
+            "/planets",
+            "/people/1/films",
+        ],
+    )
+    def test_when_left_to_upstream(self, snapshot: Snapshot, path: str):
+        assert snapshot.get(path) is None
+
+    def test_resources_of_other_host_are_not_served(self, tmp_path: Path):
+        # GIVEN
+        path = tmp_path / "swapi.json"
+        dump_collections({"people": [_person(1, "Luke Skywalker")]}, path)
+        snapshot = Snapshot(path, "https://swapi.py4e.com/api")
+        # WHEN
+        response = snapshot.get("/people/1")
+        # THEN
+        assert response is not None
+        assert response.status_code == 404
+
+
+class TestReload:
+    def test(self, tmp_path: Path, snapshot: Snapshot):
+        # GIVEN
+        path = tmp_path / "swapi.json"
+        dump_collections({"films": FILMS[:0]}, path)
+        os.utime(path, ns=(0, 0))
+        # WHEN
+        snapshot.reload()
+        # THEN
+        response = snapshot.get("/films/1")
+        assert response is not None
+        assert response.status_code == 404
+
+    def test_when_not_changed(self, tmp_path: Path, snapshot: Snapshot):
+        # GIVEN
+        path = tmp_path / "swapi.json"
+        mtime = path.stat().st_mtime_ns
+        dump_collections({"films": FILMS[:0]}, path)
+        os.utime(path, ns=(mtime, mtime))
+        # WHEN
+        snapshot.reload()
+        # THEN
+        response = snapshot.get("/films/1")
+        assert response is not None
+        assert response.status_code == 200
+
+    async def test_reloading_disabled(self, tmp_path: Path):
+        # GIVEN
+        path = tmp_path / "swapi.json"
+        dump_collections({"films": FILMS}, path)
+        async with Snapshot(path, BASE_URL) as snapshot:
+            # WHEN
+            dump_collections({"films": FILMS[:0]}, path)
+            os.utime(path, ns=(0, 0))
+            await asyncio.sleep(0.05)
+            # THEN
+            response = snapshot.get("/films/1")
+            assert response is not None
+            assert response.status_code == 200
+
+    async def test_reloading_periodically(self, tmp_path: Path):
+        # GIVEN
+        path = tmp_path / "swapi.json"
+        dump_collections({"films": FILMS}, path)
+        async with Snapshot(path, BASE_URL, reload_interval=0.01) as snapshot:
+            # WHEN
+            dump_collections({"films": FILMS[:0]}, path)
+            os.utime(path, ns=(0, 0))
+            await asyncio.sleep(0.05)
+            # THEN
+            response = snapshot.get("/films/1")
+            assert response is not None
+            assert response.status_code == 404
+
+    async def test_when_reloading_fails(
+        self, tmp_path: Path, caplog: pytest.LogCaptureFixture
+    ):
+        # GIVEN
+        path = tmp_path / "swapi.json"
+        dump_collections({"films": FILMS}, path)
+        async with Snapshot(path, BASE_URL, reload_interval=0.01) as snapshot:
+            # WHEN
+            path.write_bytes(b"{bad")
+            os.utime(path, ns=(0, 0))
+            await asyncio.sleep(0.05)
+            # THEN
+            response = snapshot.get("/films/1")
+            assert response is not None
+            assert response.status_code == 200
+        assert "Failed to reload the snapshot." in caplog.messages
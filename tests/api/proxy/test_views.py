@@ -1,19 +1,122 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import asyncio
+import gzip
+import json
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import TYPE_CHECKING, cast
+from unittest import mock
 
+import anyio
+import brotli
 import httpx
 import pytest
+import zstandard
+from asgi_lifespan import LifespanManager
+from fastapi import Request, Response
 
-from src.api.exceptions import APIError, BadGateway, GatewayTimeout
+from src.api import metrics
+from src.api.exceptions import (
+    APIError,
+    BadGateway,
+    CircuitOpen,
+    ClientClosedRequest,
+    GatewayTimeout,
+    RateLimit,
+    ServiceUnavailable,
+)
+from src.api.main import create_app
+from src.api.proxy import compression, views
+from src.api.proxy.snapshot import dump_collections
+from src.config import RateLimitRule, config
+from src.toolkit.asyncio import ConcurrencyLimiter, ConcurrencyLimitError
+from src.toolkit.cache import Cache
+from src.toolkit.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.toolkit.rate_limit import RateLimiter, RateLimitError
+from src.toolkit.rate_limit.rate_limit import RateLimitResult
+from tests.api import conftest
 
 if TYPE_CHECKING:
+    from pathlib import Path
+
+    from fastapi import FastAPI
     from pytest_httpx import HTTPXMock
 
     from tests.api.conftest import TestClient
 
 pytestmark = [pytest.mark.anyio]
 
+# big enough to be compressed
+LARGE_CONTENT = {"opening_crawl": "It is a period of civil war. " * 50}
+
+SNAPSHOT_FILMS = [{"title": "A New Hope", "url": "https://swapi.dev/api/films/1/"}]
+
+DECOMPRESSORS = {
+    "br": brotli.decompress,
+    "gzip": gzip.decompress,
+    "zstd": zstandard.ZstdDecompressor().decompress,
+}
+
+
+async def _get_raw(
+    client: TestClient, url: str, headers: dict[str, str]
+) -> tuple[httpx.Response, bytes]:
+    """Makes a GET request, returning the response body as it was sent."""
+    async with client.stream("GET", url, headers=headers) as response:
+        content = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response, content
+
+
+@pytest.fixture
+def with_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = config.get_service("swapi")
+    monkeypatch.setattr(service, "cache_ttl", 60)
+
+
+@pytest.fixture
+def with_stale_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = config.get_service("swapi")
+    monkeypatch.setattr(service, "cache_ttl", 60)
+    monkeypatch.setattr(service, "cache_stale_while_revalidate", 60)
+
+
+@pytest.fixture
+def with_stale_if_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = config.get_service("swapi")
+    monkeypatch.setattr(service, "cache_ttl", 60)
+    monkeypatch.setattr(service, "cache_stale_if_error", 60)
+
+
+@pytest.fixture
+def with_revalidation(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = config.get_service("swapi")
+    monkeypatch.setattr(service, "cache_ttl", 60)
+    monkeypatch.setattr(service, "cache_keep_stale", 60)
+
+
+@pytest.fixture
+def with_streaming(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = config.get_service("swapi")
+    monkeypatch.setattr(service, "stream_responses", True)
+
+
+@pytest.fixture
+async def snapshot_client(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> AsyncIterator[TestClient]:
+    """A client of the app serving films of the swapi service from a snapshot."""
+    path = tmp_path / "swapi.json"
+    dump_collections({"films": SNAPSHOT_FILMS}, path)
+    monkeypatch.setattr(config.get_service("swapi"), "snapshot_path", path)
+    app = create_app()
+    async with (
+        LifespanManager(app) as manager,
+        conftest.TestClient(
+            app=cast("FastAPI", manager.app), base_url="http://test"
+        ) as cli,
+    ):
+        yield cli
+
 
 class TestProxy:
     async def test_proxy_to_root(self, client: TestClient, httpx_mock: HTTPXMock):
@@ -38,6 +141,40 @@ class TestProxy:
         assert response.status_code == 200
         assert response.json() == expected_response
 
+    async def test_head(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/films/12"
+        httpx_mock.add_response(
+            method="HEAD",
+            url=proxy_url,
+            headers={"content-type": "application/json", "content-length": "1234"},
+        )
+        # WHEN
+        response = await client.head("/proxy/swapi/films/12")
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["content-length"] == "1234"
+        assert response.content == b""
+        upstream_request = httpx_mock.get_request()
+        assert upstream_request is not None
+        assert upstream_request.headers["accept-encoding"] == "identity"
+
+    async def test_head_of_encoded_body(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/films/13"
+        httpx_mock.add_response(
+            method="HEAD",
+            url=proxy_url,
+            headers={"content-encoding": "gzip", "content-length": "321"},
+        )
+        # WHEN
+        response = await client.head("/proxy/swapi/films/13")
+        # THEN
+        assert response.status_code == 200
+        assert "content-length" not in response.headers
+
     async def test_proxy_query_params(self, client: TestClient, httpx_mock: HTTPXMock):
         # GIVEN
         proxy_url = "https://swapi.dev/api/people?search=r2"
@@ -60,6 +197,15 @@ class TestProxy:
         assert response.status_code == 200
         assert response.json() == payload
 
+    async def test_proxy_without_body(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/films/1"
+        httpx_mock.add_response(url=proxy_url, method="DELETE", json={})
+        # WHEN
+        response = await client.delete("/proxy/swapi/films/1")
+        # THEN
+        assert response.status_code == 200
+
     @pytest.mark.parametrize(
         ["error", "expected_error"],
         [
@@ -84,6 +230,679 @@ class TestProxy:
         assert response.status_code == expected_error.status_code
         assert response.json() == expected_error.as_dict()
 
+    async def test_retrying_connect_errors(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/people?search=leia"
+        httpx_mock.add_exception(httpx.ConnectError("failed"), url=proxy_url)
+        httpx_mock.add_response(url=proxy_url, json={"count": 1})
+        # WHEN
+        response = await client.get("/proxy/swapi/people/?search=leia")
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == {"count": 1}
+
+    @pytest.mark.usefixtures("with_cache")
+    async def test_caching(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/1"
+        expected_response = {"name": "Tatooine"}
+        httpx_mock.add_response(url=proxy_url, json=expected_response)
+        # WHEN
+        responses = [await client.get("/proxy/swapi/planets/1") for _ in range(2)]
+        # THEN
+        assert [response.json() for response in responses] == [expected_response] * 2
+        assert len(httpx_mock.get_requests()) == 1
+
+    @pytest.mark.usefixtures("with_cache")
+    async def test_when_cache_fails(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/14"
+        expected_response = {"name": "Kashyyyk"}
+        httpx_mock.add_response(url=proxy_url, json=expected_response)
+        errors = [metrics.cache_errors.labels("swapi", op) for op in ("get", "set")]
+        before = [error.value for error in errors]
+        # WHEN
+        with (
+            mock.patch.object(Cache, "get", side_effect=ConnectionError),
+            mock.patch.object(Cache, "set", side_effect=ConnectionError),
+        ):
+            response = await client.get("/proxy/swapi/planets/14")
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == expected_response
+        assert [error.value for error in errors] == [value + 1 for value in before]
+        assert "Failed to get a response from the cache." in caplog.messages
+        assert "Failed to store a response in the cache." in caplog.messages
+
+    @pytest.mark.usefixtures("with_stale_cache")
+    async def test_serving_stale_while_revalidating(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/3"
+        headers = {"cache-control": "max-age=10"}
+        httpx_mock.add_response(url=proxy_url, headers=headers, json={"v": 1})
+        httpx_mock.add_response(url=proxy_url, headers=headers, json={"v": 2})
+        with mock.patch("time.time", return_value=0):
+            await client.get("/proxy/swapi/planets/3")
+
+        with mock.patch("time.time", return_value=15):
+            # WHEN
+            response = await client.get("/proxy/swapi/planets/3")
+            # THEN
+            assert response.json() == {"v": 1}
+
+            # WHEN
+            await asyncio.gather(*views._background_tasks)
+            response = await client.get("/proxy/swapi/planets/3")
+            # THEN
+            assert response.json() == {"v": 2}
+
+        assert len(httpx_mock.get_requests()) == 2
+
+    @pytest.mark.parametrize(
+        "error",
+        [httpx.Response(503), httpx.ReadTimeout("timeout")],
+        ids=["server error", "timeout"],
+    )
+    @pytest.mark.usefixtures("with_stale_if_error")
+    async def test_serving_stale_if_error(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        error: httpx.Response | httpx.HTTPError,
+    ):
+        # GIVEN
+        path = f"/planets/4?error={type(error).__name__}"
+        proxy_url = f"https://swapi.dev/api{path}"
+        headers = {"cache-control": "max-age=10"}
+        httpx_mock.add_response(url=proxy_url, headers=headers, json={"v": 1})
+        if isinstance(error, httpx.Response):
+            httpx_mock.add_response(url=proxy_url, status_code=503, json={})
+        else:
+            httpx_mock.add_exception(error, url=proxy_url)
+        with mock.patch("time.time", return_value=0):
+            await client.get(f"/proxy/swapi{path}")
+
+        # WHEN
+        with mock.patch("time.time", return_value=15):
+            response = await client.get(f"/proxy/swapi{path}")
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == {"v": 1}
+
+        # WHEN: the response has been stale for too long
+        with mock.patch("time.time", return_value=75):
+            response = await client.get(f"/proxy/swapi{path}")
+        # THEN
+        assert response.status_code != 200
+
+    @pytest.mark.usefixtures("with_cache")
+    async def test_caching_respects_vary(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/4"
+        httpx_mock.add_response(url=proxy_url, headers={"vary": "Accept"}, json={})
+        # WHEN
+        for accept in ["application/json", "application/json", "text/html"]:
+            await client.get("/proxy/swapi/planets/4", headers={"accept": accept})
+        # THEN
+        assert len(httpx_mock.get_requests()) == 2
+
+    @pytest.mark.usefixtures("with_cache")
+    async def test_caching_respects_cache_control(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/2"
+        headers = {"cache-control": "no-store"}
+        httpx_mock.add_response(url=proxy_url, headers=headers, json={})
+        # WHEN
+        for _ in range(2):
+            await client.get("/proxy/swapi/planets/2")
+        # THEN
+        assert len(httpx_mock.get_requests()) == 2
+
+    async def test_caching_is_disabled_by_default(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/3"
+        httpx_mock.add_response(url=proxy_url, json={})
+        # WHEN
+        for _ in range(2):
+            await client.get("/proxy/swapi/planets/3")
+        # THEN
+        assert len(httpx_mock.get_requests()) == 2
+
+    async def test_coalescing_identical_requests(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/planets/5"
+
+        async def respond(request: httpx.Request) -> httpx.Response:
+            await anyio.sleep(0.01)
+            return httpx.Response(200, json={"name": "Dagobah"})
+
+        httpx_mock.add_callback(respond, url=proxy_url)
+
+        # WHEN
+        async with anyio.create_task_group() as tg:
+            for _ in range(3):
+                tg.start_soon(client.get, "/proxy/swapi/planets/5")
+
+        # THEN
+        assert len(httpx_mock.get_requests()) == 1
+
+    @pytest.mark.parametrize(
+        ["accept_encoding", "expected"],
+        [
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("gzip, br;q=0.8, zstd;q=0.9", "gzip"),
+            ("identity", None),
+        ],
+    )
+    async def test_compressing(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        accept_encoding: str,
+        expected: str | None,
+    ):
+        # GIVEN
+        path = f"/films/1?encoding={expected}"
+        httpx_mock.add_response(
+            url=f"https://swapi.dev/api{path}",
+            headers={"content-encoding": "gzip", "content-type": "application/json"},
+            stream=httpx.ByteStream(gzip.compress(json.dumps(LARGE_CONTENT).encode())),
+        )
+        # WHEN
+        response, content = await _get_raw(
+            client, f"/proxy/swapi{path}", headers={"accept-encoding": accept_encoding}
+        )
+        # THEN
+        assert response.status_code == 200
+        assert response.headers.get("content-encoding") == expected
+        assert response.headers["content-length"] == str(len(content))
+        assert response.headers["vary"] == "Accept-Encoding"
+        if expected is not None:
+            content = DECOMPRESSORS[expected](content)
+        assert json.loads(content) == LARGE_CONTENT
+        # the upstream is asked for the encodings the proxy can decode
+        upstream_request = httpx_mock.get_request()
+        assert upstream_request is not None
+        assert "gzip" in upstream_request.headers["accept-encoding"]
+
+    @pytest.mark.usefixtures("with_cache")
+    async def test_compressing_cached_response(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/films/2"
+        httpx_mock.add_response(url=proxy_url, json=LARGE_CONTENT)
+        await client.get("/proxy/swapi/films/2")
+        # WHEN
+        with mock.patch.object(
+            compression, "compress", wraps=compression.compress
+        ) as compress:
+            response = await client.get(
+                "/proxy/swapi/films/2", headers={"accept-encoding": "gzip"}
+            )
+        # THEN
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == LARGE_CONTENT
+        assert compress.call_count == 0
+        assert len(httpx_mock.get_requests()) == 1
+
+    async def test_dropping_hop_by_hop_headers(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/films/3",
+            headers={"connection": "x-response-hop", "x-response-hop": "1"},
+            json={},
+        )
+        headers = {"connection": "x-hop", "x-hop": "1", "te": "trailers"}
+        # WHEN
+        response = await client.get("/proxy/swapi/films/3", headers=headers)
+        # THEN
+        assert response.status_code == 200
+        assert "x-response-hop" not in response.headers
+        upstream_request = httpx_mock.get_request()
+        assert upstream_request is not None
+        assert "x-hop" not in upstream_request.headers
+        assert "te" not in upstream_request.headers
+
+    async def test_not_modified(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/species/1"
+        httpx_mock.add_response(url=proxy_url, json={"name": "Human"})
+        httpx_mock.add_response(url=proxy_url, json={"name": "Human"})
+        response = await client.get("/proxy/swapi/species/1")
+        etag = response.headers["etag"]
+        # WHEN
+        response = await client.get(
+            "/proxy/swapi/species/1", headers={"if-none-match": etag}
+        )
+        # THEN
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        # the client's validators are not sent to the upstream
+        assert "if-none-match" not in httpx_mock.get_requests()[-1].headers
+
+    async def test_etag_of_compressed_response(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/species/2"
+        for _ in range(3):
+            httpx_mock.add_response(url=proxy_url, json=LARGE_CONTENT)
+        url = "/proxy/swapi/species/2"
+        identity = await client.get(url, headers={"accept-encoding": "identity"})
+        compressed = await client.get(url, headers={"accept-encoding": "gzip"})
+        # WHEN
+        response = await client.get(
+            url,
+            headers={
+                "accept-encoding": "gzip",
+                "if-none-match": compressed.headers["etag"],
+            },
+        )
+        # THEN
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.headers["etag"] == f"W/{identity.headers['etag']}"
+        assert response.status_code == 304
+        assert response.headers["etag"] == compressed.headers["etag"]
+
+    async def test_not_modified_since(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        last_modified = "Sat, 17 Oct 2026 07:28:00 GMT"
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/species/2",
+            headers={"last-modified": last_modified},
+            json={"name": "Droid"},
+        )
+        # WHEN
+        response = await client.get(
+            "/proxy/swapi/species/2", headers={"if-modified-since": last_modified}
+        )
+        # THEN
+        assert response.status_code == 304
+        assert response.headers["last-modified"] == last_modified
+
+    @pytest.mark.usefixtures("with_revalidation")
+    async def test_revalidating(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/species/3"
+        headers = {"cache-control": "max-age=10", "etag": '"v1"'}
+        httpx_mock.add_response(url=proxy_url, headers=headers, json={"v": 1})
+        httpx_mock.add_response(
+            url=proxy_url,
+            status_code=304,
+            headers={"cache-control": "max-age=30", "etag": '"v1"'},
+        )
+        with mock.patch("time.time", return_value=0):
+            await client.get("/proxy/swapi/species/3")
+
+        # WHEN
+        with mock.patch("time.time", return_value=15):
+            response = await client.get("/proxy/swapi/species/3")
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == {"v": 1}
+        assert response.headers["etag"] == '"v1"'
+        assert httpx_mock.get_requests()[-1].headers["if-none-match"] == '"v1"'
+
+        # WHEN: the revalidated response is fresh for another 30 seconds
+        with mock.patch("time.time", return_value=40):
+            response = await client.get("/proxy/swapi/species/3")
+        # THEN
+        assert response.json() == {"v": 1}
+        assert len(httpx_mock.get_requests()) == 2
+
+    async def test_expanding(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        film = {
+            "title": "The Force Awakens",
+            "characters": [
+                "https://swapi.dev/api/people/85/",
+                "https://swapi.dev/api/people/86/",
+            ],
+            "planets": ["https://swapi.dev/api/planets/61/"],
+            "url": "https://swapi.dev/api/films/7/",
+        }
+        httpx_mock.add_response(url="https://swapi.dev/api/films/7", json=film)
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/people/85/", json={"name": "Rey"}
+        )
+        httpx_mock.add_response(url="https://swapi.dev/api/people/86/", status_code=404)
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/planets/61/", json={"name": "Jakku"}
+        )
+        # WHEN
+        response = await client.get("/proxy/swapi/films/7/?expand=characters,planets")
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == {
+            **film,
+            "characters": [{"name": "Rey"}, "https://swapi.dev/api/people/86/"],
+            "planets": [{"name": "Jakku"}],
+        }
+
+    @pytest.mark.parametrize(
+        ["status_code", "content"],
+        [
+            (404, b'{"detail": "Not found"}'),
+            (200, b"Not JSON"),
+            (200, b'{"planets": []}'),
+        ],
+    )
+    async def test_nothing_to_expand(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        status_code: int,
+        content: bytes,
+    ):
+        # GIVEN
+        proxy_url = f"https://swapi.dev/api/films/8?case={len(content)}"
+        httpx_mock.add_response(
+            url=proxy_url,
+            status_code=status_code,
+            content=content,
+            headers={"content-type": "application/json"},
+        )
+        # WHEN
+        response = await client.get(
+            f"/proxy/swapi/films/8/?case={len(content)}&expand=planets"
+        )
+        # THEN
+        assert response.status_code == status_code
+        assert response.content == content
+
+    async def test_rate_limit_rules(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        # GIVEN
+        service = config.get_service("swapi")
+        rules = [
+            RateLimitRule(limit=3, period=61),
+            RateLimitRule(limit=1, period=7, scope="service"),
+        ]
+        monkeypatch.setattr(service, "rate_limits", rules)
+        httpx_mock.add_response(url="https://swapi.dev/api/films/91", json={})
+        # WHEN
+        first = await client.get("/proxy/swapi/films/91")
+        second = await client.get("/proxy/swapi/films/91")
+        # THEN
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert second.headers["retry-after"] == "7"
+
+    @pytest.mark.usefixtures("httpx_mock")
+    async def test_when_rate_limited(self, client: TestClient):
+        # GIVEN
+        result = RateLimitResult(False, remaining=0, reset_after=1, retry_after=1)
+        limit = mock.patch.object(
+            RateLimiter, "limit_many", side_effect=RateLimitError(result)
+        )
+        # WHEN
+        with limit:
+            response = await client.get("/proxy/swapi/films/1")
+        # THEN
+        assert response.status_code == 429
+        assert response.json() == RateLimit().as_dict()
+
+    @pytest.mark.usefixtures("httpx_mock")
+    @pytest.mark.parametrize("method", ["GET", "DELETE"])
+    async def test_when_upstream_is_overloaded(self, client: TestClient, method: str):
+        # GIVEN
+        acquire = mock.patch.object(
+            ConcurrencyLimiter, "_acquire", side_effect=ConcurrencyLimitError
+        )
+        # WHEN
+        with acquire:
+            response = await client.request(method, "/proxy/swapi/films/1")
+        # THEN
+        assert response.status_code == 503
+        assert response.json() == ServiceUnavailable().as_dict()
+
+    @pytest.mark.usefixtures("httpx_mock")
+    @pytest.mark.parametrize("method", ["GET", "DELETE"])
+    async def test_when_circuit_is_open(self, client: TestClient, method: str):
+        # GIVEN
+        enter = mock.patch.object(
+            CircuitBreaker, "__enter__", side_effect=CircuitOpenError
+        )
+        # WHEN
+        with enter:
+            response = await client.request(method, "/proxy/swapi/films/1")
+        # THEN
+        assert response.status_code == 503
+        assert response.json() == CircuitOpen().as_dict()
+
+    @pytest.mark.usefixtures("with_streaming")
+    async def test_streaming(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/films/1"
+        expected_response = {"release_date": "1977-05-25"}
+        headers = {"transfer-encoding": "chunked"}
+        httpx_mock.add_response(url=proxy_url, headers=headers, json=expected_response)
+        # WHEN
+        response = await client.get("/proxy/swapi/films/1")
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == expected_response
+        assert response.headers["content-type"] == "application/json"
+        assert "transfer-encoding" not in response.headers
+
+    @pytest.mark.parametrize(
+        ["accept_encoding", "expected"],
+        [("gzip, br", "gzip, br"), ("", "identity")],
+    )
+    @pytest.mark.usefixtures("with_streaming")
+    async def test_streaming_compressed(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        accept_encoding: str,
+        expected: str,
+    ):
+        # GIVEN
+        path = f"/films/2?accept-encoding={expected}"
+        upstream_content = gzip.compress(json.dumps(LARGE_CONTENT).encode())
+        httpx_mock.add_response(
+            url=f"https://swapi.dev/api{path}",
+            headers={"content-encoding": "gzip", "content-type": "application/json"},
+            stream=httpx.ByteStream(upstream_content),
+        )
+        # WHEN
+        response, content = await _get_raw(
+            client, f"/proxy/swapi{path}", headers={"accept-encoding": accept_encoding}
+        )
+        # THEN: the body is passed through as is
+        assert response.headers["content-encoding"] == "gzip"
+        assert content == upstream_content
+        upstream_request = httpx_mock.get_request()
+        assert upstream_request is not None
+        assert upstream_request.headers["accept-encoding"] == expected
+
+    @pytest.mark.usefixtures("with_streaming")
+    async def test_streaming_with_body(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/films/1"
+        payload = {"released_date": "1977-05-26"}
+        httpx_mock.add_response(url=proxy_url, json=payload)
+        # WHEN
+        response = await client.patch("/proxy/swapi/films/1", json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert response.json() == payload
+
+    @pytest.mark.usefixtures("with_streaming")
+    async def test_snapshot(self, snapshot_client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/planets/1", json={"name": "Tatooine"}
+        )
+        # WHEN
+        detail = await snapshot_client.get("/proxy/swapi/films/1/")
+        search = await snapshot_client.get("/proxy/swapi/films/?search=hope")
+        upstream = await snapshot_client.get("/proxy/swapi/planets/1/")
+        # THEN
+        assert detail.status_code == 200
+        assert detail.json() == SNAPSHOT_FILMS[0]
+        assert "etag" in detail.headers
+        assert search.json()["results"] == SNAPSHOT_FILMS
+        assert upstream.json() == {"name": "Tatooine"}
+        assert len(httpx_mock.get_requests()) == 1
+
+
+class TestCancelOnDisconnect:
+    @staticmethod
+    def _make_request(disconnected: anyio.Event) -> Request:
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        return Request({"type": "http"}, receive)
+
+    async def test(self):
+        # GIVEN
+        request = self._make_request(anyio.Event())
+
+        async def fn() -> int:
+            return 1
+
+        # WHEN
+        result = await views._cancel_on_disconnect(request, fn())
+
+        # THEN
+        assert result == 1
+
+    async def test_when_client_disconnects(self):
+        # GIVEN
+        disconnected, cancelled = anyio.Event(), anyio.Event()
+        request = self._make_request(disconnected)
+
+        async def fn() -> int:
+            disconnected.set()
+            try:
+                await anyio.sleep_forever()
+            finally:
+                cancelled.set()
+            return 1  # pragma: no cover
+
+        # WHEN
+        with pytest.raises(ClientClosedRequest):
+            await views._cancel_on_disconnect(request, fn())
+
+        # THEN
+        with anyio.fail_after(1):
+            await cancelled.wait()
+
+
+class TestAddVary:
+    @pytest.mark.parametrize(
+        ["vary", "expected"],
+        [
+            (None, "Accept-Encoding"),
+            ("Accept", "Accept, Accept-Encoding"),
+            ("Accept, accept-encoding", "Accept, accept-encoding"),
+            ("*", "*"),
+        ],
+    )
+    def test(self, vary: str | None, expected: str):
+        assert views._add_vary(vary, "Accept-Encoding") == expected
+
+
+class TestWeakenEtag:
+    @pytest.mark.parametrize(
+        ["etag", "expected"],
+        [('"v1"', 'W/"v1"'), ('W/"v1"', 'W/"v1"'), (None, None)],
+    )
+    def test(self, etag: str | None, expected: str | None):
+        # GIVEN
+        response = Response(headers={"etag": etag} if etag else {})
+        # WHEN
+        views._weaken_etag(response)
+        # THEN
+        assert response.headers.get("etag") == expected
+
+
+class TestMakeStreamingResponse:
+    async def test_closing_upstream_on_disconnect(self):
+        # GIVEN
+        body_sent, closed = anyio.Event(), anyio.Event()
+
+        class Stream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b"chunk"
+                await anyio.sleep_forever()
+
+            async def aclose(self) -> None:
+                closed.set()
+
+        async def receive():
+            await body_sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                body_sent.set()
+
+        response = views._make_streaming_response(httpx.Response(200, stream=Stream()))
+
+        # WHEN
+        with anyio.fail_after(1):
+            await response({"type": "http"}, receive, send)
+
+        # THEN
+        assert closed.is_set()
+
+
+class TestIterBatchItems:
+    async def test_cancelling_pending_calls(self):
+        # GIVEN
+        cancelled = anyio.Event()
+
+        async def fetch(path: str) -> httpx.Response:
+            if path == "/slow":
+                try:
+                    await anyio.sleep_forever()
+                finally:
+                    cancelled.set()
+            return httpx.Response(200, json={})
+
+        items = cast(
+            AsyncGenerator[bytes, None],
+            views._iter_batch_items(["/fast", "/slow"], fetch),
+        )
+
+        # WHEN
+        line = await anext(items)
+        await items.aclose()
+
+        # THEN
+        assert json.loads(line)["path"] == "/fast"
+        with anyio.fail_after(1):
+            await cancelled.wait()
+
 
 class TestProxyBatch:
     url = "/proxy_batch/swapi"
@@ -113,6 +932,8 @@ class TestProxyBatch:
                     "result": {
                         "status_code": 200,
                         "content": expected_response_1,
+                        "etag": mock.ANY,
+                        "not_modified": False,
                     },
                     "error": None,
                 },
@@ -121,6 +942,8 @@ class TestProxyBatch:
                     "result": {
                         "status_code": 200,
                         "content": expected_response_2,
+                        "etag": mock.ANY,
+                        "not_modified": False,
                     },
                     "error": None,
                 },
@@ -157,6 +980,8 @@ class TestProxyBatch:
                     "result": {
                         "status_code": 200,
                         "content": expected_response_1,
+                        "etag": mock.ANY,
+                        "not_modified": False,
                     },
                     "error": None,
                 },
@@ -177,12 +1002,212 @@ class TestProxyBatch:
                     "result": {
                         "status_code": 200,
                         "content": expected_response_3,
+                        "etag": mock.ANY,
+                        "not_modified": False,
                     },
                     "error": None,
                 },
             ]
         }
 
+    async def test_expanding(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        person = {
+            "name": "Finn",
+            "homeworld": "https://swapi.dev/api/planets/28/",
+        }
+        httpx_mock.add_response(url="https://swapi.dev/api/people/84/", json=person)
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/planets/28/", json={"name": "unknown"}
+        )
+        payload = {"items": [{"path": "/people/84/?expand=homeworld"}]}
+        # WHEN
+        response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        item = response.json()["items"][0]
+        assert item["result"]["content"] == {**person, "homeworld": {"name": "unknown"}}
+
+    async def test_cost_counts_against_every_rule(
+        self,
+        client: TestClient,
+        httpx_mock: HTTPXMock,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        # GIVEN
+        service = config.get_service("swapi")
+        rules = [
+            RateLimitRule(limit=3, period=63),
+            RateLimitRule(limit=100, period=63, scope="service"),
+        ]
+        monkeypatch.setattr(service, "rate_limits", rules)
+        httpx_mock.add_response(url="https://swapi.dev/api/films/92", json={})
+        httpx_mock.add_response(url="https://swapi.dev/api/films/93", json={})
+        payload = {"items": [{"path": "/films/92"}, {"path": "/films/93"}]}
+        # WHEN
+        first = await client.post(self.url, json=payload)
+        second = await client.post(self.url, json=payload)
+        # THEN
+        assert first.status_code == 200
+        assert second.status_code == 429
+
+    async def test_expanding_when_rate_limited(
+        self, client: TestClient, httpx_mock: HTTPXMock
+    ):
+        # GIVEN
+        person = {"name": "Poe", "homeworld": "https://swapi.dev/api/planets/62/"}
+        httpx_mock.add_response(url="https://swapi.dev/api/people/87/", json=person)
+        result = RateLimitResult(False, remaining=0, reset_after=1, retry_after=1)
+        limit = mock.patch.object(
+            RateLimiter, "limit_many", side_effect=[result, RateLimitError(result)]
+        )
+        payload = {"items": [{"path": "/people/87/?expand=homeworld"}]}
+        # WHEN
+        with limit:
+            response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert response.json()["items"][0]["error"] == RateLimit().as_dict()
+
+    @pytest.mark.usefixtures("httpx_mock")
+    async def test_when_upstream_is_overloaded(self, client: TestClient):
+        # GIVEN
+        payload = {"items": [{"path": "/films/1"}]}
+        acquire = mock.patch.object(
+            ConcurrencyLimiter, "_acquire", side_effect=ConcurrencyLimitError
+        )
+        # WHEN
+        with acquire:
+            response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert response.json()["items"][0]["error"] == ServiceUnavailable().as_dict()
+
+    @pytest.mark.usefixtures("httpx_mock")
+    async def test_when_circuit_is_open(self, client: TestClient):
+        # GIVEN
+        payload = {"items": [{"path": "/films/1"}]}
+        enter = mock.patch.object(
+            CircuitBreaker, "__enter__", side_effect=CircuitOpenError
+        )
+        # WHEN
+        with enter:
+            response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert response.json()["items"][0]["error"] == CircuitOpen().as_dict()
+
+    @pytest.mark.usefixtures("with_cache")
+    async def test_caching(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/starships/2"
+        expected_response = {"name": "CR90 corvette"}
+        httpx_mock.add_response(url=proxy_url, json=expected_response)
+        await client.get("/proxy/swapi/starships/2")
+
+        payload = {"items": [{"path": "/starships/2"}]}
+
+        # WHEN
+        response = await client.post(self.url, json=payload)
+
+        # THEN
+        assert response.status_code == 200
+        assert response.json()["items"][0]["result"]["content"] == expected_response
+        assert len(httpx_mock.get_requests()) == 1
+
+    async def test_not_modified(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        for n in (4, 5):
+            httpx_mock.add_response(
+                url=f"https://swapi.dev/api/starships/{n}",
+                headers={"etag": f'"v{n}"'},
+                json={"name": f"starship {n}"},
+            )
+        payload = {
+            "items": [
+                {"path": "/starships/4", "etag": '"v4"'},
+                {"path": "/starships/5", "etag": '"v4"'},
+            ]
+        }
+        # WHEN
+        response = await client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        assert [item["result"] for item in response.json()["items"]] == [
+            {
+                "status_code": 304,
+                "content": None,
+                "etag": '"v4"',
+                "not_modified": True,
+            },
+            {
+                "status_code": 200,
+                "content": {"name": "starship 5"},
+                "etag": '"v5"',
+                "not_modified": False,
+            },
+        ]
+
+    async def test_compressing(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url = "https://swapi.dev/api/starships/3"
+        httpx_mock.add_response(url=proxy_url, json=LARGE_CONTENT)
+        payload = {"items": [{"path": "/starships/3"}]}
+        # WHEN
+        response = await client.post(
+            self.url, json=payload, headers={"accept-encoding": "gzip"}
+        )
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["items"][0]["result"]["content"] == LARGE_CONTENT
+
+    async def test_streaming(self, client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        proxy_url_1 = "https://swapi.dev/api/films/4"
+        proxy_url_2 = "https://swapi.dev/api/films/5"
+        responded = anyio.Event()
+
+        async def slow_response(request: httpx.Request) -> httpx.Response:
+            await responded.wait()
+            await anyio.sleep(0.05)
+            return httpx.Response(200, json={"episode_id": 4})
+
+        async def fast_response(request: httpx.Request) -> httpx.Response:
+            responded.set()
+            return httpx.Response(200, json={"episode_id": 5})
+
+        httpx_mock.add_callback(slow_response, url=proxy_url_1)
+        httpx_mock.add_callback(fast_response, url=proxy_url_2)
+
+        payload = {"items": [{"path": "/films/4"}, {"path": "/films/5"}]}
+        headers = {"accept": "application/x-ndjson"}
+
+        # WHEN
+        response = await client.post(self.url, json=payload, headers=headers)
+
+        # THEN
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["path"] for line in lines] == ["/films/5", "/films/4"]
+        assert lines[1]["result"]["content"] == {"episode_id": 4}
+
+    async def test_snapshot(self, snapshot_client: TestClient, httpx_mock: HTTPXMock):
+        # GIVEN
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/planets/1", json={"name": "Tatooine"}
+        )
+        payload = {"items": [{"path": "/films/1"}, {"path": "/planets/1"}]}
+        # WHEN
+        response = await snapshot_client.post(self.url, json=payload)
+        # THEN
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert items[0]["result"]["content"] == SNAPSHOT_FILMS[0]
+        assert items[1]["result"]["content"] == {"name": "Tatooine"}
+        assert len(httpx_mock.get_requests()) == 1
+
     @pytest.mark.usefixtures("httpx_mock")
     async def test_when_path_does_not_start_with_slash(self, client: TestClient):
         # GIVEN
@@ -7,7 +7,7 @@ import pytest
 from fastapi import Request
 
 from src.api.exceptions import APIError, RateLimit, rate_limit_error_handler
-from src.toolkit.rate_limit.rate_limit import RateLimitError
+from src.toolkit.rate_limit.rate_limit import RateLimitError, RateLimitResult
 
 
 class TestAPIErrorRepresentation:
@@ -25,10 +25,13 @@ class TestAPIErrorRepresentation:
 class TestRateLimitErrorHandler:
     async def test(self):
         # GIVEN
-        exc = RateLimitError()
+        exc = RateLimitError(
+            RateLimitResult(False, remaining=0, reset_after=10, retry_after=1.5)
+        )
         request = mock.MagicMock(Request)
         # WHEN
         result = await rate_limit_error_handler(request, exc)
         # THEN
         assert result.status_code == RateLimit.status_code
+        assert result.headers["Retry-After"] == "2"
         assert json.loads(result.body) == RateLimit().as_dict()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import orjson
+import pytest
+
+from src.api.proxy.snapshot import load_collections
+from src.snapshot import main
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_httpx import HTTPXMock
+
+FILMS = [{"title": "A New Hope", "url": "https://swapi.dev/api/films/1/"}]
+
+
+class TestMain:
+    def test_crawl(
+        self,
+        tmp_path: Path,
+        httpx_mock: HTTPXMock,
+        capsys: pytest.CaptureFixture[str],
+    ):
+        # GIVEN
+        output = tmp_path / "swapi.json.gz"
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/",
+            json={"films": "https://swapi.dev/api/films/"},
+        )
+        httpx_mock.add_response(
+            url="https://swapi.dev/api/films/",
+            json={"count": 1, "next": None, "results": FILMS},
+        )
+        # WHEN
+        main(["crawl", "swapi", str(output)])
+        # THEN
+        assert load_collections(output) == {"films": FILMS}
+        assert capsys.readouterr().out == "Saved 1 resources of 1 collections.\n"
+
+    def test_crawl_unknown_service(self, tmp_path: Path):
+        with pytest.raises(SystemExit) as excinfo:
+            main(["crawl", "unknown", str(tmp_path / "unknown.json")])
+        assert str(excinfo.value) == "Unknown service: `unknown`."
+
+    def test_import(self, tmp_path: Path):
+        # GIVEN
+        source, output = tmp_path / "swapi.json", tmp_path / "swapi.json.gz"
+        source.write_bytes(orjson.dumps({"films": FILMS}, option=orjson.OPT_INDENT_2))
+        # WHEN
+        main(["import", str(source), str(output)])
+        # THEN
+        assert load_collections(output) == {"films": FILMS}
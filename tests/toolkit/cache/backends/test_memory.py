@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from src.toolkit.cache.backends.memory import InMemoryBackend
+
+pytestmark = [pytest.mark.anyio]
+
+
+@pytest.fixture
+def memory_backend():
+    return InMemoryBackend()
+
+
+class TestGetSet:
+    async def test(self, memory_backend: InMemoryBackend):
+        # WHEN: no value has been set
+        result = await memory_backend.get("cache:test", "key")
+        # THEN
+        assert result is None
+
+        # WHEN: setting the value and getting it again
+        await memory_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        result = await memory_backend.get("cache:test", "key")
+        # THEN
+        assert result == b"value"
+
+    async def test_getting_expired_value(self, memory_backend: InMemoryBackend):
+        # GIVEN
+        with mock.patch("time.monotonic", return_value=0):
+            await memory_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        # WHEN
+        with mock.patch("time.monotonic", return_value=5):
+            result = await memory_backend.get("cache:test", "key")
+        # THEN
+        assert result is None
+
+    async def test_evicting_least_recently_used(self, memory_backend: InMemoryBackend):
+        # GIVEN
+        await memory_backend.set("cache:test", "a", b"a", ttl=5, max_size=2)
+        await memory_backend.set("cache:test", "b", b"b", ttl=5, max_size=2)
+        await memory_backend.get("cache:test", "a")
+        # WHEN
+        await memory_backend.set("cache:test", "c", b"c", ttl=5, max_size=2)
+        # THEN
+        assert await memory_backend.get("cache:test", "a") == b"a"
+        assert await memory_backend.get("cache:test", "b") is None
+        assert await memory_backend.get("cache:test", "c") == b"c"
+
+    async def test_namespaces_are_bounded_separately(
+        self, memory_backend: InMemoryBackend
+    ):
+        # GIVEN
+        await memory_backend.set("cache:a", "key", b"a", ttl=5, max_size=1)
+        # WHEN
+        await memory_backend.set("cache:b", "key", b"b", ttl=5, max_size=1)
+        # THEN
+        assert await memory_backend.get("cache:a", "key") == b"a"
+        assert await memory_backend.get("cache:b", "key") == b"b"
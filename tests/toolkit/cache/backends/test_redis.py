@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+
+from src.toolkit.cache.backends.redis import RedisBackend
+
+pytestmark = [pytest.mark.anyio, pytest.mark.redis]
+
+
+@pytest.fixture
+def redis_dsn() -> str:
+    return "redis://localhost:6379/10"
+
+
+@pytest.fixture
+async def redis_backend(redis_dsn: str):
+    async with RedisBackend(redis_dsn) as backend:
+        yield backend
+        await backend._client.flushdb()
+
+
+class TestGetSet:
+    async def test(self, redis_backend: RedisBackend):
+        # WHEN: no value has been set
+        result = await redis_backend.get("cache:test", "key")
+        # THEN
+        assert result is None
+
+        # WHEN: setting the value and getting it again
+        await redis_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        result = await redis_backend.get("cache:test", "key")
+        # THEN
+        assert result == b"value"
+
+    async def test_evicting_least_recently_used(self, redis_backend: RedisBackend):
+        # GIVEN
+        await redis_backend.set("cache:test", "a", b"a", ttl=5, max_size=2)
+        await redis_backend.set("cache:test", "b", b"b", ttl=5, max_size=2)
+        await redis_backend.get("cache:test", "a")
+        # WHEN
+        await redis_backend.set("cache:test", "c", b"c", ttl=5, max_size=2)
+        # THEN
+        assert await redis_backend.get("cache:test", "a") == b"a"
+        assert await redis_backend.get("cache:test", "b") is None
+        assert await redis_backend.get("cache:test", "c") == b"c"
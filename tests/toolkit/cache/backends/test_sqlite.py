@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+from src.toolkit.cache.backends.sqlite import SQLiteBackend
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+
+pytestmark = [pytest.mark.anyio]
+
+
+@pytest.fixture
+def sqlite_dsn(tmp_path: Path) -> str:
+    return f"sqlite://{tmp_path}/cache.db"
+
+
+@pytest.fixture
+async def sqlite_backend(sqlite_dsn: str) -> AsyncIterator[SQLiteBackend]:
+    async with SQLiteBackend(sqlite_dsn) as backend:
+        yield backend
+
+
+class TestGetSet:
+    async def test(self, sqlite_backend: SQLiteBackend):
+        # WHEN: no value has been set
+        result = await sqlite_backend.get("cache:test", "key")
+        # THEN
+        assert result is None
+
+        # WHEN: setting the value and getting it again
+        await sqlite_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        result = await sqlite_backend.get("cache:test", "key")
+        # THEN
+        assert result == b"value"
+
+    async def test_getting_expired_value(self, sqlite_backend: SQLiteBackend):
+        # GIVEN
+        with mock.patch("time.time", return_value=0):
+            await sqlite_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        # WHEN
+        with mock.patch("time.time", return_value=5):
+            result = await sqlite_backend.get("cache:test", "key")
+        # THEN
+        assert result is None
+
+    async def test_getting_with_ttl(self, sqlite_backend: SQLiteBackend):
+        # GIVEN
+        with mock.patch("time.time", return_value=0):
+            await sqlite_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        # WHEN
+        with mock.patch("time.time", return_value=1.5):
+            result = await sqlite_backend.get_with_ttl("cache:test", "key")
+            missing = await sqlite_backend.get_with_ttl("cache:test", "other")
+        # THEN
+        assert result == (b"value", 3)
+        assert missing is None
+
+    async def test_overwriting_value(self, sqlite_backend: SQLiteBackend):
+        # GIVEN
+        await sqlite_backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        # WHEN
+        await sqlite_backend.set("cache:test", "key", b"new value", ttl=5, max_size=10)
+        # THEN
+        assert await sqlite_backend.get("cache:test", "key") == b"new value"
+        assert await sqlite_backend._run(sqlite_backend._get_size) == 9
+
+    async def test_values_outlive_backend(self, sqlite_dsn: str):
+        # GIVEN
+        async with SQLiteBackend(sqlite_dsn) as backend:
+            await backend.set("cache:test", "key", b"value", ttl=5, max_size=10)
+        # WHEN
+        async with SQLiteBackend(sqlite_dsn) as backend:
+            result = await backend.get("cache:test", "key")
+        # THEN
+        assert result == b"value"
+
+
+class TestEviction:
+    async def test_expired_values_are_deleted_on_writes(
+        self, sqlite_backend: SQLiteBackend
+    ):
+        # GIVEN
+        with mock.patch("time.time", return_value=0):
+            await sqlite_backend.set("cache:test", "a", b"a", ttl=5, max_size=10)
+        # WHEN
+        with mock.patch("time.time", return_value=5):
+            await sqlite_backend.set("cache:test", "b", b"bb", ttl=5, max_size=10)
+        # THEN
+        assert await sqlite_backend._run(sqlite_backend._get_size) == 2
+
+    async def test_evicting_value_that_expires_first(self, sqlite_dsn: str):
+        # GIVEN
+        async with SQLiteBackend(f"{sqlite_dsn}?max_bytes=10") as backend:
+            await backend.set("cache:test", "a", b"aaaa", ttl=10, max_size=10)
+            await backend.set("cache:test", "b", b"bbbb", ttl=5, max_size=10)
+            # WHEN
+            await backend.set("cache:test", "c", b"cccc", ttl=20, max_size=10)
+            # THEN
+            assert await backend.get("cache:test", "a") == b"aaaa"
+            assert await backend.get("cache:test", "b") is None
+            assert await backend.get("cache:test", "c") == b"cccc"
+
+
+class TestReadonly:
+    async def test(self, sqlite_backend: SQLiteBackend, sqlite_dsn: str):
+        # GIVEN
+        await sqlite_backend.set("cache:test", "a", b"a", ttl=5, max_size=10)
+        async with SQLiteBackend(f"{sqlite_dsn}?readonly=true") as backend:
+            # WHEN
+            await backend.set("cache:test", "b", b"b", ttl=5, max_size=10)
+            # THEN
+            assert await backend.get("cache:test", "a") == b"a"
+            assert await backend.get("cache:test", "b") is None
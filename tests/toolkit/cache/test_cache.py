@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import AsyncIterator
+from unittest import mock
+
+import pytest
+
+from src.config import CacheConfig, config
+from src.toolkit.cache.backends.memory import InMemoryBackend
+from src.toolkit.cache.backends.redis import RedisBackend
+from src.toolkit.cache.backends.sqlite import SQLiteBackend
+from src.toolkit.cache.cache import (
+    Cache,
+    ICacheBackend,
+    get_backend,
+    get_disk_backend,
+)
+
+pytestmark = [pytest.mark.anyio]
+
+
+@pytest.fixture
+def backend() -> mock.MagicMock:
+    return mock.MagicMock(ICacheBackend)
+
+
+@pytest.fixture
+async def cache(backend: mock.MagicMock) -> AsyncIterator[Cache]:
+    async with Cache(config.cache) as cache:
+        cache.backend = backend
+        yield cache
+
+
+class TestGet:
+    async def test(self, cache: Cache, backend: mock.MagicMock):
+        # GIVEN
+        backend.get.return_value = b"value"
+        # WHEN
+        result = await cache.get("swapi", "/films/1", max_size=10)
+        # THEN
+        assert result == b"value"
+        backend.get.assert_awaited_once_with("cache:swapi", "/films/1")
+
+
+class TestSet:
+    async def test(self, cache: Cache, backend: mock.MagicMock):
+        # WHEN
+        await cache.set("swapi", "/films/1", b"value", ttl=5, max_size=10)
+        # THEN
+        backend.set.assert_awaited_once_with("cache:swapi", "/films/1", b"value", 5, 10)
+
+
+class TestDisk:
+    @pytest.fixture
+    async def disk_cache(self, tmp_path: Path) -> AsyncIterator[Cache]:
+        cache_config = CacheConfig.model_validate(
+            {"backend_dsn": "mem://", "disk_dsn": f"sqlite://{tmp_path}/cache.db"}
+        )
+        async with Cache(cache_config) as cache:
+            yield cache
+
+    async def test_values_are_set_in_both_tiers(self, disk_cache: Cache):
+        # WHEN
+        await disk_cache.set("swapi", "/films/1", b"value", ttl=5, max_size=10)
+        await asyncio.gather(*disk_cache._disk_writes)
+        # THEN
+        assert disk_cache.disk is not None
+        assert await disk_cache.backend.get("cache:swapi", "/films/1") == b"value"
+        assert await disk_cache.disk.get("cache:swapi", "/films/1") == b"value"
+
+    async def test_disk_writes_are_finished_on_exit(self, tmp_path: Path):
+        # GIVEN
+        cache_config = CacheConfig.model_validate(
+            {"backend_dsn": "mem://", "disk_dsn": f"sqlite://{tmp_path}/cache.db"}
+        )
+        # WHEN
+        async with Cache(cache_config) as cache:
+            await cache.set("swapi", "/films/5", b"value", ttl=5, max_size=10)
+        # THEN
+        async with Cache(cache_config) as cache:
+            assert cache.disk is not None
+            assert await cache.disk.get("cache:swapi", "/films/5") == b"value"
+
+    async def test_disk_write_failures_are_logged(
+        self, disk_cache: Cache, caplog: pytest.LogCaptureFixture
+    ):
+        # GIVEN
+        error = sqlite3.OperationalError("database is locked")
+        # WHEN
+        with mock.patch.object(SQLiteBackend, "set", side_effect=error):
+            await disk_cache.set("swapi", "/films/6", b"value", ttl=5, max_size=10)
+            await asyncio.gather(*disk_cache._disk_writes)
+        # THEN
+        assert await disk_cache.backend.get("cache:swapi", "/films/6") == b"value"
+        assert "Failed to write to the disk cache." in caplog.messages
+
+    async def test_disk_writes_over_limit_are_skipped(
+        self, tmp_path: Path, caplog: pytest.LogCaptureFixture
+    ):
+        # GIVEN
+        cache_config = CacheConfig.model_validate(
+            {
+                "backend_dsn": "mem://",
+                "disk_dsn": f"sqlite://{tmp_path}/cache.db",
+                "max_disk_writes": 1,
+            }
+        )
+        locked = asyncio.Event()
+
+        async def wait_for_lock(*args: object) -> None:
+            await locked.wait()
+
+        async with Cache(cache_config) as cache:
+            with mock.patch.object(
+                SQLiteBackend, "set", side_effect=wait_for_lock
+            ) as disk_set:
+                # WHEN
+                await cache.set("swapi", "/films/7", b"value", ttl=5, max_size=10)
+                await cache.set("swapi", "/films/8", b"value", ttl=5, max_size=10)
+                # THEN
+                assert len(cache._disk_writes) == 1
+                locked.set()
+                await asyncio.gather(*cache._disk_writes)
+            assert await cache.backend.get("cache:swapi", "/films/8") == b"value"
+        disk_set.assert_awaited_once_with("cache:swapi", "/films/7", b"value", 5, 10)
+        message = "Too many pending disk cache writes, skipping a write."
+        assert message in caplog.messages
+
+    async def test_getting_from_disk_when_backend_misses(self, disk_cache: Cache):
+        # GIVEN
+        assert disk_cache.disk is not None
+        await disk_cache.disk.set("cache:swapi", "/films/2", b"value", 5, 10)
+        # WHEN
+        result = await disk_cache.get("swapi", "/films/2", max_size=10)
+        # THEN
+        assert result == b"value"
+        assert await disk_cache.backend.get("cache:swapi", "/films/2") == b"value"
+
+    async def test_value_about_to_expire_is_not_put_back(self, disk_cache: Cache):
+        # GIVEN
+        assert disk_cache.disk is not None
+        with mock.patch("time.time", return_value=0):
+            await disk_cache.disk.set("cache:swapi", "/films/4", b"value", 1, 10)
+        # WHEN
+        with mock.patch("time.time", return_value=0.5):
+            result = await disk_cache.get("swapi", "/films/4", max_size=10)
+        # THEN
+        assert result == b"value"
+        assert await disk_cache.backend.get("cache:swapi", "/films/4") is None
+
+    async def test_when_no_tier_has_value(self, disk_cache: Cache):
+        # WHEN
+        result = await disk_cache.get("swapi", "/films/3", max_size=10)
+        # THEN
+        assert result is None
+
+
+class TestGetBackend:
+    @pytest.mark.parametrize(
+        ["dsn", "backend_cls"],
+        [
+            ("mem://", InMemoryBackend),
+            ("redis://localhost:6379", RedisBackend),
+            ("sqlite:///var/cache/swapi-proxy.db", SQLiteBackend),
+        ],
+    )
+    async def test(self, dsn: str, backend_cls: type[ICacheBackend]):
+        # WHEN
+        backend = get_backend(dsn)
+        # THEN
+        assert isinstance(backend, backend_cls)
+
+    async def test_when_invalid_dsn(self):
+        # GIVEN
+        dsn = "memcache://"
+        # WHEN
+        with pytest.raises(ValueError) as excinfo:
+            get_backend(dsn)
+        # THEN
+        assert str(excinfo.value) == f"Unsupported backend from DSN: `{dsn}`."
+
+
+class TestGetDiskBackend:
+    async def test(self):
+        # WHEN
+        backend = get_disk_backend("sqlite:///var/cache/swapi-proxy.db")
+        # THEN
+        assert isinstance(backend, SQLiteBackend)
+
+    async def test_when_invalid_dsn(self):
+        # GIVEN
+        dsn = "redis://localhost:6379"
+        # WHEN
+        with pytest.raises(ValueError) as excinfo:
+            get_disk_backend(dsn)
+        # THEN
+        assert str(excinfo.value) == f"Unsupported disk backend from DSN: `{dsn}`."
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import anyio
+import pytest
+import redis.asyncio as redis
+
+from src.toolkit.rate_limit.backends.hybrid import HybridBackend
+from src.toolkit.rate_limit.rate_limit import Limit
+
+pytestmark = [pytest.mark.anyio, pytest.mark.redis]
+
+
+@pytest.fixture
+def hybrid_dsn() -> str:
+    return "hybrid+redis://localhost:6379/10?sync_interval=60&max_overshoot=0.5"
+
+
+@pytest.fixture
+async def hybrid_backend(hybrid_dsn: str):
+    async with HybridBackend(hybrid_dsn) as backend:
+        yield backend
+    # pending counts are flushed on exit
+    async with redis.Redis.from_url("redis://localhost:6379/10") as client:
+        await client.flushdb()
+
+
+class TestHit:
+    async def test(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        # WHEN
+        results = [await hybrid_backend.hit(key, limit, period) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+        assert 0 < results[2].retry_after <= period
+
+    async def test_counting_locally(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 10, 10
+        # WHEN
+        await hybrid_backend.hit(key, limit, period)
+        # THEN
+        assert not await hybrid_backend._client.keys()
+
+    async def test_flushing_when_overshoot_is_exhausted(
+        self, hybrid_backend: HybridBackend
+    ):
+        # GIVEN
+        key, limit, period = "test:hit", 4, 10
+        # WHEN: at most 2 requests are allowed without flushing
+        for _ in range(3):
+            await hybrid_backend.hit(key, limit, period)
+        # THEN
+        (redis_key,) = await hybrid_backend._client.keys()
+        assert await hybrid_backend._client.get(redis_key) == b"2"
+
+
+class TestHitMany:
+    async def test(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=2, period=1),
+            Limit("test:b", limit=3, period=60),
+        ]
+        # WHEN
+        with mock.patch("time.time", return_value=100.5):
+            results = [await hybrid_backend.hit_many(limits) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+        assert results[2].retry_after == 0.5
+
+    async def test_denied_hits_are_not_counted(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=1, period=10),
+            Limit("test:b", limit=3, period=60),
+        ]
+        await hybrid_backend.hit_many(limits)
+        # WHEN
+        result = await hybrid_backend.hit_many(limits)
+        # THEN
+        assert not result.allowed
+        assert (await hybrid_backend.hit("test:b", limit=3, period=60)).remaining == 1
+
+
+class TestSync:
+    async def test(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        await hybrid_backend.hit(key, limit, period)
+        (counter,) = hybrid_backend._counters.values()
+        # WHEN: another process counts a request
+        await hybrid_backend._client.incrby(counter.key, 1)
+        await hybrid_backend.sync()
+        # THEN
+        assert await hybrid_backend._client.get(counter.key) == b"2"
+        assert not (await hybrid_backend.hit(key, limit, period)).allowed
+
+    async def test_dropping_past_windows(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        with mock.patch("time.time", return_value=0):
+            await hybrid_backend.hit("test:hit", limit=2, period=10)
+        # WHEN
+        with mock.patch("time.time", return_value=10):
+            await hybrid_backend.sync()
+            # THEN
+            assert not hybrid_backend._counters
+            assert await hybrid_backend._client.get("test:hit:0") == b"1"
+
+    async def test_when_redis_fails(self, hybrid_backend: HybridBackend):
+        # GIVEN
+        await hybrid_backend.hit("test:hit", limit=2, period=10)
+        (counter,) = hybrid_backend._counters.values()
+        error = redis.ConnectionError()
+        # WHEN
+        with (
+            mock.patch.object(redis.client.Pipeline, "execute", side_effect=error),
+            pytest.raises(redis.ConnectionError),
+        ):
+            await hybrid_backend.sync()
+        # THEN
+        assert counter.pending == 1
+        assert counter.touched
+
+    async def test_syncing_in_background(self, caplog: pytest.LogCaptureFixture):
+        # GIVEN
+        dsn = "hybrid+redis://localhost:6379/10?sync_interval=0"
+
+        def sync() -> None:
+            if sync_mock.await_count == 2:
+                raise redis.ConnectionError()
+
+        # WHEN
+        with mock.patch.object(HybridBackend, "sync", side_effect=sync) as sync_mock:
+            async with HybridBackend(dsn):
+                while sync_mock.await_count < 3:
+                    await anyio.sleep(0)
+
+        # THEN
+        assert "Failed to sync rate limits with Redis." in caplog.text
+
+
+class TestClose:
+    async def test_when_not_started(self, hybrid_dsn: str):
+        # GIVEN
+        backend = HybridBackend(hybrid_dsn)
+        # WHEN
+        await backend.__aexit__(None, None, None)
+        # THEN
+        assert backend._task is None
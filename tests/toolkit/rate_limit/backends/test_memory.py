@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import math
+from unittest import mock
+
 import anyio
 import pytest
 
 from src.toolkit.rate_limit.backends.memory import InMemoryBackend, InMemoryStorage
+from src.toolkit.rate_limit.rate_limit import Limit
 
 pytestmark = [pytest.mark.anyio]
 
@@ -30,9 +34,8 @@ class TestInMemoryStorage:
         result = storage.get(key)
         # THEN
         assert result is not None
-        assert result.key == key
         assert result.value == value
-        assert result.ttl is None
+        assert result.expires_at == math.inf
 
     async def test_getting_expired_value(self) -> None:
         # GIVEN
@@ -41,11 +44,7 @@ class TestInMemoryStorage:
         ttl = 0.25
         storage = InMemoryStorage()
         # WHEN: no value has been set
-        storage.set(
-            key,
-            value=value,
-            ttl=ttl,  # type: ignore[arg-type]
-        )
+        storage.set(key, value=value, ttl=ttl)
         result = storage.get(key)
         assert result is not None
         # wait for expiration
@@ -53,15 +52,115 @@ class TestInMemoryStorage:
         result = storage.get(key)
         assert result is None
 
+    async def test_expired_keys_are_reclaimed_on_writes(self) -> None:
+        # GIVEN
+        storage = InMemoryStorage()
+        with mock.patch("time.monotonic", return_value=0):
+            for i in range(5):
+                storage.set(f"key:{i}", i, ttl=1)
+        # WHEN: each write reclaims a few expired keys
+        with mock.patch("time.monotonic", return_value=1):
+            storage.set("key", "value")
+        # THEN
+        assert len(storage) == 2
+
+        # WHEN
+        with mock.patch("time.monotonic", return_value=1):
+            storage.set("key", "value")
+        # THEN
+        assert len(storage) == 1
+        assert storage._expiry == [(math.inf, "key")]
+
+    async def test_updated_keys_are_rescheduled(self) -> None:
+        # GIVEN
+        storage = InMemoryStorage()
+        with mock.patch("time.monotonic", return_value=0):
+            storage.set("key", 0, ttl=1)
+            storage.set("key", 1, ttl=2)
+        # WHEN
+        with mock.patch("time.monotonic", return_value=1):
+            storage.set("another_key", "value")
+        # THEN
+        assert len(storage) == 2
+        assert storage._expiry == [(2, "key"), (math.inf, "another_key")]
+
+    async def test_evicting_key_that_expires_first(self) -> None:
+        # GIVEN
+        storage = InMemoryStorage(max_keys=2)
+        with mock.patch("time.monotonic", return_value=0):
+            storage.set("a", "a", ttl=1)
+            storage.set("b", "b", ttl=2)
+            storage.set("a", "a", ttl=3)
+            # WHEN
+            storage.set("c", "c")
+            # THEN
+            assert storage.get("a") is not None
+            assert storage.get("b") is None
+            assert storage.get("c") is not None
+
 
-class TestIncr:
+class TestInMemoryBackend:
+    async def test_max_keys_from_dsn(self):
+        # WHEN
+        backend = InMemoryBackend("mem://?max_keys=1")
+        await backend.hit("a", limit=1, period=1)
+        await backend.hit("b", limit=1, period=1)
+        # THEN
+        assert len(backend._storage) == 1
+
+
+class TestHit:
     async def test(self, memory_backend: InMemoryBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        # WHEN
+        with mock.patch("time.monotonic", return_value=100):
+            results = [await memory_backend.hit(key, limit, period) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+        assert results[2].retry_after == 5
+
+    async def test_limit_is_replenished(self, memory_backend: InMemoryBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        with mock.patch("time.monotonic", return_value=100):
+            await memory_backend.hit(key, limit, period, cost=2)
         # WHEN
-        result = await memory_backend.incr("test:incr", value=1)
+        with mock.patch("time.monotonic", return_value=105):
+            result = await memory_backend.hit(key, limit, period)
         # THEN
-        assert result == 1
+        assert result.allowed
+        assert result.remaining == 0
 
+
+class TestHitMany:
+    async def test(self, memory_backend: InMemoryBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=2, period=1),
+            Limit("test:b", limit=3, period=60),
+        ]
         # WHEN
-        result = await memory_backend.incr("test:incr", value=5)
+        with mock.patch("time.monotonic", return_value=100):
+            results = [await memory_backend.hit_many(limits) for _ in range(3)]
         # THEN
-        assert result == 6
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+
+    async def test_denied_hits_are_not_counted(self, memory_backend: InMemoryBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=1, period=1),
+            Limit("test:b", limit=3, period=60),
+        ]
+        with mock.patch("time.monotonic", return_value=100):
+            await memory_backend.hit_many(limits)
+            # WHEN
+            result = await memory_backend.hit_many(limits)
+            # THEN
+            assert not result.allowed
+            assert result.retry_after == 1
+            assert (
+                await memory_backend.hit("test:b", limit=3, period=60)
+            ).remaining == 1
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+from unittest import mock
+
 import pytest
+import redis.asyncio as redis
 
 from src.toolkit.rate_limit.backends.redis import RedisBackend
-from src.toolkit.rate_limit.rate_limit import TTL
+from src.toolkit.rate_limit.rate_limit import Limit, RateLimitResult
 
 pytestmark = [pytest.mark.anyio, pytest.mark.redis]
 
@@ -20,10 +24,166 @@ async def redis_backend(redis_dsn: str):
         await backend._client.flushdb()
 
 
-class TestIncr:
-    @pytest.mark.parametrize("ttl", [None, 1])
-    async def test(self, redis_backend: RedisBackend, ttl: TTL | None):
+class TestHit:
+    async def test(self, redis_backend: RedisBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        # WHEN
+        results = [await redis_backend.hit(key, limit, period) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+        assert 0 < results[0].reset_after <= 5
+        assert 0 < results[2].retry_after <= 5
+
+    async def test_with_cost(self, redis_backend: RedisBackend):
+        # WHEN
+        result = await redis_backend.hit("test:hit", limit=5, period=10, cost=3)
+        # THEN
+        assert result.allowed
+        assert result.remaining == 2
+        assert result.retry_after == 0
+
+    async def test_with_zero_cost(self, redis_backend: RedisBackend):
         # WHEN
-        result = await redis_backend.incr("test:incr", value=1, ttl=ttl)
+        result = await redis_backend.hit("test:hit", limit=5, period=10, cost=0)
+        # THEN
+        assert result.allowed
+        assert result.remaining == 5
+        assert await redis_backend._client.get("test:hit") is None
+
+
+class TestHitMany:
+    async def test(self, redis_backend: RedisBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=2, period=1),
+            Limit("test:b", limit=3, period=60),
+        ]
+        # WHEN
+        results = [await redis_backend.hit_many(limits) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+        assert 0 < results[2].retry_after <= 1
+
+    async def test_denied_hits_are_not_counted(self, redis_backend: RedisBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=1, period=10),
+            Limit("test:b", limit=3, period=60),
+        ]
+        await redis_backend.hit_many(limits)
+        # WHEN
+        result = await redis_backend.hit_many(limits)
+        # THEN
+        assert not result.allowed
+        assert (await redis_backend.hit("test:b", limit=3, period=60)).remaining == 1
+
+
+class TestPipelining:
+    async def test_hits_are_sent_in_single_pipeline(self, redis_backend: RedisBackend):
+        # GIVEN
+        client = redis_backend._client
+        # WHEN
+        with mock.patch.object(client, "pipeline", wraps=client.pipeline) as pipeline:
+            results = await asyncio.gather(
+                *(redis_backend.hit("test:hit", limit=5, period=10) for _ in range(7))
+            )
+        # THEN
+        pipeline.assert_called_once()
+        assert [result.allowed for result in results] == [True] * 5 + [False] * 2
+        assert [result.remaining for result in results] == [4, 3, 2, 1, 0, 0, 0]
+
+    async def test_hit_takes_single_round_trip(self, redis_backend: RedisBackend):
+        # GIVEN
+        await redis_backend.hit("test:hit", limit=5, period=10)
+        connection = redis.Connection
+        send = connection.send_packed_command
+        # WHEN
+        with mock.patch.object(
+            connection, "send_packed_command", autospec=True, side_effect=send
+        ) as send_packed_command:
+            result = await redis_backend.hit("test:hit", limit=5, period=10)
+        # THEN
+        assert send_packed_command.call_count == 1
+        assert result.remaining == 3
+
+    async def test_when_script_is_not_loaded(self, redis_backend: RedisBackend):
+        # GIVEN
+        await redis_backend.hit("test:hit", limit=5, period=10)
+        await redis_backend._client.script_flush()
+        # WHEN
+        results = await asyncio.gather(
+            *(redis_backend.hit("test:hit", limit=5, period=10) for _ in range(2))
+        )
+        # THEN
+        assert [result.remaining for result in results] == [3, 2]
+
+    async def test_hits_within_window(self, redis_dsn: str):
+        # GIVEN
+        dsn = f"{redis_dsn}?pipeline_window=0.05"
+        async with RedisBackend(dsn) as backend:
+            client = backend._client
+            with mock.patch.object(client, "pipeline", wraps=client.pipeline) as pipe:
+                # WHEN
+                first = asyncio.create_task(backend.hit("test:window", 5, 10))
+                await asyncio.sleep(0.01)
+                second = asyncio.create_task(backend.hit("test:window", 5, 10))
+                results = await asyncio.gather(first, second)
+            await client.flushdb()
+        # THEN
+        assert backend._pipeline_window == 0.05
+        pipe.assert_called_once()
+        assert [result.remaining for result in results] == [4, 3]
+
+    async def test_errors_are_returned_to_callers(self, redis_backend: RedisBackend):
+        # GIVEN
+        await redis_backend._client.lpush("test:list", "value")  # type: ignore[misc]
+        # WHEN
+        results = await asyncio.gather(
+            redis_backend.hit("test:list", limit=5, period=10),
+            redis_backend.hit("test:hit", limit=5, period=10),
+            return_exceptions=True,
+        )
+        # THEN
+        assert isinstance(results[0], redis.ResponseError)
+        assert isinstance(results[1], RateLimitResult)
+
+    async def test_when_pipeline_fails(self, redis_backend: RedisBackend):
+        # GIVEN
+        error = redis.ConnectionError("Connection refused")
+        target = "redis.asyncio.client.Pipeline.execute"
+        # WHEN
+        with mock.patch(target, side_effect=error):
+            results = await asyncio.gather(
+                redis_backend.hit("test:a", limit=5, period=10),
+                redis_backend.hit("test:b", limit=5, period=10),
+                return_exceptions=True,
+            )
+        # THEN
+        assert results == [error, error]
+
+    async def test_cancelled_hit(self, redis_backend: RedisBackend):
+        # GIVEN
+        cancelled = asyncio.create_task(redis_backend.hit("test:hit", 5, 10))
+        task = asyncio.create_task(redis_backend.hit("test:hit", 5, 10))
+        await asyncio.sleep(0)
+        # WHEN
+        cancelled.cancel()
+        result = await task
+        # THEN
+        assert cancelled.cancelled()
+        assert result.allowed
+
+    async def test_pending_hits_are_sent_on_exit(self, redis_dsn: str):
+        # GIVEN
+        async with RedisBackend(redis_dsn) as backend:
+            task = asyncio.create_task(backend.hit("test:exit", 5, 10))
+            await asyncio.sleep(0)
+            assert backend._flushes
         # THEN
-        assert result == 1
+        result = await task
+        assert result.allowed
+        async with redis.Redis.from_url(redis_dsn) as client:
+            await client.flushdb()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+from typing import TYPE_CHECKING
+from unittest import mock
+
+import pytest
+
+from src.toolkit.rate_limit.backends import shm
+from src.toolkit.rate_limit.backends.shm import SharedMemoryBackend
+from src.toolkit.rate_limit.rate_limit import Limit
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+    from pathlib import Path
+
+pytestmark = [pytest.mark.anyio]
+
+
+@pytest.fixture
+async def shm_backend(tmp_path: Path) -> AsyncIterator[SharedMemoryBackend]:
+    async with SharedMemoryBackend(f"shm://{tmp_path}/limiter") as backend:
+        yield backend
+
+
+# these run in the child processes, which coverage doesn't track
+async def _count_allowed(dsn: str, hits: int) -> int:  # pragma: no cover
+    async with SharedMemoryBackend(dsn) as backend:
+        results = [
+            await backend.hit("key", limit=100, period=3600) for _ in range(hits)
+        ]
+    return sum(result.allowed for result in results)
+
+
+def _hit_in_process(dsn: str, hits: int) -> int:  # pragma: no cover
+    return asyncio.run(_count_allowed(dsn, hits))
+
+
+class TestSharedMemoryBackend:
+    async def test_default_path(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        # GIVEN
+        path = tmp_path / "default"
+        monkeypatch.setattr(shm, "DEFAULT_PATH", str(path))
+        # WHEN
+        async with SharedMemoryBackend("shm://?slots=64&stripes=4"):
+            pass
+        # THEN
+        assert path.stat().st_size == 64 + 64 * 16
+
+    async def test_limits_are_shared(self, tmp_path: Path):
+        # GIVEN
+        dsn = f"shm://{tmp_path}/limiter"
+        # WHEN
+        async with SharedMemoryBackend(dsn) as a, SharedMemoryBackend(dsn) as b:
+            results = [
+                await a.hit("key", limit=2, period=10),
+                await b.hit("key", limit=2, period=10),
+                await a.hit("key", limit=2, period=10),
+            ]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+
+    async def test_limits_are_shared_between_processes(self, tmp_path: Path):
+        # GIVEN
+        dsn = f"shm://{tmp_path}/limiter"
+        ctx = multiprocessing.get_context("spawn")
+        # WHEN
+        with ctx.Pool(4) as pool:
+            allowed = pool.starmap(_hit_in_process, [(dsn, 50)] * 4)
+        # THEN
+        assert sum(allowed) == 100
+
+    @pytest.mark.parametrize(
+        "dsn", ["shm://?slots=8&stripes=16", "shm://?slots=9&stripes=2"]
+    )
+    async def test_when_slots_are_not_multiple_of_stripes(self, dsn: str):
+        with pytest.raises(ValueError) as excinfo:
+            SharedMemoryBackend(dsn)
+        assert (
+            str(excinfo.value) == "The number of slots must be a multiple of stripes."
+        )
+
+    async def test_when_file_has_different_layout(self, tmp_path: Path):
+        # GIVEN
+        path = tmp_path / "limiter"
+        async with SharedMemoryBackend(f"shm://{path}?slots=64&stripes=4"):
+            pass
+        # WHEN
+        with pytest.raises(ValueError) as excinfo:
+            SharedMemoryBackend(f"shm://{path}?slots=128&stripes=4")
+        # THEN
+        assert str(excinfo.value) == (
+            "The file was laid out with other slots or stripes."
+        )
+
+
+class TestHit:
+    async def test(self, shm_backend: SharedMemoryBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        # WHEN
+        with mock.patch("time.time", return_value=100):
+            results = [await shm_backend.hit(key, limit, period) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+        assert results[2].retry_after == 5
+
+    async def test_limit_is_replenished(self, shm_backend: SharedMemoryBackend):
+        # GIVEN
+        key, limit, period = "test:hit", 2, 10
+        with mock.patch("time.time", return_value=100):
+            await shm_backend.hit(key, limit, period, cost=2)
+        # WHEN
+        with mock.patch("time.time", return_value=105):
+            result = await shm_backend.hit(key, limit, period)
+        # THEN
+        assert result.allowed
+        assert result.remaining == 0
+
+    async def test_expired_slot_is_reused(self, tmp_path: Path):
+        # GIVEN
+        dsn = f"shm://{tmp_path}/limiter?slots=1&stripes=1"
+        async with SharedMemoryBackend(dsn) as backend:
+            with mock.patch("time.time", return_value=100):
+                await backend.hit("a", limit=1, period=10)
+            # WHEN
+            with mock.patch("time.time", return_value=110):
+                result = await backend.hit("b", limit=1, period=10)
+                # THEN
+                assert result.allowed
+                assert not (await backend.hit("b", limit=1, period=10)).allowed
+                assert (await backend.hit("a", limit=1, period=10)).allowed
+
+    async def test_key_that_expires_first_is_evicted(self, tmp_path: Path):
+        # GIVEN
+        dsn = f"shm://{tmp_path}/limiter?slots=2&stripes=1"
+        async with SharedMemoryBackend(dsn) as backend:
+            with mock.patch("time.time", return_value=100):
+                await backend.hit("a", limit=1, period=20)
+                await backend.hit("b", limit=1, period=10)
+                # WHEN
+                await backend.hit("c", limit=1, period=10)
+                # THEN
+                assert not (await backend.hit("a", limit=1, period=20)).allowed
+                assert not (await backend.hit("c", limit=1, period=10)).allowed
+                assert (await backend.hit("b", limit=1, period=10)).allowed
+
+
+class TestHitMany:
+    async def test(self, shm_backend: SharedMemoryBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=2, period=1),
+            Limit("test:b", limit=3, period=60),
+        ]
+        # WHEN
+        with mock.patch("time.time", return_value=100):
+            results = [await shm_backend.hit_many(limits) for _ in range(3)]
+        # THEN
+        assert [result.allowed for result in results] == [True, True, False]
+        assert [result.remaining for result in results] == [1, 0, 0]
+
+    async def test_denied_hits_are_not_counted(self, shm_backend: SharedMemoryBackend):
+        # GIVEN
+        limits = [
+            Limit("test:a", limit=1, period=1),
+            Limit("test:b", limit=3, period=60),
+        ]
+        with mock.patch("time.time", return_value=100):
+            await shm_backend.hit_many(limits)
+            # WHEN
+            result = await shm_backend.hit_many(limits)
+            # THEN
+            assert not result.allowed
+            assert result.retry_after == 1
+            assert (await shm_backend.hit("test:b", limit=3, period=60)).remaining == 1
+
+    async def test_new_keys_in_same_stripe(self, tmp_path: Path):
+        # GIVEN
+        dsn = f"shm://{tmp_path}/limiter?slots=2&stripes=1"
+        limits = [
+            Limit("test:a", limit=1, period=10),
+            Limit("test:b", limit=2, period=10),
+        ]
+        async with SharedMemoryBackend(dsn) as backend:
+            # WHEN
+            await backend.hit_many(limits)
+            # THEN
+            assert not (await backend.hit("test:a", limit=1, period=10)).allowed
+            assert (await backend.hit("test:b", limit=2, period=10)).remaining == 0
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import AsyncIterator
 from unittest import mock
 
 import pytest
 
 from src.config import config
+from src.toolkit.rate_limit.backends.hybrid import HybridBackend
 from src.toolkit.rate_limit.backends.memory import InMemoryBackend
 from src.toolkit.rate_limit.backends.redis import RedisBackend
+from src.toolkit.rate_limit.backends.shm import SharedMemoryBackend
 from src.toolkit.rate_limit.rate_limit import (
     IBackend,
+    Limit,
     RateLimiter,
     RateLimitError,
+    RateLimitResult,
+    gcra,
     get_backend,
+    merge_results,
 )
 
 pytestmark = [pytest.mark.anyio]
@@ -34,32 +41,138 @@ class TestLimit:
     async def test(self, limiter: RateLimiter, backend: mock.MagicMock):
         # GIVEN
         key, limit, period = "test_limit", 10, 5
-        backend.incr.return_value = 0
+        backend.hit.return_value = RateLimitResult(True, remaining=9, reset_after=0.5)
         # WHEN
-        await limiter.limit(key=key, limit=limit, limit_period=period)
+        result = await limiter.limit(key=key, limit=limit, limit_period=period)
         # THEN
-        backend.incr.assert_awaited_once_with(f"limiter:{key}", value=1, ttl=period)
+        assert result == backend.hit.return_value
+        backend.hit.assert_awaited_once_with(
+            f"limiter:{key}", limit=limit, period=period, cost=1
+        )
 
     async def test_with_cost(self, limiter: RateLimiter, backend: mock.MagicMock):
         # GIVEN
         key, limit, period = "test_limit", 10, 5
-        backend.incr.return_value = 0
+        backend.hit.return_value = RateLimitResult(True, remaining=8, reset_after=1)
         # WHEN
         await limiter.limit(key=key, limit=limit, limit_period=period, cost=2)
         # THEN
-        backend.incr.assert_awaited_once_with(f"limiter:{key}", value=2, ttl=period)
+        backend.hit.assert_awaited_once_with(
+            f"limiter:{key}", limit=limit, period=period, cost=2
+        )
 
     async def test_exceeding_the_limit(
         self, limiter: RateLimiter, backend: mock.MagicMock
     ):
         # GIVEN
         key, limit, period = "test_limit", 10, 5
-        backend.incr.return_value = limit + 1
+        backend.hit.return_value = RateLimitResult(
+            False, remaining=1, reset_after=4.5, retry_after=0.5
+        )
         # WHEN
-        with pytest.raises(RateLimitError):
+        with pytest.raises(RateLimitError) as excinfo:
             await limiter.limit(key=key, limit=limit, limit_period=period, cost=2)
         # THEN
-        backend.incr.assert_awaited_once_with(f"limiter:{key}", value=2, ttl=period)
+        assert excinfo.value.result == backend.hit.return_value
+        backend.hit.assert_awaited_once_with(
+            f"limiter:{key}", limit=limit, period=period, cost=2
+        )
+
+
+class TestLimitMany:
+    async def test(self, limiter: RateLimiter, backend: mock.MagicMock):
+        # GIVEN
+        limits = [Limit("a", limit=10, period=1), Limit("b", limit=100, period=60)]
+        backend.hit_many.return_value = RateLimitResult(True, 8, reset_after=0.2)
+        # WHEN
+        result = await limiter.limit_many(limits, cost=2)
+        # THEN
+        assert result == backend.hit_many.return_value
+        backend.hit_many.assert_awaited_once_with(
+            [
+                Limit("limiter:a", limit=10, period=1),
+                Limit("limiter:b", limit=100, period=60),
+            ],
+            cost=2,
+        )
+
+    async def test_exceeding_any_limit(
+        self, limiter: RateLimiter, backend: mock.MagicMock
+    ):
+        # GIVEN
+        limits = [Limit("a", limit=10, period=1), Limit("b", limit=100, period=60)]
+        backend.hit_many.return_value = RateLimitResult(
+            False, remaining=0, reset_after=60, retry_after=0.6
+        )
+        # WHEN
+        with pytest.raises(RateLimitError) as excinfo:
+            await limiter.limit_many(limits)
+        # THEN
+        assert excinfo.value.result == backend.hit_many.return_value
+
+
+class TestMergeResults:
+    def test_when_all_allowed(self):
+        # GIVEN
+        results = [
+            RateLimitResult(True, remaining=9, reset_after=0.1),
+            RateLimitResult(True, remaining=99, reset_after=36),
+        ]
+        # WHEN
+        result = merge_results(results)
+        # THEN
+        assert result == RateLimitResult(True, remaining=9, reset_after=36)
+
+    def test_when_any_denied(self):
+        # GIVEN
+        results = [
+            RateLimitResult(True, remaining=9, reset_after=0.1),
+            RateLimitResult(False, remaining=0, reset_after=3600, retry_after=36),
+        ]
+        # WHEN
+        result = merge_results(results)
+        # THEN
+        assert result == RateLimitResult(
+            False, remaining=0, reset_after=3600, retry_after=36
+        )
+
+
+class TestGCRA:
+    def test_allows_a_burst(self):
+        # GIVEN
+        tat, limit, period = None, 4, 2
+        # WHEN
+        results = []
+        for _ in range(5):
+            tat, result = gcra(tat, now=0, limit=limit, period=period)
+            results.append(result)
+        # THEN
+        assert results == [
+            RateLimitResult(True, remaining=3, reset_after=0.5),
+            RateLimitResult(True, remaining=2, reset_after=1.0),
+            RateLimitResult(True, remaining=1, reset_after=1.5),
+            RateLimitResult(True, remaining=0, reset_after=2.0),
+            RateLimitResult(False, remaining=0, reset_after=2.0, retry_after=0.5),
+        ]
+
+    def test_replenishes_gradually(self):
+        # GIVEN
+        tat, _ = gcra(None, now=0, limit=4, period=2, cost=4)
+        # WHEN
+        _, result = gcra(tat, now=0.5, limit=4, period=2)
+        # THEN
+        assert result == RateLimitResult(True, remaining=0, reset_after=2.0)
+
+    def test_when_cost_does_not_fit(self):
+        # GIVEN
+        tat, _ = gcra(None, now=0, limit=4, period=2, cost=3)
+        # WHEN
+        new_tat, result = gcra(tat, now=0, limit=4, period=2, cost=2)
+        # THEN
+        assert new_tat == tat
+        assert result == RateLimitResult(
+            False, remaining=1, reset_after=1.5, retry_after=0.5
+        )
 
 
 class TestGetBackend:
@@ -68,6 +181,7 @@ class TestGetBackend:
         [
             ("mem://", InMemoryBackend),
             ("redis://localhost:6379", RedisBackend),
+            ("hybrid+redis://localhost:6379", HybridBackend),
         ],
     )
     async def test(self, dsn: str, backend_cls: type[IBackend]):
@@ -76,6 +190,12 @@ class TestGetBackend:
         # THEN
         assert isinstance(backend, backend_cls)
 
+    async def test_shm(self, tmp_path: Path):
+        # WHEN
+        async with get_backend(f"shm://{tmp_path}/limiter") as backend:
+            # THEN
+            assert isinstance(backend, SharedMemoryBackend)
+
     async def test_when_invalid_dsn(self):
         # GIVEN
         dsn = "memcache://"
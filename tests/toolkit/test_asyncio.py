@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from unittest import mock
+
+import pytest
+
+from src.config import ServiceConfig
+from src.toolkit.asyncio import ConcurrencyLimiter, ConcurrencyLimitError, SingleFlight
+
+pytestmark = [pytest.mark.anyio]
+
+
+async def _fail() -> None:
+    await asyncio.sleep(0)
+    raise ValueError("error")
+
+
+async def _noop() -> None:
+    return None
+
+
+class TestConcurrencyLimiter:
+    async def test_limiting_concurrency(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 1)
+        release = asyncio.Event()
+        first = asyncio.create_task(limiter(release.wait()))
+        second = asyncio.create_task(limiter(_noop()))
+        await asyncio.sleep(0)
+
+        # WHEN: the first call is in flight
+        # THEN
+        assert limiter.in_flight == 1
+        assert not second.done()
+
+        # WHEN
+        release.set()
+        await asyncio.gather(first, second)
+        # THEN
+        assert limiter.in_flight == 0
+
+    async def test_rejecting_when_queue_is_full(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 1, max_queue_size=1)
+        release = asyncio.Event()
+        first = asyncio.create_task(limiter(release.wait()))
+        second = asyncio.create_task(limiter(_noop()))
+        await asyncio.sleep(0)
+
+        # WHEN
+        with pytest.raises(ConcurrencyLimitError):
+            await limiter(_noop())
+
+        # THEN
+        assert limiter.queued == 1
+        release.set()
+        await asyncio.gather(first, second)
+
+    async def test_rejecting_after_queue_timeout(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 1, queue_timeout=0.01)
+        release = asyncio.Event()
+        first = asyncio.create_task(limiter(release.wait()))
+        await asyncio.sleep(0)
+
+        # WHEN
+        with pytest.raises(ConcurrencyLimitError):
+            await limiter(_noop())
+
+        # THEN
+        assert limiter.queued == 0
+        release.set()
+        await first
+
+    async def test_failure_cuts_limit_once_per_round(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 10, backoff=0.5)
+        # WHEN
+        await asyncio.gather(
+            *(limiter(_fail()) for _ in range(3)), return_exceptions=True
+        )
+        # THEN
+        assert limiter.limit == 5
+
+        # WHEN
+        with pytest.raises(ValueError):
+            await limiter(_fail())
+        # THEN
+        assert limiter.limit == 2
+
+    async def test_limit_is_not_cut_below_min_limit(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(4, 10, backoff=0.1)
+        # WHEN
+        with pytest.raises(ValueError):
+            await limiter(_fail())
+        # THEN
+        assert limiter.limit == 4
+
+    async def test_min_limit_over_max_limit(self):
+        # GIVEN
+        service = ServiceConfig.model_validate(
+            {
+                "name": "swapi",
+                "host": "https://swapi.dev/api/",
+                "max_concurrent_requests": 2,
+            }
+        )
+        limiter = ConcurrencyLimiter(
+            service.min_concurrent_requests, service.max_concurrent_requests
+        )
+        # WHEN
+        with pytest.raises(ValueError):
+            await limiter(_fail())
+        # THEN
+        assert limiter.limit == 2
+
+    async def test_slow_call_cuts_limit(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 10, backoff=0.5, short_window=1)
+        # WHEN
+        with mock.patch("time.monotonic", side_effect=[0, 1, 0, 3]):
+            await limiter(_noop())
+            await limiter(_noop())
+        # THEN
+        assert limiter.limit == 5
+
+    async def test_success_raises_limit(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 2, backoff=0.5)
+        with pytest.raises(ValueError):
+            await limiter(_fail())
+        assert limiter.limit == 1
+
+        # WHEN
+        await limiter(_noop())
+        # THEN
+        assert limiter.limit == 2
+
+        # WHEN
+        await limiter(_noop())
+        # THEN
+        assert limiter.limit == 2
+
+    async def test_latency_baseline_follows_latency(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 10, backoff=0.5, window=2, short_window=1)
+        # WHEN: the last call is slower than twice the first one, but not than
+        # twice the average
+        with mock.patch("time.monotonic", side_effect=[0, 1, 0, 1.9, 0, 2.5]):
+            await limiter(_noop())
+            await limiter(_noop())
+            await limiter(_noop())
+        # THEN
+        assert limiter.limit == 10
+
+    async def test_jitter_does_not_cut_limit(self):
+        # GIVEN: latencies that vary a lot, but don't grow with the load
+        rng = random.Random(0)
+        timestamps = []
+        for _ in range(5000):
+            timestamps += [0, rng.lognormvariate(0, 0.5)]
+        limiter = ConcurrencyLimiter(1, 10)
+        # WHEN
+        with mock.patch("time.monotonic", side_effect=timestamps):
+            for _ in range(5000):
+                await limiter(_noop())
+        # THEN
+        assert limiter.limit == 10
+
+    async def test_cancelling_waiter(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 1)
+        release = asyncio.Event()
+        first = asyncio.create_task(limiter(release.wait()))
+        second = asyncio.create_task(limiter(_noop()))
+        await asyncio.sleep(0)
+
+        # WHEN
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+
+        # THEN
+        assert not limiter._waiters
+        release.set()
+        await first
+        assert limiter.in_flight == 0
+
+    async def test_cancelling_waiter_after_handover(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 1)
+        await limiter._acquire()
+        waiter = asyncio.create_task(limiter(_noop()))
+        await asyncio.sleep(0)
+
+        # WHEN: the slot is handed over, but the waiter is cancelled before it runs
+        limiter._release()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # THEN
+        assert waiter.cancelled()
+        assert limiter.in_flight == 0
+
+    async def test_releasing_slot_to_cancelled_waiter(self):
+        # GIVEN
+        limiter = ConcurrencyLimiter(1, 1)
+        await limiter._acquire()
+        waiter = asyncio.create_task(limiter(_noop()))
+        await asyncio.sleep(0)
+
+        # WHEN: the slot is released after the waiter is cancelled
+        waiter.cancel()
+        limiter._release()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # THEN
+        assert waiter.cancelled()
+        assert not limiter._waiters
+        assert limiter.in_flight == 0
+
+
+class TestSingleFlight:
+    async def test(self):
+        # GIVEN
+        singleflight = SingleFlight()
+        calls = 0
+
+        async def fn() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        # WHEN
+        results = await asyncio.gather(*(singleflight("key", fn) for _ in range(3)))
+
+        # THEN
+        assert results == [1, 1, 1]
+        assert calls == 1
+        assert not singleflight._calls
+
+    async def test_different_keys_are_not_coalesced(self):
+        # GIVEN
+        singleflight = SingleFlight()
+
+        async def fn() -> int:
+            await asyncio.sleep(0)
+            return 1
+
+        # WHEN
+        await asyncio.gather(singleflight("a", fn), singleflight("b", fn))
+
+        # THEN
+        assert not singleflight._calls
+
+    async def test_exception_is_shared(self):
+        # GIVEN
+        singleflight = SingleFlight()
+
+        async def fn() -> int:
+            await asyncio.sleep(0.01)
+            raise ValueError("error")
+
+        # WHEN
+        results = await asyncio.gather(
+            *(singleflight("key", fn) for _ in range(2)),
+            return_exceptions=True,
+        )
+
+        # THEN
+        assert [type(result) for result in results] == [ValueError, ValueError]
+
+    async def test_cancelling_one_caller(self):
+        # GIVEN
+        singleflight = SingleFlight()
+
+        async def fn() -> int:
+            await asyncio.sleep(0.01)
+            return 1
+
+        first = asyncio.create_task(singleflight("key", fn))
+        second = asyncio.create_task(singleflight("key", fn))
+        await asyncio.sleep(0)
+
+        # WHEN
+        first.cancel()
+
+        # THEN
+        assert await second == 1
+        assert first.cancelled()
+
+    async def test_cancelling_every_caller(self):
+        # GIVEN
+        singleflight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fn() -> int:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return 1  # pragma: no cover
+
+        task = asyncio.create_task(singleflight("key", fn))
+        await asyncio.sleep(0)
+
+        # WHEN
+        task.cancel()
+
+        # THEN
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert not singleflight._calls
+
+    async def test_joining_after_every_caller_is_cancelled(self):
+        # GIVEN
+        singleflight = SingleFlight()
+        calls = 0
+
+        async def fn() -> int:
+            nonlocal calls
+            calls += 1
+            try:
+                await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                # takes a while to wind down
+                await asyncio.sleep(0.01)
+                raise
+            return calls
+
+        task = asyncio.create_task(singleflight("key", fn))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        # WHEN
+        result = await singleflight("key", fn)
+
+        # THEN
+        assert result == 2
+        await asyncio.sleep(0.02)
+        assert not singleflight._calls
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from src.toolkit.circuit_breaker import CircuitBreaker, CircuitOpenError, State
+
+
+def _call(breaker: CircuitBreaker, exc: Exception | None = None) -> None:
+    with breaker:
+        if exc is not None:
+            raise exc
+
+
+def _fail(breaker: CircuitBreaker, exc: Exception | None = None) -> None:
+    with pytest.raises(type(exc) if exc else ValueError):
+        _call(breaker, exc or ValueError())
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        _fail(breaker)
+    assert breaker.state == State.OPEN
+
+
+class TestCircuitBreaker:
+    def test_opening_when_failure_rate_is_reached(self):
+        # GIVEN
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=4)
+        with mock.patch("time.monotonic", return_value=0):
+            _call(breaker)
+            _fail(breaker)
+            _call(breaker)
+            assert breaker.state == State.CLOSED
+
+            # WHEN
+            _fail(breaker)
+
+            # THEN
+            assert breaker.state == State.OPEN
+            with pytest.raises(CircuitOpenError):
+                _call(breaker)
+
+    def test_failures_out_of_window_are_forgotten(self):
+        # GIVEN
+        breaker = CircuitBreaker(failure_rate=0.5, min_calls=2, window=10)
+        with mock.patch("time.monotonic", return_value=0):
+            _fail(breaker)
+        # WHEN
+        with mock.patch("time.monotonic", return_value=10):
+            _call(breaker)
+            _call(breaker)
+            _fail(breaker)
+        # THEN
+        assert breaker.state == State.CLOSED
+
+    def test_not_counted_exceptions(self):
+        # GIVEN
+        breaker = CircuitBreaker(min_calls=1, failure_exceptions=(TimeoutError,))
+        # WHEN
+        _fail(breaker, ValueError())
+        # THEN
+        assert breaker.state == State.CLOSED
+
+        # WHEN
+        _fail(breaker, TimeoutError())
+        # THEN
+        assert breaker.state == State.OPEN
+
+    def test_closing_after_successful_trial_call(self):
+        # GIVEN
+        breaker = CircuitBreaker(min_calls=1, open_timeout=30)
+        with mock.patch("time.monotonic", return_value=0):
+            _open(breaker)
+        # WHEN
+        with mock.patch("time.monotonic", return_value=30):
+            assert breaker.state == State.HALF_OPEN
+            _call(breaker)
+            # THEN
+            assert breaker.state == State.CLOSED
+            _fail(breaker)
+            assert breaker.state == State.OPEN
+
+    def test_opening_after_failed_trial_call(self):
+        # GIVEN
+        breaker = CircuitBreaker(min_calls=1, open_timeout=30)
+        with mock.patch("time.monotonic", return_value=0):
+            _open(breaker)
+        # WHEN
+        with mock.patch("time.monotonic", return_value=30):
+            _fail(breaker)
+        # THEN
+        with mock.patch("time.monotonic", return_value=59):
+            assert breaker.state == State.OPEN
+
+    def test_limiting_trial_calls(self):
+        # GIVEN
+        breaker = CircuitBreaker(min_calls=1, open_timeout=30, half_open_calls=1)
+        with mock.patch("time.monotonic", return_value=0):
+            _open(breaker)
+        # WHEN: a trial call is in flight
+        with mock.patch("time.monotonic", return_value=30), breaker:
+            # THEN
+            assert breaker.state == State.HALF_OPEN
+            pytest.raises(CircuitOpenError, _call, breaker)
+
+    def test_not_counted_exception_frees_trial_call(self):
+        # GIVEN
+        breaker = CircuitBreaker(
+            min_calls=1, open_timeout=30, failure_exceptions=(TimeoutError,)
+        )
+        with mock.patch("time.monotonic", return_value=0):
+            _fail(breaker, TimeoutError())
+        with mock.patch("time.monotonic", return_value=30):
+            # WHEN
+            _fail(breaker, ValueError())
+            # THEN
+            assert breaker.state == State.HALF_OPEN
+            _call(breaker)
+            assert breaker.state == State.CLOSED
+
+    def test_late_calls_do_not_affect_open_circuit(self):
+        # GIVEN
+        breaker = CircuitBreaker(min_calls=1)
+        with mock.patch("time.monotonic", return_value=0):
+            # WHEN: calls started before the circuit was opened complete
+            with breaker, pytest.raises(ValueError), breaker:
+                _open(breaker)
+                raise ValueError()
+            # THEN
+            assert breaker.state == State.OPEN
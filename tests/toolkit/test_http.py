@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import TYPE_CHECKING, Any
+from unittest import mock
+
+import httpx
+import pytest
+
+from src.toolkit.http import (
+    InstrumentedTransport,
+    PoolStats,
+    RetryTransport,
+    get_hop_by_hop_headers,
+)
+from src.toolkit.retry import RetryBudget
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from pytest_httpx import HTTPXMock
+
+pytestmark = [pytest.mark.anyio]
+
+
+def _make_client(stats: PoolStats) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=InstrumentedTransport(stats))
+
+
+class TestInstrumentedTransport:
+    async def test_streamed_response_holds_connection(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        url = "https://example.com"
+        httpx_mock.add_response(url=url)
+        stats = PoolStats(max_connections=1)
+        async with _make_client(stats) as client:
+            # WHEN
+            async with client.stream("GET", url):
+                # THEN
+                assert stats.in_flight == 1
+            # THEN
+            assert stats.in_flight == 0
+
+    async def test_counting_saturation(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        url = "https://example.com"
+        httpx_mock.add_response(url=url)
+        stats = PoolStats(max_connections=1)
+        async with _make_client(stats) as client:
+            async with client.stream("GET", url):
+                # WHEN
+                await client.get(url)
+            # THEN
+            assert stats.saturated == 1
+            assert stats.in_flight == 0
+
+            # WHEN
+            await client.get(url)
+            # THEN
+            assert stats.saturated == 1
+
+    async def test_unlimited_pool_is_never_saturated(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        url = "https://example.com"
+        httpx_mock.add_response(url=url)
+        stats = PoolStats(max_connections=None)
+        async with _make_client(stats) as client:
+            # WHEN
+            async with client.stream("GET", url):
+                await client.get(url)
+            # THEN
+            assert stats.saturated == 0
+
+    async def test_connection_is_released_on_error(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        url = "https://example.com"
+        httpx_mock.add_exception(httpx.ConnectError("failed"), url=url)
+        stats = PoolStats(max_connections=1)
+        async with _make_client(stats) as client:
+            # WHEN
+            with pytest.raises(httpx.ConnectError):
+                await client.get(url)
+            # THEN
+            assert stats.in_flight == 0
+
+    async def test_connection_is_released_once(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        url = "https://example.com"
+        httpx_mock.add_response(url=url)
+        stats = PoolStats(max_connections=1)
+        async with _make_client(stats) as client:
+            response = await client.get(url)
+            assert isinstance(response.stream, httpx.AsyncByteStream)
+            # WHEN
+            await response.stream.aclose()
+            # THEN
+            assert stats.in_flight == 0
+
+    @pytest.mark.parametrize(
+        ["exc", "status"],
+        [
+            (None, "200"),
+            (httpx.ReadTimeout("timeout"), "timeout"),
+            (httpx.ConnectError("failed"), "error"),
+        ],
+    )
+    async def test_observing_responses(
+        self, httpx_mock: HTTPXMock, exc: Exception | None, status: str
+    ):
+        # GIVEN
+        url = "https://example.com"
+        if exc is None:
+            httpx_mock.add_response(url=url)
+        else:
+            httpx_mock.add_exception(exc, url=url)
+        observed = []
+        transport = InstrumentedTransport(
+            PoolStats(), lambda *args: observed.append(args)
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            # WHEN
+            with contextlib.suppress(httpx.HTTPError):
+                await client.get(url)
+        # THEN
+        assert [status for status, _ in observed] == [status]
+
+    async def test_observing_cancellation(self, httpx_mock: HTTPXMock):
+        # GIVEN
+        url = "https://example.com"
+        requested = asyncio.Event()
+
+        async def wait_forever(request: httpx.Request) -> httpx.Response:
+            requested.set()
+            await asyncio.Event().wait()
+            raise AssertionError("unreachable")  # pragma: no cover
+
+        httpx_mock.add_callback(wait_forever, url=url)
+        observed = []
+        transport = InstrumentedTransport(
+            PoolStats(), lambda *args: observed.append(args)
+        )
+        async with httpx.AsyncClient(transport=transport) as client:
+            task = asyncio.create_task(client.get(url))
+            await requested.wait()
+            # WHEN
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        # THEN
+        assert [status for status, _ in observed] == ["cancelled"]
+
+
+class _Stream(httpx.ByteStream):
+    closed = False
+
+    def __init__(self) -> None:
+        super().__init__(b"")
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def _make_retry_client(
+    handler: Callable[[httpx.Request], Awaitable[httpx.Response]],
+    budget: RetryBudget | None = None,
+    **kwargs: Any,
+) -> httpx.AsyncClient:
+    transport = RetryTransport(
+        httpx.MockTransport(handler),  # type: ignore[arg-type]
+        budget or RetryBudget(),
+        **kwargs,
+    )
+    return httpx.AsyncClient(transport=transport)
+
+
+async def _warm_up(client: httpx.AsyncClient, calls: int = 100) -> None:
+    """Gives the transport enough fast responses to estimate percentiles."""
+    for _ in range(calls):
+        await client.get("https://example.com")
+
+
+class TestRetryTransport:
+    @pytest.mark.parametrize(
+        "exc", [httpx.ConnectError("failed"), httpx.ConnectTimeout("timeout")]
+    )
+    async def test_retrying(self, exc: Exception):
+        # GIVEN
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            if calls < 3:
+                raise exc
+            return httpx.Response(200)
+
+        extra_requests: list[str] = []
+        async with _make_retry_client(
+            handler, max_retries=2, on_extra_request=extra_requests.append
+        ) as client:
+            # WHEN
+            response = await client.get("https://example.com")
+        # THEN
+        assert response.status_code == 200
+        assert extra_requests == ["retry", "retry"]
+
+    async def test_giving_up_after_max_retries(self):
+        # GIVEN
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            raise httpx.ConnectError("failed")
+
+        async with _make_retry_client(handler, max_retries=2) as client:
+            # WHEN
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://example.com")
+        # THEN
+        assert calls == 3
+
+    async def test_retries_fit_in_timeout(self):
+        # GIVEN: an upstream that never responds
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(request.extensions["timeout"]["read"])
+            raise httpx.ReadTimeout("timeout")
+
+        loop = asyncio.get_running_loop()
+        async with _make_retry_client(handler, max_retries=2, timeout=0.05) as client:
+            started_at = loop.time()
+            # WHEN
+            with pytest.raises(httpx.ReadTimeout):
+                await client.get("https://example.com", timeout=0.05)
+        # THEN
+        assert loop.time() - started_at < 0.1
+        assert calls == 1
+
+    async def test_retry_gets_time_left(self):
+        # GIVEN
+        timeouts: list[dict[str, float]] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            timeouts.append(request.extensions["timeout"])
+            if len(timeouts) == 1:
+                await asyncio.sleep(0.02)
+                raise httpx.ConnectError("failed")
+            return httpx.Response(200)
+
+        async with _make_retry_client(handler, timeout=0.05) as client:
+            # WHEN
+            response = await client.get(
+                "https://example.com", timeout=httpx.Timeout(0.05, connect=0.01)
+            )
+        # THEN
+        assert response.status_code == 200
+        assert timeouts[0]["read"] == 0.05
+        assert timeouts[1]["connect"] == 0.01
+        assert 0 < timeouts[1]["read"] < 0.04
+
+    async def test_retry_without_timeouts(self):
+        # GIVEN
+        timeouts: list[dict[str, float]] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            timeouts.append(request.extensions["timeout"])
+            if len(timeouts) == 1:
+                raise httpx.ConnectError("failed")
+            return httpx.Response(200)
+
+        async with _make_retry_client(handler, timeout=10) as client:
+            # WHEN
+            await client.get("https://example.com", timeout=None)
+        # THEN
+        assert 9 < timeouts[1]["read"] <= 10
+
+    @pytest.mark.parametrize(
+        ["method", "exc", "capacity"],
+        [
+            ("POST", httpx.ConnectError("failed"), 10),
+            ("GET", httpx.ReadError("failed"), 10),
+            ("GET", httpx.ConnectError("failed"), 0),
+        ],
+        ids=["not idempotent", "not retryable", "no budget"],
+    )
+    async def test_not_retrying(self, method: str, exc: Exception, capacity: float):
+        # GIVEN
+        calls = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            raise exc
+
+        budget = RetryBudget(min_per_second=0, capacity=capacity)
+        async with _make_retry_client(handler, budget) as client:
+            # WHEN
+            with pytest.raises(type(exc)):
+                await client.request(method, "https://example.com")
+        # THEN
+        assert calls == 1
+
+    async def test_hedging_slow_request(self):
+        # GIVEN
+        slow, calls = asyncio.Event(), 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            if slow.is_set() and calls % 2:
+                await asyncio.Event().wait()
+            return httpx.Response(200)
+
+        extra_requests: list[str] = []
+        async with _make_retry_client(
+            handler, hedge_percentile=95, on_extra_request=extra_requests.append
+        ) as client:
+            await _warm_up(client)
+            slow.set()
+            # WHEN
+            response = await client.get("https://example.com")
+        # THEN
+        assert response.status_code == 200
+        assert extra_requests == ["hedge"]
+
+    async def test_closing_response_of_the_loser(self):
+        # GIVEN
+        hedged, release = asyncio.Event(), asyncio.Event()
+        streams: list[_Stream] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if not hedged.is_set():
+                return httpx.Response(200)
+            stream = _Stream()
+            streams.append(stream)
+            await release.wait()
+            return httpx.Response(200, stream=stream)
+
+        async with _make_retry_client(handler, hedge_percentile=50) as client:
+            await _warm_up(client)
+            hedged.set()
+            request = client.build_request("GET", "https://example.com")
+            task = asyncio.create_task(client.send(request, stream=True))
+            while len(streams) < 2:
+                await asyncio.sleep(0.001)
+            # WHEN: both requests get the response at once
+            release.set()
+            response = await task
+            # THEN
+            assert [stream.closed for stream in streams].count(True) == 1
+            await response.aclose()
+
+    async def test_waiting_for_the_other_request_on_failure(self):
+        # GIVEN
+        hedged, calls = asyncio.Event(), 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            if calls == 101:
+                await hedged.wait()
+                return httpx.Response(200)
+            if calls == 102:
+                hedged.set()
+                raise httpx.ReadError("failed")
+            return httpx.Response(200)
+
+        async with _make_retry_client(handler, hedge_percentile=50) as client:
+            await _warm_up(client)
+            # WHEN
+            response = await client.get("https://example.com")
+        # THEN
+        assert response.status_code == 200
+        assert calls == 102
+
+    async def test_failing_when_every_request_fails(self):
+        # GIVEN
+        hedged, calls = asyncio.Event(), 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            if calls == 101:
+                await hedged.wait()
+                raise httpx.ReadError("failed")
+            if calls == 102:
+                hedged.set()
+                await asyncio.sleep(0)
+                raise httpx.ReadError("failed")
+            return httpx.Response(200)
+
+        async with _make_retry_client(handler, hedge_percentile=50) as client:
+            await _warm_up(client)
+            # WHEN
+            with pytest.raises(httpx.ReadError):
+                await client.get("https://example.com")
+        # THEN
+        assert calls == 102
+
+    async def test_not_hedging_without_budget(self):
+        # GIVEN
+        slow, release, calls = asyncio.Event(), asyncio.Event(), 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            if slow.is_set():
+                asyncio.get_running_loop().call_later(0.01, release.set)
+                await release.wait()
+            return httpx.Response(200)
+
+        budget = RetryBudget(min_per_second=0, capacity=0)
+        async with _make_retry_client(handler, budget, hedge_percentile=50) as client:
+            await _warm_up(client)
+            slow.set()
+            # WHEN
+            await client.get("https://example.com")
+        # THEN
+        assert calls == 101
+
+    async def test_closing_transport(self):
+        # GIVEN
+        inner = mock.AsyncMock(spec=httpx.AsyncBaseTransport)
+        transport = RetryTransport(inner, RetryBudget())
+        # WHEN
+        await transport.aclose()
+        # THEN
+        inner.aclose.assert_awaited_once()
+
+
+class TestGetHopByHopHeaders:
+    def test(self):
+        # GIVEN
+        headers = [
+            ("Connection", "Keep-Alive, X-Hop"),
+            ("Keep-Alive", "timeout=5"),
+            ("X-Hop", "1"),
+            ("Content-Type", "application/json"),
+        ]
+        # WHEN
+        result = get_hop_by_hop_headers(headers)
+        # THEN
+        assert {"connection", "keep-alive", "x-hop", "transfer-encoding"} <= result
+        assert "content-type" not in result
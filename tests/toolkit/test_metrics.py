@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import pytest
+
+from src.toolkit.metrics import Registry
+
+
+class TestRegistry:
+    def test_counter(self):
+        # GIVEN
+        registry = Registry()
+        counter = registry.counter("requests", "Number of requests.", ["path"])
+        # WHEN
+        counter.labels("/").inc()
+        counter.labels("/").inc(2)
+        counter.labels('/"a"\\\n').inc(0.5)
+        # THEN
+        assert registry.expose() == (
+            "# HELP requests Number of requests.\n"
+            "# TYPE requests counter\n"
+            'requests_total{path="/"} 3\n'
+            'requests_total{path="/\\"a\\"\\\\\\n"} 0.5\n'
+        )
+
+    def test_gauge(self):
+        # GIVEN
+        registry = Registry()
+        gauge = registry.gauge("in_flight", "Requests in flight.")
+        # WHEN
+        gauge.labels().set(5)
+        # THEN
+        assert registry.expose() == (
+            "# HELP in_flight Requests in flight.\n"
+            "# TYPE in_flight gauge\n"
+            "in_flight 5\n"
+        )
+
+    def test_histogram(self):
+        # GIVEN
+        registry = Registry()
+        histogram = registry.histogram(
+            "duration", "Duration.", ["service"], buckets=[1, 0.5]
+        )
+        # WHEN
+        for value in (0.25, 0.5, 0.75, 2):
+            histogram.labels("swapi").observe(value)
+        # THEN
+        assert registry.expose() == (
+            "# HELP duration Duration.\n"
+            "# TYPE duration histogram\n"
+            'duration_bucket{service="swapi",le="0.5"} 2\n'
+            'duration_bucket{service="swapi",le="1"} 3\n'
+            'duration_bucket{service="swapi",le="+Inf"} 4\n'
+            'duration_sum{service="swapi"} 3.5\n'
+            'duration_count{service="swapi"} 4\n'
+        )
+
+    def test_wrong_number_of_labels(self):
+        # GIVEN
+        registry = Registry()
+        counter = registry.counter("requests", "Number of requests.", ["path"])
+        # WHEN / THEN
+        with pytest.raises(AssertionError):
+            counter.labels()
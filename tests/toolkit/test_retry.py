@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from src.toolkit.retry import RetryBudget
+
+
+class TestRetryBudget:
+    def test_withdrawing_until_empty(self):
+        # GIVEN
+        with mock.patch("time.monotonic", return_value=0):
+            budget = RetryBudget(min_per_second=0, capacity=2)
+            # WHEN
+            withdrawn = [budget.withdraw() for _ in range(3)]
+        # THEN
+        assert withdrawn == [True, True, False]
+
+    def test_depositing_a_fraction_per_call(self):
+        # GIVEN
+        with mock.patch("time.monotonic", return_value=0):
+            budget = RetryBudget(ratio=0.25, min_per_second=0, capacity=1)
+            assert budget.withdraw()
+            # WHEN
+            for _ in range(3):
+                budget.deposit()
+            # THEN
+            assert not budget.withdraw()
+
+            # WHEN
+            budget.deposit()
+            # THEN
+            assert budget.withdraw()
+
+    def test_refilling_over_time(self):
+        # GIVEN
+        with mock.patch("time.monotonic", return_value=0):
+            budget = RetryBudget(min_per_second=0.5, capacity=1)
+            assert budget.withdraw()
+        # WHEN
+        with mock.patch("time.monotonic", return_value=1):
+            # THEN
+            assert budget.tokens == 0.5
+        # WHEN
+        with mock.patch("time.monotonic", return_value=10):
+            # THEN
+            assert budget.tokens == 1